@@ -0,0 +1,233 @@
+"""
+Admission control and per-client rate limiting, per worker.
+
+Requests are sorted into route classes: ``heavy`` for the endpoints that
+load large parts of the catalogue and ``light`` for everything else. Each
+class admits a fixed number of requests at a time. Further requests wait in
+a bounded FIFO queue for at most ``ADMISSION_QUEUE_TIMEOUT`` seconds; when
+the queue is full or the deadline passes the request is answered with 503
+and ``Retry-After`` straight away, instead of piling up on the database
+pool. Health checks and ``/metrics`` are never held back.
+
+Clients are additionally limited by a token bucket keyed on their address,
+answered with 429 and ``Retry-After`` when empty. Behind a proxy, set
+``RATE_LIMIT_TRUSTED_PROXIES`` to the number of proxies appending to
+``X-Forwarded-For`` so the client address is taken from that header.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Optional, Tuple
+from starlette.datastructures import Headers
+from app.config import settings
+from app.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_WAIT, ADMISSION_QUEUED, ADMISSION_REJECTED
+from app.responses import FastJSONResponse
+
+# Path prefixes of the heavy route class
+HEAVY_PATHS = ("/api/v1/get_all_data", "/api/v1/fruits/bulk", "/api/v1/fruits:batchGet")
+
+# Paths admitted without limits: probes must answer while the worker is busy
+EXEMPT_PATHS = ("/health", "/metrics")
+
+
+def route_class(path: str) -> Optional[str]:
+    """
+    The route class of ``path``, None for exempt paths.
+    """
+    if path.startswith(EXEMPT_PATHS):
+        return None
+    return "heavy" if path.startswith(HEAVY_PATHS) else "light"
+
+
+class AdmissionGate:
+    """
+    Admits ``limit`` concurrent holders; up to ``queue_size`` more wait in
+    arrival order. A released slot is handed directly to the oldest waiter.
+    """
+    def __init__(self, limit: int, queue_size: int):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self._waiters = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, timeout: float) -> Optional[str]:
+        """
+        Take a slot, waiting at most ``timeout`` seconds. Returns None on
+        success, otherwise the reason: ``queue_full`` or ``queue_timeout``.
+        """
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            return "queue_timeout"
+        except asyncio.CancelledError:
+            # The client went away; give back a slot handed over meanwhile
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+        return None
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot passes to the waiter, in_flight stays the same
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _discard(self, waiter) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+
+class TokenBucket:
+    """
+    Per-key token buckets refilled at ``rate`` tokens per second up to
+    ``burst``. The least recently seen keys are dropped beyond
+    ``max_keys``.
+    """
+    def __init__(self, rate: float, burst: int, max_keys: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, key: str) -> float:
+        """
+        Take a token for ``key``. Returns 0 when one was available, otherwise
+        the seconds until the next token.
+        """
+        now = self._clock()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+def client_address(scope, trusted_proxies: int = 0) -> str:
+    """
+    The client address of a request. With ``trusted_proxies`` proxies in
+    front, it is the entry those proxies added to ``X-Forwarded-For``; the
+    entries before it are supplied by the client and can be forged.
+    """
+    if trusted_proxies > 0:
+        forwarded = Headers(scope=scope).get("x-forwarded-for")
+        if forwarded:
+            addresses = [address.strip() for address in forwarded.split(",") if address.strip()]
+            if addresses:
+                return addresses[max(0, len(addresses) - trusted_proxies)]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying the rate limit and the route class gates.
+    """
+    def __init__(
+        self,
+        app,
+        limits: Dict[str, Tuple[int, int]],
+        queue_timeout: float = 2.0,
+        retry_after: int = 1,
+        rate_limit: float = 0,
+        rate_limit_burst: int = 1,
+        trusted_proxies: int = 0,
+    ):
+        self.app = app
+        self.gates = {name: AdmissionGate(limit, queue_size) for name, (limit, queue_size) in limits.items()}
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.buckets = TokenBucket(rate_limit, rate_limit_burst) if rate_limit > 0 else None
+        self.trusted_proxies = trusted_proxies
+
+    async def __call__(self, scope, receive, send):
+        name = route_class(scope["path"]) if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        if self.buckets is not None:
+            wait = self.buckets.take(client_address(scope, self.trusted_proxies))
+            if wait:
+                ADMISSION_REJECTED.labels(route_class=name, reason="rate_limited").inc()
+                response = FastJSONResponse(
+                    {"detail": "Too many requests"},
+                    status_code=429,
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+                await response(scope, receive, send)
+                return
+
+        gate = self.gates[name]
+        queued = gate.in_flight >= gate.limit or gate.queued > 0
+        if queued:
+            ADMISSION_QUEUED.labels(route_class=name).inc()
+        start = time.perf_counter()
+        try:
+            rejected = await gate.acquire(self.queue_timeout)
+        finally:
+            if queued:
+                ADMISSION_QUEUED.labels(route_class=name).dec()
+        if queued and rejected != "queue_full":
+            ADMISSION_QUEUE_WAIT.labels(route_class=name).observe(time.perf_counter() - start)
+        if rejected:
+            ADMISSION_REJECTED.labels(route_class=name, reason=rejected).inc()
+            response = FastJSONResponse(
+                {"detail": "Server is busy, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        in_flight = ADMISSION_IN_FLIGHT.labels(route_class=name)
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            in_flight.dec()
+            gate.release()
+
+
+def admission_options() -> dict:
+    """
+    AdmissionMiddleware arguments from the settings.
+    """
+    return {
+        "limits": {
+            "light": (settings.ADMISSION_LIGHT_LIMIT, settings.ADMISSION_LIGHT_QUEUE),
+            "heavy": (settings.ADMISSION_HEAVY_LIMIT, settings.ADMISSION_HEAVY_QUEUE),
+        },
+        "queue_timeout": settings.ADMISSION_QUEUE_TIMEOUT,
+        "retry_after": settings.ADMISSION_RETRY_AFTER,
+        "rate_limit": settings.RATE_LIMIT_PER_SECOND,
+        "rate_limit_burst": settings.RATE_LIMIT_BURST,
+        "trusted_proxies": settings.RATE_LIMIT_TRUSTED_PROXIES,
+    }
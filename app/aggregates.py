@@ -0,0 +1,270 @@
+"""
+Catalogue statistics kept in the ``catalogue_aggregates`` summary table.
+
+Every fruit, supplier and nutrition record adds to a few buckets: fruit
+prices by origin country and by color, supplier ratings by half-star and
+nutrient totals. A bucket stores its row count plus the count and sum of
+the non-null values, so averages are read without scanning the catalogue.
+
+The buckets are updated in the same transaction as the write. ORM writes
+are picked up by session flush hooks; Core bulk inserts call
+``record_inserted``. ``python -m app.aggregates`` recomputes the table from
+scratch with GROUP BY queries, e.g. after rows were changed outside the app.
+"""
+import logging
+import math
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, attributes
+from app.models import CatalogueAggregate, Fruit, NutritionalInfo, Supplier
+
+logger = logging.getLogger(__name__)
+
+NUTRIENTS = ("calories", "carbohydrates", "protein", "fat", "fiber")
+
+# Columns each model contributes to the buckets
+TRACKED_COLUMNS = {
+    Fruit: ("origin_country", "color", "price_per_kg"),
+    Supplier: ("rating",),
+    NutritionalInfo: NUTRIENTS,
+}
+
+# (dimension, bucket) -> [items, value_count, value_sum]
+Totals = Dict[Tuple[str, str], List[float]]
+
+
+def rating_bucket(rating: Optional[float]) -> str:
+    # Half-star buckets: 4.0 holds ratings from 4.0 up to 4.5
+    return "" if rating is None else str(math.floor(rating * 2) / 2)
+
+
+def _contributions(model, get: Callable[[str], object]) -> List[Tuple[str, str, Optional[float]]]:
+    if model is Fruit:
+        price = get("price_per_kg")
+        return [
+            ("price_by_country", get("origin_country") or "", price),
+            ("price_by_color", get("color") or "", price),
+        ]
+    if model is Supplier:
+        return [("supplier_rating", rating_bucket(get("rating")), get("rating"))]
+    return [("nutrition", name, get(name)) for name in NUTRIENTS]
+
+
+def _add(totals: Totals, model, get: Callable[[str], object], sign: int = 1) -> None:
+    for dimension, bucket, value in _contributions(model, get):
+        entry = totals.setdefault((dimension, bucket), [0, 0, 0.0])
+        entry[0] += sign
+        if value is not None:
+            entry[1] += sign
+            entry[2] += sign * value
+
+
+def _update_or_insert(connection, table, rows: List[dict]) -> None:
+    # Portable fallback for databases without an upsert statement SQLAlchemy
+    # knows: add to each bucket, then create the buckets that do not exist.
+    # Two transactions creating the same bucket at once can still collide
+    for row in rows:
+        key = (table.c.dimension == row["dimension"]) & (table.c.bucket == row["bucket"])
+        result = connection.execute(
+            update(table).where(key).values(
+                {name: table.c[name] + row[name] for name in ("items", "value_count", "value_sum")}
+            )
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(row))
+
+
+def apply_totals(connection, totals: Totals) -> None:
+    """
+    Add ``totals`` to the stored buckets, with one upsert statement on
+    SQLite and MySQL and an update or insert per bucket elsewhere.
+    """
+    rows = [
+        {"dimension": dimension, "bucket": bucket, "items": items, "value_count": count, "value_sum": total}
+        for (dimension, bucket), (items, count, total) in totals.items()
+        if items or count or total
+    ]
+    if not rows:
+        return
+    table = CatalogueAggregate.__table__
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        stmt = sqlite_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.dimension, table.c.bucket],
+            set_={name: table.c[name] + stmt.excluded[name] for name in ("items", "value_count", "value_sum")},
+        )
+    elif dialect == "mysql":
+        stmt = mysql_insert(table)
+        stmt = stmt.on_duplicate_key_update(
+            {name: table.c[name] + stmt.inserted[name] for name in ("items", "value_count", "value_sum")}
+        )
+    else:
+        _update_or_insert(connection, table, rows)
+        return
+    connection.execute(stmt, rows)
+
+
+def record_inserted(connection, model, rows: Iterable[dict]) -> None:
+    """
+    Count rows inserted with Core ``insert()``, which bypasses the session
+    flush hooks. Call it in the inserting transaction.
+    """
+    totals: Totals = {}
+    for row in rows:
+        _add(totals, model, row.get)
+    apply_totals(connection, totals)
+
+
+def _changed(obj) -> bool:
+    return any(
+        attributes.get_history(obj, name).has_changes() for name in TRACKED_COLUMNS[type(obj)]
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _before_flush(session, flush_context, instances):
+    # Subtract the stored values of rows about to be updated or deleted. They
+    # are read back from the database: an attribute set on an expired object
+    # keeps no record of its old value
+    totals: Totals = {}
+    replaced = defaultdict(list)
+    for obj in session.deleted:
+        if type(obj) in TRACKED_COLUMNS:
+            replaced[type(obj)].append(obj.id)
+    for obj in session.dirty:
+        if type(obj) in TRACKED_COLUMNS and _changed(obj):
+            replaced[type(obj)].append(obj.id)
+    connection = session.connection() if replaced else None
+    for model, ids in replaced.items():
+        columns = [getattr(model, name) for name in TRACKED_COLUMNS[model]]
+        for row in connection.execute(select(*columns).where(model.id.in_(ids))).mappings():
+            _add(totals, model, row.get, sign=-1)
+
+    # New values are added once the flush has written them
+    session.info["aggregate_totals"] = totals
+    session.info["aggregate_pending"] = [
+        obj for obj in [*session.new, *session.dirty]
+        if type(obj) in TRACKED_COLUMNS and obj not in session.deleted and (obj in session.new or _changed(obj))
+    ]
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    totals = session.info.pop("aggregate_totals", {})
+    for obj in session.info.pop("aggregate_pending", []):
+        _add(totals, type(obj), lambda name: getattr(obj, name))
+    apply_totals(session.connection(), totals)
+
+
+def compute_aggregates(connection) -> Totals:
+    """
+    Compute every bucket from the catalogue tables with GROUP BY queries.
+    """
+    totals: Totals = {}
+
+    def count(column):
+        return [func.count(), func.count(column), func.coalesce(func.sum(column), 0)]
+
+    for dimension, column in (("price_by_country", Fruit.origin_country), ("price_by_color", Fruit.color)):
+        for bucket, items, value_count, value_sum in connection.execute(
+            select(column, *count(Fruit.price_per_kg)).group_by(column)
+        ):
+            entry = totals.setdefault((dimension, bucket or ""), [0, 0, 0.0])
+            entry[0] += items
+            entry[1] += value_count
+            entry[2] += value_sum
+
+    # Group by the exact rating, the half-star bucket is computed here
+    for rating, items, value_count, value_sum in connection.execute(
+        select(Supplier.rating, *count(Supplier.rating)).group_by(Supplier.rating)
+    ):
+        entry = totals.setdefault(("supplier_rating", rating_bucket(rating)), [0, 0, 0.0])
+        entry[0] += items
+        entry[1] += value_count
+        entry[2] += value_sum
+
+    row = connection.execute(
+        select(func.count(), *(c for name in NUTRIENTS for c in count(getattr(NutritionalInfo, name))[1:]))
+    ).one()
+    if row[0]:
+        for i, name in enumerate(NUTRIENTS):
+            totals[("nutrition", name)] = [row[0], row[1 + 2 * i], row[2 + 2 * i]]
+    return totals
+
+
+def stored_aggregates(connection) -> Totals:
+    return {
+        (row.dimension, row.bucket): [row.items, row.value_count, row.value_sum]
+        for row in connection.execute(select(CatalogueAggregate.__table__))
+        if row.items
+    }
+
+
+def rebuild_aggregates(connection) -> int:
+    """
+    Replace the stored buckets with a full recompute. Returns the number of
+    buckets written.
+    """
+    totals = compute_aggregates(connection)
+    connection.execute(delete(CatalogueAggregate.__table__))
+    if totals:
+        connection.execute(insert(CatalogueAggregate.__table__), [
+            {"dimension": dimension, "bucket": bucket, "items": items, "value_count": count, "value_sum": total}
+            for (dimension, bucket), (items, count, total) in totals.items()
+        ])
+    return len(totals)
+
+
+def _average(total: float, count: int) -> Optional[float]:
+    return round(total / count, 4) if count else None
+
+
+def catalogue_stats(totals: Totals) -> dict:
+    """
+    Shape the stored buckets into the ``/stats`` response.
+    """
+    by_dimension = defaultdict(list)
+    for (dimension, bucket), values in sorted(totals.items()):
+        by_dimension[dimension].append((bucket or None, *values))
+
+    def prices(dimension, key):
+        return [
+            {key: bucket, "fruits": items, "avg_price_per_kg": _average(total, count)}
+            for bucket, items, count, total in by_dimension[dimension]
+        ]
+
+    ratings = by_dimension["supplier_rating"]
+    rated = sum(count for _, _, count, _ in ratings)
+    nutrition = {bucket: (items, count, total) for bucket, items, count, total in by_dimension["nutrition"]}
+    return {
+        "price_by_origin_country": prices("price_by_country", "origin_country"),
+        "price_by_color": prices("price_by_color", "color"),
+        "supplier_ratings": {
+            "suppliers": sum(items for _, items, _, _ in ratings),
+            "avg_rating": _average(sum(total for _, _, _, total in ratings), rated),
+            "distribution": [
+                {"rating": float(bucket) if bucket else None, "suppliers": items}
+                for bucket, items, _, _ in ratings
+            ],
+        },
+        "nutrition": {
+            "records": max((items for items, _, _ in nutrition.values()), default=0),
+            "totals": {name: nutrition[name][2] if name in nutrition else 0 for name in NUTRIENTS},
+            "averages": {
+                name: _average(nutrition[name][2], nutrition[name][1]) if name in nutrition else None
+                for name in NUTRIENTS
+            },
+        },
+    }
+
+
+if __name__ == "__main__":
+    from app.database import get_engine
+    from app.log import configure_logging
+    configure_logging()
+    with get_engine().begin() as connection:
+        logger.info(f"Rebuilt {rebuild_aggregates(connection)} catalogue aggregate buckets")
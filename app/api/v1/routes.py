@@ -1,14 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from dataclasses import replace
+from typing import Any, List, Optional
+from urllib.parse import urlencode
+from app.aggregates import catalogue_stats, stored_aggregates
+from app.cache import response_cache
+from app.config import settings
 from app.database import get_db
-from app.models import Fruit, NutritionalInfo, Supplier, FruitSupplier
-from app.schemas import Fruit as FruitSchema, NutritionalInfo as NutritionalInfoSchema, Supplier as SupplierSchema
-from pydantic import BaseModel
-import os
+from app.crud import (
+    SORT_COLUMNS, FruitFilters, get_fruit_rows, get_fruits_with_relations, iter_fruits_with_relations,
+    get_catalogue_counts, get_catalogue_version, insert_fruit_batch, get_fruit_complete, get_fruits_by_ids,
+    get_suppliers, get_change_token, get_changes, get_changed_rows
+)
+from app.ingest import InvalidUpload, iter_documents, validate_fruit
+from app.http_cache import conditional_response, make_etag
+from app.metrics import QueryBudgetExceeded, query_budget, set_query_budget
+from app.responses import FastJSONResponse, dumps
+from app.retention import ChangeTokenExpired
+from app.pagination import (
+    DEFAULT_SORT, MAX_PAGE_SIZE, Cursor, InvalidCursor, decode_cursor, encode_cursor, parse_fields, parse_sort
+)
+from app.models import Fruit, Supplier
+from app.schemas import (
+    Fruit as FruitSchema, FruitComplete as FruitCompleteSchema, NutritionalInfo as NutritionalInfoSchema,
+    Supplier as SupplierSchema
+)
+from pydantic import BaseModel, Field, conint
+import logging
 
+# Routes declare the SQL statements a cache miss may run with query_budget;
+# going over it fails the request in the tests, catching N+1 regressions
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
+# Every fruit, supplier or nutrition write invalidates this namespace
+FRUITS_CACHE_NAMESPACE = "fruits"
+
+MAX_BULK_BATCH_SIZE = 10000
+
+MAX_BATCH_GET_IDS = 1000
+
+# Ids are signed 64-bit columns, larger values overflow the database driver
+MAX_ID = 2 ** 63 - 1
+
+MAX_CHANGES_PAGE_SIZE = 500
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 # Basic fruit model as per requirements
 class BasicFruit(BaseModel):
     id: int
@@ -19,148 +60,196 @@ class BasicFruitCreate(BaseModel):
     fruit: str
     color: str
 
-# Initialize some data
-def init_data(db: Session):
-    # Skip initialization in test environment
-    if os.getenv("TESTING") == "true":
-        return
+class BulkRowError(BaseModel):
+    index: int
+    detail: Any
+
+class BulkInsertResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkRowError]
 
-    # Check if we already have data
-    if db.query(Fruit).count() > 0:
-        return
+class FruitBatchGet(BaseModel):
+    ids: List[conint(ge=1, le=MAX_ID)] = Field(..., min_length=1, max_length=MAX_BATCH_GET_IDS)
+
+# Listing item, fields left out of a ``fields=`` projection are omitted
+class FruitListItem(BaseModel):
+    id: int
+    fruit: Optional[str] = None
+    color: Optional[str] = None
+
+# Response fields that can be selected with ``fields=``
+BASIC_FRUIT_COLUMNS = {
+    "fruit": Fruit.name.label("fruit"),
+    "color": Fruit.color,
+}
+FRUIT_COLUMN_FIELDS = ("name", "color", "taste", "origin_country", "price_per_kg")
+FRUIT_DETAIL_FIELDS = FRUIT_COLUMN_FIELDS + ("suppliers", "nutritional_info")
+
+def _cache_key(request: Request, media_type: Optional[str] = None) -> str:
+    # The path plus the normalized query string, and the response format
+    # when it is negotiated from Accept
+    query = urlencode(sorted(request.query_params.multi_items()))
+    key = f"{request.url.path}?{query}"
+    return f"{key} {media_type}" if media_type else key
+
+def _cached(request: Request, build, media_type: Optional[str] = None):
+    return response_cache.get_or_set(FRUITS_CACHE_NAMESPACE, _cache_key(request, media_type), build)
+
+def _check_catalogue_version(
+    request: Request, response: Response, db: Session, media_type: Optional[str] = None
+) -> Optional[Response]:
+    """
+    Answer 304 when the client's ETag matches the current catalogue version.
 
+    Pass ``media_type`` when the format depends on the Accept header, so
+    each format gets its own ETag and caches are told to vary on Accept.
+    """
+    version = response_cache.get_or_set(
+        FRUITS_CACHE_NAMESPACE, "catalogue-version", lambda: get_catalogue_version(db)
+    )
+    etag = make_etag(version, _cache_key(request, media_type))
+    vary = "Accept" if media_type else None
+    return conditional_response(request, response, etag, version["last_modified"], vary)
+
+def _parse_cursor(after: Optional[str], sort: str) -> Optional[Cursor]:
+    # The cursor's sort value is compared with the column, check its type
+    value_type = SORT_COLUMNS[sort.lstrip("-")].type.python_type
     try:
-        # Add suppliers first
-        suppliers_data = [
-            {
-                "name": "Fresh Farms",
-                "country": "USA",
-                "contact_email": "contact@freshfarms.com",
-                "rating": 4.5
-            },
-            {
-                "name": "Global Fruits Co",
-                "country": "Spain",
-                "contact_email": "info@globalfruits.com",
-                "rating": 4.8
-            },
-            {
-                "name": "Tropical Exports",
-                "country": "Ecuador",
-                "contact_email": "sales@tropicalexports.com",
-                "rating": 4.2
-            }
-        ]
-        
-        # Create and store suppliers
-        suppliers = {}
-        for supplier_data in suppliers_data:
-            supplier = Supplier(**supplier_data)
-            db.add(supplier)
-            db.flush()
-            suppliers[supplier.country] = supplier
-
-        # Add fruits with nutritional info
-        fruits_data = [
-            {
-                "fruit": {
-                    "name": "Apple",
-                    "color": "Red",
-                    "taste": "Sweet",
-                    "origin_country": "USA",
-                    "price_per_kg": 2.99
-                },
-                "nutrition": {
-                    "calories": 52,
-                    "carbohydrates": 14,
-                    "protein": 0.3,
-                    "fat": 0.2,
-                    "fiber": 2.4,
-                    "vitamins": "A, C"
-                }
-            },
-            {
-                "fruit": {
-                    "name": "Banana",
-                    "color": "Yellow",
-                    "taste": "Sweet",
-                    "origin_country": "Ecuador",
-                    "price_per_kg": 1.99
-                },
-                "nutrition": {
-                    "calories": 89,
-                    "carbohydrates": 23,
-                    "protein": 1.1,
-                    "fat": 0.3,
-                    "fiber": 2.6,
-                    "vitamins": "B6, C"
-                }
-            },
-            {
-                "fruit": {
-                    "name": "Orange",
-                    "color": "Orange",
-                    "taste": "Sweet-Citrus",
-                    "origin_country": "Spain",
-                    "price_per_kg": 3.49
-                },
-                "nutrition": {
-                    "calories": 47,
-                    "carbohydrates": 12,
-                    "protein": 0.9,
-                    "fat": 0.1,
-                    "fiber": 2.4,
-                    "vitamins": "C"
-                }
-            }
-        ]
+        return decode_cursor(after, sort, value_type)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _parse_sort(sort: str) -> str:
+    try:
+        parse_sort(sort, SORT_COLUMNS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return sort
 
-        for data in fruits_data:
-            # Create fruit
-            fruit = Fruit(**data["fruit"])
-            db.add(fruit)
-            db.flush()
+def _next_cursor(cursor: Optional[Cursor], sort: str) -> Optional[str]:
+    return encode_cursor(cursor.id, sort, cursor.value) if cursor is not None else None
 
-            # Create nutritional info
-            nutrition = NutritionalInfo(fruit_id=fruit.id, **data["nutrition"])
-            db.add(nutrition)
+def fruit_filters(
+    color: Optional[str] = None,
+    taste: Optional[str] = None,
+    origin_country: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_calories: Optional[int] = Query(None, ge=0, le=MAX_ID),
+    max_calories: Optional[int] = Query(None, ge=0, le=MAX_ID),
+    q: Optional[str] = Query(None, min_length=1, max_length=100),
+) -> FruitFilters:
+    """
+    Filters shared by the listing endpoints, applied by the database.
+    """
+    return FruitFilters(
+        color=color, taste=taste, origin_country=origin_country, min_price=min_price,
+        max_price=max_price, min_calories=min_calories, max_calories=max_calories, q=q
+    )
 
-            # Link supplier from the same country
-            if fruit.origin_country in suppliers:
-                supplier = suppliers[fruit.origin_country]
-                fruit_supplier = FruitSupplier(fruit_id=fruit.id, supplier_id=supplier.id)
-                db.add(fruit_supplier)
+def catalogue_filters(
+    filters: FruitFilters = Depends(fruit_filters),
+    supplier_id: Optional[int] = Query(None, ge=1, le=MAX_ID),
+) -> FruitFilters:
+    """
+    fruit_filters plus ``supplier_id``, which /suppliers/{supplier_id}/fruits
+    takes from its path instead.
+    """
+    return replace(filters, supplier_id=supplier_id)
+
+def _json_response(content, response: Response) -> FastJSONResponse:
+    # Cached content is already in its final JSON shape; returning a response
+    # skips response_model validation and jsonable_encoder. Headers set on
+    # the injected response are carried over by hand
+    headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    return FastJSONResponse(content, headers=headers)
 
-        db.commit()
-        print("Database initialized with complete data!")
-    except Exception as e:
-        print(f"Error initializing data: {e}")
-        db.rollback()
+def _parse_fields(fields: Optional[str], allowed) -> Optional[set]:
+    try:
+        return parse_fields(fields, allowed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/fruits", response_model=List[BasicFruit])
-async def get_fruits(db: Session = Depends(get_db)):
+@router.get(
+    "/fruits",
+    response_model=List[FruitListItem],
+    response_model_exclude_unset=True,
+    dependencies=[Depends(query_budget(2))]
+)
+def get_fruits(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    sort: str = DEFAULT_SORT,
+    filters: FruitFilters = Depends(catalogue_filters),
+    db: Session = Depends(get_db)
+):
     """
     Get all fruits in basic format as per requirements.
+
+    Pass ``limit`` to page through the fruits; the cursor for the next page is
+    returned in the ``X-Next-Cursor`` header and is sent back as ``after``.
+    ``fields`` selects a comma separated subset of ``fruit`` and ``color``.
+
+    Fruits can be narrowed by ``color``, ``taste``, ``origin_country``,
+    ``min_price``/``max_price``, ``supplier_id``, ``min_calories``/``max_calories``
+    and a name search ``q``, and ordered with ``sort`` on an indexed column
+    (``id``, ``name``, ``color``, ``origin_country`` or ``price_per_kg``,
+    prefixed with ``-`` for descending order).
     """
-    # Only initialize data if not in testing mode
-    if os.getenv("TESTING") != "true":
-        init_data(db)
-    
-    fruits = db.query(Fruit).all()
-    return [{"id": f.id, "fruit": f.name, "color": f.color} for f in fruits]
+    sort = _parse_sort(sort)
+    after = _parse_cursor(after, sort)
+    requested = _parse_fields(fields, BASIC_FRUIT_COLUMNS)
 
-@router.get("/fruits/{fruit_id}", response_model=BasicFruit)
-async def get_fruit(fruit_id: int, db: Session = Depends(get_db)):
+    not_modified = _check_catalogue_version(request, response, db)
+    if not_modified:
+        return not_modified
+
+    def build():
+        columns = [
+            column for name, column in BASIC_FRUIT_COLUMNS.items()
+            if requested is None or name in requested
+        ]
+        rows, next_cursor = get_fruit_rows(
+            db, columns, limit=limit, after=after, filters=filters, sort=sort
+        )
+        return {"items": rows, "next_cursor": _next_cursor(next_cursor, sort)}
+
+    page = _cached(request, build)
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    return _json_response(page["items"], response)
+
+@router.get("/fruits/{fruit_id}", response_model=BasicFruit, dependencies=[Depends(query_budget(1))])
+def get_fruit(
+    request: Request,
+    response: Response,
+    fruit_id: int = Path(..., ge=1, le=MAX_ID),
+    db: Session = Depends(get_db)
+):
     """
     Get a specific fruit by ID in basic format as per requirements.
     """
-    fruit = db.query(Fruit).filter(Fruit.id == fruit_id).first()
-    if not fruit:
-        raise HTTPException(status_code=404, detail="Fruit not found")
-    return {"id": fruit.id, "fruit": fruit.name, "color": fruit.color}
+    def build():
+        fruit = db.query(Fruit).filter(Fruit.id == fruit_id).first()
+        if not fruit:
+            raise HTTPException(status_code=404, detail="Fruit not found")
+        return {
+            "fruit": {"id": fruit.id, "fruit": fruit.name, "color": fruit.color},
+            "updated_at": fruit.updated_at.isoformat() if fruit.updated_at else None
+        }
+
+    entry = _cached(request, build)
+    not_modified = conditional_response(request, response, make_etag(entry), entry["updated_at"])
+    if not_modified:
+        return not_modified
+    return _json_response(entry["fruit"], response)
 
-@router.post("/fruits", response_model=BasicFruit)
-async def create_fruit(fruit: BasicFruitCreate, db: Session = Depends(get_db)):
+@router.post("/fruits", response_model=BasicFruit, dependencies=[Depends(query_budget(3))])
+def create_fruit(fruit: BasicFruitCreate, db: Session = Depends(get_db)):
     """
     Create a new fruit using basic format as per requirements.
     """
@@ -168,57 +257,446 @@ async def create_fruit(fruit: BasicFruitCreate, db: Session = Depends(get_db)):
     db.add(db_fruit)
     db.commit()
     db.refresh(db_fruit)
+    response_cache.invalidate(FRUITS_CACHE_NAMESPACE)
     return {"id": db_fruit.id, "fruit": db_fruit.name, "color": db_fruit.color}
 
-@router.get("/get_all_data")
-async def get_all_data(db: Session = Depends(get_db)):
+@router.delete("/fruits/{fruit_id}", status_code=204, dependencies=[Depends(query_budget(8))])
+def delete_fruit(fruit_id: int = Path(..., ge=1, le=MAX_ID), db: Session = Depends(get_db)):
+    """
+    Delete a fruit together with its nutritional info and supplier links.
+    """
+    # The cascade needs the related rows, load them up front rather than lazily
+    fruit = get_fruit_complete(db, fruit_id)
+    if not fruit:
+        raise HTTPException(status_code=404, detail="Fruit not found")
+    db.delete(fruit)
+    db.commit()
+    response_cache.invalidate(FRUITS_CACHE_NAMESPACE)
+    return Response(status_code=204)
+
+@router.post("/fruits/bulk", response_model=BulkInsertResult)
+async def bulk_create_fruits(
+    request: Request,
+    batch_size: int = Query(settings.BULK_INSERT_BATCH_SIZE, ge=1, le=MAX_BULK_BATCH_SIZE),
+    db: Session = Depends(get_db)
+):
+    """
+    Create many fruits from a JSON array or a streamed NDJSON body.
+
+    Rows are validated against the FruitBase schema and inserted in
+    transactions of ``batch_size`` rows. Invalid rows are reported by their
+    position in the upload and do not abort the rest of the batch.
+    """
+    inserted = 0
+    errors = []
+    batch = []
+
+    async def flush():
+        nonlocal inserted
+        # The insert is blocking database work, keep it off the event loop
+        batch_errors = await run_in_threadpool(insert_fruit_batch, db, list(batch))
+        inserted += len(batch) - len(batch_errors)
+        errors.extend(batch_errors)
+        batch.clear()
+
+    try:
+        async for index, document in iter_documents(request):
+            values, row_errors = validate_fruit(document)
+            if row_errors:
+                errors.append({"index": index, "detail": row_errors})
+                continue
+            batch.append((index, values))
+            if len(batch) >= batch_size:
+                await flush()
+        await flush()
+    except InvalidUpload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        if inserted:
+            response_cache.invalidate(FRUITS_CACHE_NAMESPACE)
+
+    errors.sort(key=lambda error: error["index"])
+    return {"inserted": inserted, "failed": len(errors), "errors": errors}
+
+def _serialize_supplier(supplier) -> dict:
+    return {
+        "id": supplier.id,
+        "name": supplier.name,
+        "contact_email": supplier.contact_email,
+        "country": supplier.country,
+        "rating": float(supplier.rating) if supplier.rating else None
+    }
+
+def _serialize_nutrition(nutrition) -> dict:
+    return {
+        "id": nutrition.id,
+        "calories": nutrition.calories,
+        "carbohydrates": nutrition.carbohydrates,
+        "protein": nutrition.protein,
+        "fat": nutrition.fat,
+        "fiber": nutrition.fiber,
+        "vitamins": nutrition.vitamins
+    }
+
+def _serialize_fruit_details(fruit: Fruit, fields: Optional[set] = None) -> dict:
+    # Only touch requested attributes so unloaded columns are never lazy-loaded
+    def wanted(name):
+        return fields is None or name in fields
+
+    data = {"id": fruit.id}
+    for name in FRUIT_COLUMN_FIELDS:
+        if wanted(name):
+            data[name] = getattr(fruit, name)
+    if wanted("price_per_kg"):
+        data["price_per_kg"] = float(fruit.price_per_kg) if fruit.price_per_kg else None
+    if wanted("suppliers"):
+        data["suppliers"] = [_serialize_supplier(supplier) for supplier in fruit.suppliers]
+    if wanted("nutritional_info"):
+        nutrition = fruit.nutritional_info
+        data["nutritional_info"] = _serialize_nutrition(nutrition) if nutrition else None
+    return data
+
+def _serialize_normalized(fruits: List[Fruit], fields: Optional[set] = None) -> dict:
+    """
+    Fruits that reference their suppliers and nutrition record by id, with
+    each related record listed once in an id-keyed map.
+    """
+    columns = set(FRUIT_COLUMN_FIELDS) if fields is None else fields & set(FRUIT_COLUMN_FIELDS)
+    body = {"fruits": []}
+    if fields is None or "suppliers" in fields:
+        body["suppliers"] = {}
+    if fields is None or "nutritional_info" in fields:
+        body["nutritional_info"] = {}
+    for fruit in fruits:
+        data = _serialize_fruit_details(fruit, columns)
+        if "suppliers" in body:
+            data["supplier_ids"] = [supplier.id for supplier in fruit.suppliers]
+            for supplier in fruit.suppliers:
+                if supplier.id not in body["suppliers"]:
+                    body["suppliers"][supplier.id] = _serialize_supplier(supplier)
+        if "nutritional_info" in body:
+            nutrition = fruit.nutritional_info
+            data["nutritional_info_id"] = nutrition.id if nutrition else None
+            if nutrition:
+                body["nutritional_info"][nutrition.id] = _serialize_nutrition(nutrition)
+        body["fruits"].append(data)
+    return body
+
+def _detail_load_options(requested: Optional[set]) -> dict:
+    return {
+        "columns": None if requested is None else [
+            getattr(Fruit, name) for name in FRUIT_COLUMN_FIELDS if name in requested
+        ],
+        "suppliers": requested is None or "suppliers" in requested,
+        "nutritional_info": requested is None or "nutritional_info" in requested,
+    }
+
+def _stream_all_data(db: Session, requested: Optional[set], headers, **query) -> StreamingResponse:
+    counts = get_catalogue_counts(db)
+    headers = {
+        **headers,
+        "X-Total-Fruits": str(counts["total_fruits"]),
+        "X-Total-Suppliers": str(counts["total_suppliers"]),
+        "X-Total-Nutritional-Records": str(counts["total_nutritional_records"]),
+    }
+    # Remove the length computed for the empty default response
+    headers.pop("content-length", None)
+
+    # The stream runs a supplier query per chunk, so the route's budget
+    # cannot apply to it
+    set_query_budget(None)
+
+    def generate():
+        # The get_db dependency has already closed the session by the time the
+        # body is sent; it reconnects on first use, so close it again when done
+        try:
+            for fruits in iter_fruits_with_relations(
+                db,
+                chunk_size=settings.STREAM_CHUNK_SIZE,
+                **query,
+                **_detail_load_options(requested)
+            ):
+                yield b"".join(dumps(_serialize_fruit_details(fruit, requested)) + b"\n" for fruit in fruits)
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+@router.get("/get_all_data", dependencies=[Depends(query_budget(5))])
+def get_all_data(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    stream: bool = False,
+    shape: str = Query("nested", pattern="^(nested|normalized)$"),
+    sort: str = DEFAULT_SORT,
+    filters: FruitFilters = Depends(catalogue_filters),
+    db: Session = Depends(get_db)
+):
     """
     Get all data from the database including fruits, nutritional info, and suppliers.
+
+    Supports the same ``limit``/``after`` keyset pagination as ``/fruits``,
+    with the next cursor also returned as ``next_cursor``. ``fields`` restricts
+    each fruit to a comma separated subset of its attributes. The filters and
+    ``sort`` of ``/fruits`` apply as well; the totals always describe the whole
+    catalogue.
+
+    With ``shape=normalized`` suppliers and nutrition records are returned
+    once in ``suppliers`` and ``nutritional_info`` maps keyed by id, and each
+    fruit carries ``supplier_ids`` and ``nutritional_info_id`` instead.
+
+    With ``stream=true`` or ``Accept: application/x-ndjson`` the fruits are
+    streamed as NDJSON, one fruit per line, and the totals are returned in
+    ``X-Total-*`` headers. Streams are always nested.
+
+    ``change_token`` is the ``/changes`` token to sync this snapshot from.
     """
+    sort = _parse_sort(sort)
+    after = _parse_cursor(after, sort)
+    requested = _parse_fields(fields, FRUIT_DETAIL_FIELDS)
+    query = {"limit": limit, "after": after, "filters": filters, "sort": sort}
+
+    ndjson = stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+    media_type = NDJSON_MEDIA_TYPE if ndjson else "application/json"
+
     try:
-        # Only initialize data if not in testing mode
-        if os.getenv("TESTING") != "true":
-            init_data(db)
-        
-        # Get all fruits with their nutritional info and suppliers
-        fruits = db.query(Fruit).all()
-        nutritional_info = db.query(NutritionalInfo).all()
-        suppliers = db.query(Supplier).all()
+        not_modified = _check_catalogue_version(request, response, db, media_type)
+        if not_modified:
+            return not_modified
+
+        if ndjson:
+            return _stream_all_data(db, requested, response.headers, **query)
+
+        def build():
+            # Read before the fruits: a change landing in between is sent
+            # again by /changes, never missed
+            change_token = get_change_token(db)
+            # Fruits come with nutritional info and suppliers eagerly loaded,
+            # totals are computed with COUNT(*) instead of loading every row
+            fruits, next_cursor = get_fruits_with_relations(db, **query, **_detail_load_options(requested))
+            counts = get_catalogue_counts(db)
+            if shape == "normalized":
+                body = _serialize_normalized(fruits, requested)
+            else:
+                body = {"fruits": [_serialize_fruit_details(fruit, requested) for fruit in fruits]}
+            return {
+                **body,
+                **counts,
+                "change_token": change_token,
+                "next_cursor": _next_cursor(next_cursor, sort)
+            }
+
+        data = _cached(request, build, media_type)
+        if data["next_cursor"]:
+            response.headers["X-Next-Cursor"] = data["next_cursor"]
+        return _json_response(data, response)
+    except (HTTPException, QueryBudgetExceeded):
+        raise
+    except Exception:
+        # Driver messages describe the schema and the query, keep them in the log
+        logger.exception("Failed to load all data")
+        raise HTTPException(status_code=500, detail="Failed to load all data")
+
+@router.get(
+    "/fruits/{fruit_id}/complete",
+    response_model=FruitCompleteSchema,
+    dependencies=[Depends(query_budget(2))]
+)
+def get_fruit_complete_details(
+    request: Request,
+    response: Response,
+    fruit_id: int = Path(..., ge=1, le=MAX_ID),
+    db: Session = Depends(get_db)
+):
+    """
+    Get a fruit with its nutritional info and suppliers.
+
+    Costs two queries, the fruit joined with its nutritional info and one
+    batched query for its suppliers.
+    """
+    def build():
+        fruit = get_fruit_complete(db, fruit_id)
+        if not fruit:
+            raise HTTPException(status_code=404, detail="Fruit not found")
+        if not fruit.nutritional_info:
+            raise HTTPException(status_code=404, detail="Nutritional info not found")
+        data = _serialize_fruit_details(fruit)
+        data["nutritional_info"]["fruit_id"] = fruit.id
+        data["created_at"] = fruit.created_at.isoformat() if fruit.created_at else None
+        data["updated_at"] = fruit.updated_at.isoformat() if fruit.updated_at else None
+        return data
+
+    return _json_response(_cached(request, build), response)
+
+@router.get("/suppliers", response_model=List[SupplierSchema], dependencies=[Depends(query_budget(1))])
+def list_suppliers(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get suppliers in id order, paginated like ``/fruits``.
+    """
+    after = _parse_cursor(after, DEFAULT_SORT)
+
+    def build():
+        suppliers, next_cursor = get_suppliers(db, limit=limit, after=after)
+        return {
+            "items": [_serialize_supplier(supplier) for supplier in suppliers],
+            "next_cursor": _next_cursor(next_cursor, DEFAULT_SORT)
+        }
+
+    page = _cached(request, build)
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    return _json_response(page["items"], response)
+
+@router.get(
+    "/suppliers/{supplier_id}", response_model=SupplierSchema, dependencies=[Depends(query_budget(1))]
+)
+def get_supplier(
+    request: Request,
+    response: Response,
+    supplier_id: int = Path(..., ge=1, le=MAX_ID),
+    db: Session = Depends(get_db)
+):
+    """
+    Get a specific supplier by ID.
+    """
+    def build():
+        supplier = db.get(Supplier, supplier_id)
+        if not supplier:
+            raise HTTPException(status_code=404, detail="Supplier not found")
+        return _serialize_supplier(supplier)
+
+    return _json_response(_cached(request, build), response)
 
+@router.get("/suppliers/{supplier_id}/fruits", dependencies=[Depends(query_budget(3))])
+def get_supplier_fruits(
+    request: Request,
+    response: Response,
+    supplier_id: int = Path(..., ge=1, le=MAX_ID),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    sort: str = DEFAULT_SORT,
+    filters: FruitFilters = Depends(fruit_filters),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the fruits of a supplier with their nutritional info and suppliers.
+
+    Fruits are looked up through the supplier index of ``fruit_suppliers``
+    and their suppliers are selectin-loaded, so a page costs the same number
+    of queries whatever its size. Pagination, ``fields``, ``sort`` and the
+    filters work as in ``/get_all_data``.
+    """
+    sort = _parse_sort(sort)
+    after = _parse_cursor(after, sort)
+    requested = _parse_fields(fields, FRUIT_DETAIL_FIELDS)
+
+    def build():
+        if not db.get(Supplier, supplier_id):
+            raise HTTPException(status_code=404, detail="Supplier not found")
+        fruits, next_cursor = get_fruits_with_relations(
+            db,
+            limit=limit,
+            after=after,
+            filters=replace(filters, supplier_id=supplier_id),
+            sort=sort,
+            **_detail_load_options(requested)
+        )
         return {
-            "fruits": [
-                {
-                    "id": fruit.id,
-                    "name": fruit.name,
-                    "color": fruit.color,
-                    "taste": fruit.taste,
-                    "origin_country": fruit.origin_country,
-                    "price_per_kg": float(fruit.price_per_kg) if fruit.price_per_kg else None,
-                    "suppliers": [
-                        {
-                            "id": supplier.id,
-                            "name": supplier.name,
-                            "contact_email": supplier.contact_email,
-                            "country": supplier.country,
-                            "rating": float(supplier.rating) if supplier.rating else None
-                        }
-                        for supplier in fruit.suppliers
-                    ],
-                    "nutritional_info": {
-                        "id": fruit.nutritional_info.id if fruit.nutritional_info else None,
-                        "calories": fruit.nutritional_info.calories if fruit.nutritional_info else None,
-                        "carbohydrates": fruit.nutritional_info.carbohydrates if fruit.nutritional_info else None,
-                        "protein": fruit.nutritional_info.protein if fruit.nutritional_info else None,
-                        "fat": fruit.nutritional_info.fat if fruit.nutritional_info else None,
-                        "fiber": fruit.nutritional_info.fiber if fruit.nutritional_info else None,
-                        "vitamins": fruit.nutritional_info.vitamins if fruit.nutritional_info else None
-                    } if fruit.nutritional_info else None
-                }
-                for fruit in fruits
-            ],
-            "total_fruits": len(fruits),
-            "total_suppliers": len(suppliers),
-            "total_nutritional_records": len(nutritional_info)
+            "items": [_serialize_fruit_details(fruit, requested) for fruit in fruits],
+            "next_cursor": _next_cursor(next_cursor, sort)
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+
+    page = _cached(request, build)
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    return _json_response(page["items"], response)
+
+@router.get("/stats", dependencies=[Depends(query_budget(1))])
+def get_stats(db: Session = Depends(get_db)):
+    """
+    Get catalogue statistics: average price per kg by origin country and by
+    color, the supplier rating distribution and nutrition totals.
+
+    Read from the summary table kept up to date on every write, with a
+    single query whatever the catalogue size.
+    """
+    return FastJSONResponse(catalogue_stats(stored_aggregates(db.connection())))
+
+@router.post("/fruits:batchGet")
+def batch_get_fruits(batch: FruitBatchGet, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Get many fruits by ID in one request.
+
+    Returns the fruits in the order of ``ids``, duplicates removed, in the
+    ``/get_all_data`` format, and the ids that do not exist in ``missing``.
+    ``fields`` selects the attributes; leaving out ``suppliers`` and
+    ``nutritional_info`` skips loading them. The ids are resolved with
+    ``IN`` queries of ``BATCH_GET_CHUNK_SIZE`` ids.
+    """
+    requested = _parse_fields(fields, FRUIT_DETAIL_FIELDS)
+    ids = list(dict.fromkeys(batch.ids))
+    chunk_size = settings.BATCH_GET_CHUNK_SIZE
+    # A fruit query and a supplier query per chunk
+    set_query_budget(2 * -(-len(ids) // chunk_size))
+
+    fruits = get_fruits_by_ids(db, ids, chunk_size=chunk_size, **_detail_load_options(requested))
+    return FastJSONResponse({
+        "fruits": [_serialize_fruit_details(fruits[i], requested) for i in ids if i in fruits],
+        "missing": [i for i in ids if i not in fruits],
+    })
+
+@router.get("/changes", dependencies=[Depends(query_budget(6))])
+def get_changes_feed(
+    since: int = Query(0, ge=0, le=MAX_ID),
+    limit: int = Query(MAX_CHANGES_PAGE_SIZE, ge=1, le=MAX_CHANGES_PAGE_SIZE),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the fruits, suppliers and nutrition records changed since a token.
+
+    Every insert, update and delete is recorded in the change log, whose
+    ids are the tokens. Each changed row is returned once with its current
+    state, or as a ``delete`` tombstone without ``data`` when it no longer
+    exists. Fruits are in the ``/get_all_data`` format plus ``updated_at``;
+    a change to a fruit's supplier links is a change of the fruit.
+
+    Start from ``since=0`` or the ``change_token`` of ``/get_all_data`` and
+    pass ``next_since`` back until ``has_more`` is false.
+    On MySQL, entries of concurrent transactions can commit out of id order,
+    so clients should overlap their token by a few entries. Entries older
+    than ``CHANGE_LOG_RETENTION_DAYS`` are pruned; a token pointing before
+    them, or past the latest entry, gets 410 and the client has to reload
+    ``/get_all_data``.
+    """
+    try:
+        changes, next_since, has_more = get_changes(db, since, limit)
+    except ChangeTokenExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    rows = get_changed_rows(db, changes, chunk_size=MAX_CHANGES_PAGE_SIZE)
+
+    items = []
+    for change in changes:
+        row = rows[change.entity].get(change.entity_id)
+        item = {"entity": change.entity, "id": change.entity_id}
+        if row is None:
+            item["operation"] = "delete"
+        elif change.entity == "fruit":
+            data = _serialize_fruit_details(row)
+            data["updated_at"] = row.updated_at.isoformat() if row.updated_at else None
+            item.update(operation="upsert", data=data)
+        elif change.entity == "supplier":
+            item.update(operation="upsert", data=_serialize_supplier(row))
+        else:
+            item.update(operation="upsert", data={**_serialize_nutrition(row), "fruit_id": row.fruit_id})
+        items.append(item)
+    return FastJSONResponse({"changes": items, "next_since": next_since, "has_more": has_more})
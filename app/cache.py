@@ -0,0 +1,196 @@
+"""
+Read-through response cache for the catalogue endpoints.
+
+Entries are grouped in namespaces. A namespace is invalidated by bumping its
+version counter, which makes every key written under the previous version
+unreachable; stale entries then age out through TTL/LRU eviction. This keeps
+invalidation O(1) on every backend.
+"""
+import json
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+from app.config import settings
+from app.metrics import CACHE_REQUESTS
+
+
+class CacheBackend(ABC):
+    """
+    Minimal key/value interface the response cache needs.
+    """
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    def get_counter(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class NullCache(CacheBackend):
+    """
+    Backend that stores nothing, used when caching is disabled.
+    """
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def get_counter(self, key):
+        return 0
+
+    def incr(self, key):
+        return 0
+
+    def clear(self):
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """
+    In-process cache with per-entry TTL and LRU eviction.
+
+    Each worker process has its own copy, so a write in one worker only
+    invalidates that worker's entries; the TTL bounds staleness elsewhere.
+    """
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # Version counters live outside the LRU so they are never evicted
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache shared by all workers and instances, stored in Redis.
+
+    Values are stored as JSON. ``client`` may be any object with the redis-py
+    ``get``/``set``/``incr``/``scan_iter``/``delete`` methods.
+    """
+    def __init__(self, url: Optional[str] = None, client=None, prefix: str = "fruits-api:"):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("CACHE_BACKEND=redis requires the redis package") from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    def get_counter(self, key):
+        raw = self.client.get(self.prefix + key)
+        return 0 if raw is None else int(raw)
+
+    def incr(self, key):
+        return int(self.client.incr(self.prefix + key))
+
+    def clear(self):
+        # Only remove this application's keys, the Redis database may be shared
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class ResponseCache:
+    """
+    Namespaced read-through cache with hit/miss accounting.
+    """
+    def __init__(self, backend: CacheBackend, ttl: int = 60):
+        self.backend = backend
+        self.ttl = ttl
+
+    def _versioned_key(self, namespace: str, key: str) -> str:
+        version = self.backend.get_counter(f"{namespace}:version")
+        return f"{namespace}:v{version}:{key}"
+
+    def get_or_set(self, namespace: str, key: str, build: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, building and storing it on a miss.
+
+        Exceptions raised by ``build`` propagate and nothing is cached.
+        """
+        full_key = self._versioned_key(namespace, key)
+        value = self.backend.get(full_key)
+        if value is not None:
+            CACHE_REQUESTS.labels(namespace=namespace, result="hit").inc()
+            return value
+
+        CACHE_REQUESTS.labels(namespace=namespace, result="miss").inc()
+        value = build()
+        self.backend.set(full_key, value, self.ttl)
+        return value
+
+    def invalidate(self, namespace: str) -> None:
+        self.backend.incr(f"{namespace}:version")
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+def build_backend(name: str) -> CacheBackend:
+    if name == "memory":
+        return MemoryCache(max_entries=settings.CACHE_MAX_ENTRIES)
+    if name == "redis":
+        return RedisCache(url=settings.REDIS_URL)
+    if name == "none":
+        return NullCache()
+    raise ValueError(f"Unknown CACHE_BACKEND: {name}")
+
+
+response_cache = ResponseCache(build_backend(settings.CACHE_BACKEND), ttl=settings.CACHE_TTL_SECONDS)
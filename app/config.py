@@ -1,12 +1,113 @@
 from pydantic_settings import BaseSettings
 from typing import Optional
+import multiprocessing
 
 class Settings(BaseSettings):
-    # Database settings
-    MYSQL_USER: str
-    MYSQL_PASSWORD: str
-    MYSQL_HOST: str
-    MYSQL_DATABASE: str
+    # Database settings. Any DATABASE_URL other than SQLite selects MySQL,
+    # configured through the MYSQL_* settings
+    DATABASE_URL: str = "sqlite:///./fruits.db"
+    MYSQL_USER: Optional[str] = None
+    MYSQL_PASSWORD: Optional[str] = None
+    MYSQL_HOST: Optional[str] = None
+    MYSQL_DATABASE: Optional[str] = None
+
+    # SQLite file databases, applied to every connection. Writes go through a
+    # single connection per worker, reads through a pool of this many
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 20000
+    SQLITE_MMAP_SIZE: int = 268435456
+    SQLITE_READ_POOL_SIZE: int = 8
+
+    # Startup waits for the database, retrying with exponential backoff
+    DB_CONNECT_RETRIES: int = 5
+    DB_CONNECT_BACKOFF: float = 0.5
+    DB_CONNECT_BACKOFF_MAX: float = 10.0
+
+    # /health/ready: latency budget of the database check and how long its
+    # result is reused
+    HEALTH_CHECK_TIMEOUT: float = 1.0
+    HEALTH_CHECK_CACHE_SECONDS: float = 2.0
+
+    # SQL statements slower than this are logged, with their bound parameters
+    # only if SLOW_QUERY_LOG_PARAMETERS is set as they can hold user data.
+    # With QUERY_BUDGET_STRICT, requests running more statements than their
+    # route declares with query_budget fail (the tests enable it)
+    SLOW_QUERY_MS: float = 200.0
+    SLOW_QUERY_LOG_PARAMETERS: bool = False
+    QUERY_BUDGET_STRICT: bool = False
+    # Send database time and statement count in a Server-Timing header
+    SERVER_TIMING: bool = True
+
+    # Logging, configured once by app.log.configure_logging. LOG_FORMAT is
+    # "json" (one object per line) or "text". Successful requests are
+    # access-logged with probability ACCESS_LOG_SAMPLE_RATE, errors and
+    # requests slower than ACCESS_LOG_SLOW_MS always
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    ACCESS_LOG: bool = True
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0
+    ACCESS_LOG_SLOW_MS: float = 1000.0
+
+    # Admission control per worker, see app.admission. Each route class runs
+    # at most LIMIT requests at a time and queues up to QUEUE more for
+    # ADMISSION_QUEUE_TIMEOUT seconds; the rest get 503 with Retry-After
+    ADMISSION_CONTROL: bool = True
+    ADMISSION_LIGHT_LIMIT: int = 32
+    ADMISSION_LIGHT_QUEUE: int = 64
+    ADMISSION_HEAVY_LIMIT: int = 2
+    ADMISSION_HEAVY_QUEUE: int = 8
+    ADMISSION_QUEUE_TIMEOUT: float = 2.0
+    ADMISSION_RETRY_AFTER: int = 1
+    # Token bucket per client address, 0 disables it. Set the number of
+    # proxies appending to X-Forwarded-For (1 on Azure App Service)
+    RATE_LIMIT_PER_SECOND: float = 0
+    RATE_LIMIT_BURST: int = 20
+    RATE_LIMIT_TRUSTED_PROXIES: int = 0
+
+    # Apply pending Alembic migrations when the app starts
+    RUN_MIGRATIONS_ON_STARTUP: bool = True
+
+    # Days of change_log entries kept for /api/v1/changes, 0 keeps them all.
+    # Pruned at startup and by python -m app.retention
+    CHANGE_LOG_RETENTION_DAYS: int = 30
+
+    # Connection pool settings. When DB_POOL_SIZE/DB_MAX_OVERFLOW are not set
+    # they are derived from DB_CONNECTION_BUDGET, the number of connections
+    # all workers together may open, divided by WEB_CONCURRENCY.
+    DB_POOL_SIZE: Optional[int] = None
+    DB_MAX_OVERFLOW: Optional[int] = None
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_CONNECTION_BUDGET: int = 100
+
+    # Response cache: "memory" (per worker), "redis" (shared) or "none"
+    CACHE_BACKEND: str = "memory"
+    CACHE_TTL_SECONDS: int = 60
+    CACHE_MAX_ENTRIES: int = 1024
+    REDIS_URL: Optional[str] = None
+
+    # Rows per transaction for POST /api/v1/fruits/bulk
+    BULK_INSERT_BATCH_SIZE: int = 1000
+
+    # Fruits fetched per round trip when streaming get_all_data
+    STREAM_CHUNK_SIZE: int = 500
+
+    # Ids per IN query for POST /api/v1/fruits:batchGet
+    BATCH_GET_CHUNK_SIZE: int = 500
+
+    # Responses smaller than this many bytes are not compressed
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # max-age sent with ETag/Last-Modified validated responses
+    HTTP_CACHE_MAX_AGE: int = 0
+
+    # Number of gunicorn workers, same default as gunicorn.conf.py
+    WEB_CONCURRENCY: int = multiprocessing.cpu_count() * 2 + 1
     
     # Application settings
     APP_NAME: str = "Fruits API"
@@ -24,5 +125,6 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
         case_sensitive = True
+        extra = "ignore"
 
-settings = Settings() 
\ No newline at end of file
+settings = Settings()
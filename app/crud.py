@@ -0,0 +1,388 @@
+"""
+Data-access helpers shared by the API routes.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import and_, func, insert, or_, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session, joinedload, load_only, selectinload
+from app.aggregates import record_inserted
+from app.models import ChangeLog, Fruit, NutritionalInfo, Supplier, FruitSupplier
+from app.pagination import DEFAULT_SORT, Cursor
+from app.retention import ChangeTokenExpired
+from app.search import name_search_condition
+
+# Indexed columns a listing can be sorted on
+SORT_COLUMNS = {
+    "id": Fruit.id,
+    "name": Fruit.name,
+    "color": Fruit.color,
+    "origin_country": Fruit.origin_country,
+    "price_per_kg": Fruit.price_per_kg,
+}
+
+# Change log entries counted into the catalogue version
+RECENT_CHANGES = 1000
+
+
+@dataclass
+class FruitFilters:
+    """
+    Optional narrowing of a fruit listing, every set field must match.
+    """
+    color: Optional[str] = None
+    taste: Optional[str] = None
+    origin_country: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    supplier_id: Optional[int] = None
+    min_calories: Optional[int] = None
+    max_calories: Optional[int] = None
+    q: Optional[str] = None
+
+
+def _filter_fruits(query, db: Session, filters: Optional[FruitFilters]):
+    if filters is None:
+        return query
+    conditions = []
+    for name in ("color", "taste", "origin_country"):
+        value = getattr(filters, name)
+        if value is not None:
+            conditions.append(getattr(Fruit, name) == value)
+    if filters.min_price is not None:
+        conditions.append(Fruit.price_per_kg >= filters.min_price)
+    if filters.max_price is not None:
+        conditions.append(Fruit.price_per_kg <= filters.max_price)
+    if filters.supplier_id is not None:
+        conditions.append(Fruit.id.in_(
+            select(FruitSupplier.fruit_id).where(FruitSupplier.supplier_id == filters.supplier_id)
+        ))
+    if filters.min_calories is not None or filters.max_calories is not None:
+        calories = select(NutritionalInfo.fruit_id)
+        if filters.min_calories is not None:
+            calories = calories.where(NutritionalInfo.calories >= filters.min_calories)
+        if filters.max_calories is not None:
+            calories = calories.where(NutritionalInfo.calories <= filters.max_calories)
+        conditions.append(Fruit.id.in_(calories))
+    if filters.q is not None:
+        conditions.append(name_search_condition(db.get_bind().dialect.name, filters.q))
+    return query.where(*conditions) if conditions else query
+
+
+def _split_sort(sort: str) -> Tuple[str, bool]:
+    return sort.lstrip("-"), sort.startswith("-")
+
+
+def _after_cursor(column, descending: bool, after: Cursor):
+    # Rows that follow the cursor in (column, id) order. Both SQLite and MySQL
+    # sort NULLs first, so they lead an ascending page and trail a descending one
+    tie = Fruit.id < after.id if descending else Fruit.id > after.id
+    if column is Fruit.id:
+        return tie
+    if after.value is None:
+        same = and_(column.is_(None), tie)
+        return same if descending else or_(same, column.is_not(None))
+    beyond = column < after.value if descending else column > after.value
+    condition = or_(beyond, and_(column == after.value, tie))
+    return or_(condition, column.is_(None)) if descending else condition
+
+
+def _keyset(query, limit: Optional[int], after: Optional[Cursor], sort: str = DEFAULT_SORT):
+    name, descending = _split_sort(sort)
+    column = SORT_COLUMNS[name]
+    if after is not None:
+        query = query.where(_after_cursor(column, descending, after))
+    order = [column] if column is Fruit.id else [column, Fruit.id]
+    query = query.order_by(*(c.desc() for c in order) if descending else order)
+    if limit is not None:
+        # Fetch one extra row to know whether another page exists
+        query = query.limit(limit + 1)
+    return query
+
+
+def _split_page(rows: list, limit: Optional[int], sort_key) -> Tuple[list, Optional[Cursor]]:
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, Cursor(rows[-1].id, sort_key(rows[-1]))
+
+
+def get_fruit_rows(
+    db: Session,
+    columns: Iterable,
+    limit: Optional[int] = None,
+    after: Optional[Cursor] = None,
+    filters: Optional[FruitFilters] = None,
+    sort: str = DEFAULT_SORT,
+) -> Tuple[List[dict], Optional[Cursor]]:
+    """
+    Select only the given Fruit columns, one keyset page at a time.
+
+    Returns the rows as dicts and the cursor of the last row when there is a
+    next page.
+    """
+    # The sort column is read back for the cursor even when not requested
+    sort_column = SORT_COLUMNS[_split_sort(sort)[0]].label("sort_key")
+    query = db.query(Fruit.id, *columns, sort_column)
+    query = _keyset(_filter_fruits(query, db, filters), limit, after, sort)
+    rows, next_cursor = _split_page(query.all(), limit, lambda row: row.sort_key)
+    return [
+        {key: value for key, value in row._asdict().items() if key != "sort_key"}
+        for row in rows
+    ], next_cursor
+
+
+def _fruit_detail_options(columns: Optional[Iterable], suppliers: bool, nutritional_info: bool) -> list:
+    options = []
+    if columns is not None:
+        options.append(load_only(Fruit.id, *columns))
+    if nutritional_info:
+        options.append(joinedload(Fruit.nutritional_info))
+    if suppliers:
+        options.append(selectinload(Fruit.suppliers))
+    return options
+
+
+def get_fruits_with_relations(
+    db: Session,
+    limit: Optional[int] = None,
+    after: Optional[Cursor] = None,
+    columns: Optional[Iterable] = None,
+    suppliers: bool = True,
+    nutritional_info: bool = True,
+    filters: Optional[FruitFilters] = None,
+    sort: str = DEFAULT_SORT,
+) -> Tuple[List[Fruit], Optional[Cursor]]:
+    """
+    Load fruits together with their nutritional info and suppliers.
+
+    Nutritional info is one-to-one and is joined into the fruit query, while
+    suppliers are fetched in a single batched SELECT ... IN query, so the
+    number of statements does not depend on the number of fruits. ``columns``
+    restricts the Fruit columns that are loaded.
+    """
+    name = _split_sort(sort)[0]
+    if columns is not None:
+        # Keep the sort column loaded, the cursor is built from it
+        columns = [*columns, SORT_COLUMNS[name]]
+    options = _fruit_detail_options(columns, suppliers, nutritional_info)
+    query = _filter_fruits(db.query(Fruit).options(*options), db, filters)
+    query = _keyset(query, limit, after, sort)
+    return _split_page(query.all(), limit, lambda fruit: getattr(fruit, name))
+
+
+def iter_fruits_with_relations(
+    db: Session,
+    chunk_size: int = 500,
+    limit: Optional[int] = None,
+    after: Optional[Cursor] = None,
+    columns: Optional[Iterable] = None,
+    suppliers: bool = True,
+    nutritional_info: bool = True,
+    filters: Optional[FruitFilters] = None,
+    sort: str = DEFAULT_SORT,
+) -> Iterator[List[Fruit]]:
+    """
+    Yield fruits with their relationships in chunks of ``chunk_size``.
+
+    Rows are fetched with ``yield_per`` and suppliers are selectin-loaded per
+    chunk. Fruits and their nutrition records are expunged from the session
+    once the caller has consumed a chunk, so memory use does not grow with
+    the catalogue size. Suppliers are shared between chunks and stay.
+    """
+    stmt = (
+        select(Fruit)
+        .options(*_fruit_detail_options(columns, suppliers, nutritional_info))
+        .execution_options(yield_per=chunk_size)
+    )
+    stmt = _keyset(_filter_fruits(stmt, db, filters), None, after, sort)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    for fruits in db.execute(stmt).scalars().partitions():
+        yield fruits
+        for fruit in fruits:
+            if nutritional_info and fruit.nutritional_info is not None:
+                db.expunge(fruit.nutritional_info)
+            db.expunge(fruit)
+
+
+def get_fruit_complete(db: Session, fruit_id: int) -> Optional[Fruit]:
+    """
+    Load one fruit with its nutritional info joined in and its suppliers
+    selectin-loaded, two statements whatever the number of suppliers.
+    """
+    return (
+        db.query(Fruit)
+        .options(joinedload(Fruit.nutritional_info), selectinload(Fruit.suppliers))
+        .filter(Fruit.id == fruit_id)
+        .first()
+    )
+
+
+def get_fruits_by_ids(
+    db: Session,
+    ids: List[int],
+    chunk_size: int = 500,
+    columns: Optional[Iterable] = None,
+    suppliers: bool = True,
+    nutritional_info: bool = True,
+) -> Dict[int, Fruit]:
+    """
+    Load the fruits with the given ids, keyed by id; unknown ids are left out.
+
+    Ids are looked up ``chunk_size`` at a time with ``WHERE id IN (...)``,
+    with the relationships loaded as in ``get_fruits_with_relations``, so the
+    number of statements grows with the number of chunks only.
+    """
+    options = _fruit_detail_options(columns, suppliers, nutritional_info)
+    fruits = {}
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        for fruit in db.query(Fruit).options(*options).filter(Fruit.id.in_(chunk)):
+            fruits[fruit.id] = fruit
+    return fruits
+
+
+def get_suppliers(
+    db: Session, limit: Optional[int] = None, after: Optional[Cursor] = None
+) -> Tuple[List[Supplier], Optional[Cursor]]:
+    """
+    Suppliers in id order, one keyset page at a time.
+    """
+    query = db.query(Supplier)
+    if after is not None:
+        query = query.filter(Supplier.id > after.id)
+    query = query.order_by(Supplier.id)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return _split_page(query.all(), limit, lambda supplier: None)
+
+
+def get_catalogue_counts(db: Session) -> dict:
+    """
+    Count fruits, suppliers and nutritional records in one round trip.
+    """
+    row = db.execute(
+        select(
+            select(func.count(Fruit.id)).scalar_subquery().label("total_fruits"),
+            select(func.count(Supplier.id)).scalar_subquery().label("total_suppliers"),
+            select(func.count(NutritionalInfo.id)).scalar_subquery().label("total_nutritional_records"),
+        )
+    ).one()
+    return dict(row._mapping)
+
+
+def get_catalogue_version(db: Session) -> dict:
+    """
+    Cheap table-level version of the catalogue, used to build ETags.
+
+    Every write to fruits, suppliers, nutrition records and supplier links
+    adds a change log entry, so the latest entry versions them all.
+    """
+    latest = select(func.max(ChangeLog.id)).scalar_subquery()
+    row = db.execute(
+        select(
+            latest.label("change_token"),
+            select(func.max(ChangeLog.changed_at)).scalar_subquery().label("last_modified"),
+            # On MySQL an entry can commit behind the latest id; counting the
+            # recent entries picks it up without scanning the whole log
+            select(func.count())
+            .where(ChangeLog.id > latest - RECENT_CHANGES)
+            .scalar_subquery()
+            .label("recent_changes"),
+        )
+    ).one()
+    version = dict(row._mapping)
+    if version["last_modified"] is not None:
+        version["last_modified"] = version["last_modified"].isoformat()
+    return version
+
+
+def get_change_token(db: Session) -> int:
+    """
+    The id of the latest change log entry, 0 for an empty log.
+    """
+    return db.execute(select(func.coalesce(func.max(ChangeLog.id), 0))).scalar_one()
+
+
+def get_changes(db: Session, since: int, limit: int) -> Tuple[List[ChangeLog], int, bool]:
+    """
+    Read up to ``limit`` change log entries after the token ``since``.
+
+    Only the latest entry of each row is kept, in log order. Returns the
+    entries, the token to resume from and whether more entries follow.
+    Raises ChangeTokenExpired when entries after ``since`` may have been
+    pruned, or when ``since`` is newer than the latest entry.
+    """
+    entries = (
+        db.query(ChangeLog)
+        .filter(ChangeLog.id > since)
+        .order_by(ChangeLog.id)
+        .limit(limit + 1)
+        .all()
+    )
+    # Pruning deletes the start of the log: a gap after the token with no
+    # entry left at or before it means entries were lost. Ids skipped by
+    # rolled back inserts look the same and only cost a needless reload
+    if entries and entries[0].id > since + 1:
+        if db.execute(select(ChangeLog.id).where(ChangeLog.id <= since).limit(1)).first() is None:
+            raise ChangeTokenExpired(f"Change token {since} has expired, reload /get_all_data")
+    elif not entries and since > 0 and since > get_change_token(db):
+        # Issued by another database or before a backup was restored
+        raise ChangeTokenExpired(f"Change token {since} is unknown, reload /get_all_data")
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    latest = {}
+    for entry in entries:
+        key = (entry.entity, entry.entity_id)
+        latest.pop(key, None)
+        latest[key] = entry
+    return list(latest.values()), entries[-1].id if entries else since, has_more
+
+
+def get_changed_rows(db: Session, changes: List[ChangeLog], chunk_size: int = 500) -> Dict[str, dict]:
+    """
+    Load the current state of the rows named by change log entries, keyed by
+    entity and id. Rows that no longer exist are left out.
+    """
+    ids = defaultdict(list)
+    for change in changes:
+        ids[change.entity].append(change.entity_id)
+    rows = {"fruit": {}, "supplier": {}, "nutritional_info": {}}
+    if ids["fruit"]:
+        rows["fruit"] = get_fruits_by_ids(db, ids["fruit"], chunk_size=chunk_size)
+    for entity, model in (("supplier", Supplier), ("nutritional_info", NutritionalInfo)):
+        if ids[entity]:
+            rows[entity] = {row.id: row for row in db.query(model).filter(model.id.in_(ids[entity]))}
+    return rows
+
+
+def insert_fruit_batch(db: Session, rows: List[Tuple[int, dict]]) -> List[dict]:
+    """
+    Insert a batch of validated fruit rows with one multi-row INSERT.
+
+    ``rows`` holds (index, values) pairs. If the batch fails as a whole, each
+    row is retried in its own savepoint so a bad row only rejects itself.
+    Returns an error entry for every row that could not be inserted.
+    """
+    if not rows:
+        return []
+    try:
+        db.execute(insert(Fruit), [values for _, values in rows])
+        record_inserted(db.connection(), Fruit, [values for _, values in rows])
+        db.commit()
+        return []
+    except DBAPIError:
+        db.rollback()
+
+    errors = []
+    for index, values in rows:
+        try:
+            with db.begin_nested():
+                db.execute(insert(Fruit), [values])
+                record_inserted(db.connection(), Fruit, [values])
+        except DBAPIError as e:
+            errors.append({"index": index, "detail": str(e.orig)})
+    db.commit()
+    return errors
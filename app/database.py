@@ -1,73 +1,267 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-import os
-from dotenv import load_dotenv
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from typing import List, Optional, Tuple
+from app.config import settings
+from app.metrics import DB_POOL_CHECKOUT_WAIT, instrument_engine
 import logging
-import sys
-
-# Configure logging with more detailed format
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    stream=sys.stdout
-)
+import threading
+import time
+
 logger = logging.getLogger(__name__)
 
-load_dotenv()
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that records how long each checkout waits for a connection,
+    including the time to open a new one when the pool has room to grow.
+    """
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+def per_worker_pool_limits(connection_budget: int, workers: int) -> Tuple[int, int]:
+    """
+    Split a global connection budget between worker processes.
+
+    Returns (pool_size, max_overflow) so that every worker running at its
+    maximum stays within the budget. A third of each worker's share is kept
+    as overflow for bursts.
+    """
+    per_worker = max(1, connection_budget // max(1, workers))
+    max_overflow = per_worker // 3
+    return per_worker - max_overflow, max_overflow
+
+def pool_options() -> dict:
+    """
+    Connection pool arguments for create_engine, taken from settings.
+    """
+    pool_size, max_overflow = per_worker_pool_limits(settings.DB_CONNECTION_BUDGET, settings.WEB_CONCURRENCY)
+    if settings.DB_POOL_SIZE is not None:
+        pool_size = settings.DB_POOL_SIZE
+    if settings.DB_MAX_OVERFLOW is not None:
+        max_overflow = settings.DB_MAX_OVERFLOW
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+def database_url() -> str:
+    """
+    URL of the application database.
+
+    A SQLite DATABASE_URL (the default, for local development) is used as is.
+    Any other value selects MySQL, built from the MYSQL_* settings, which
+    must then all be set; there is no silent fallback to SQLite.
+    """
+    if settings.DATABASE_URL.startswith("sqlite"):
+        return settings.DATABASE_URL
+    required = ["MYSQL_USER", "MYSQL_PASSWORD", "MYSQL_HOST", "MYSQL_DATABASE"]
+    missing = [name for name in required if not getattr(settings, name)]
+    if missing:
+        raise RuntimeError(f"Missing required environment variables: {', '.join(missing)}")
+    return (
+        f"mysql+pymysql://{settings.MYSQL_USER}:{settings.MYSQL_PASSWORD}"
+        f"@{settings.MYSQL_HOST}/{settings.MYSQL_DATABASE}?ssl_ca=None"
+    )
+
+def is_sqlite_file(url: str) -> bool:
+    # In-memory databases are private to each connection and cannot be pooled
+    return url.startswith("sqlite") and make_url(url).database not in (None, "", ":memory:")
 
-# Use SQLite by default for local development
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./fruits.db")
-logger.info(f"Database configuration: URL type: {DATABASE_URL.split(':')[0]}")
+def sqlite_pragmas(read_only: bool = False) -> List[str]:
+    """
+    Pragmas applied to every connection of a file-backed SQLite database.
 
-try:
-    if DATABASE_URL.startswith("sqlite"):
-        logger.info("Using SQLite database")
-        engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    WAL lets readers run while a write is in progress. Readers are also made
+    query-only; journal mode and synchronous only matter to the writer.
+    """
+    pragmas = [
+        f"PRAGMA busy_timeout = {settings.SQLITE_BUSY_TIMEOUT_MS}",
+        # A negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size = -{settings.SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size = {settings.SQLITE_MMAP_SIZE}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
     else:
-        # MySQL configuration for production
-        logger.info("Attempting MySQL database connection")
-        required_env_vars = ["MYSQL_USER", "MYSQL_PASSWORD", "MYSQL_HOST", "MYSQL_DATABASE"]
-        missing_vars = [var for var in required_env_vars if not os.getenv(var)]
-        
-        if missing_vars:
-            logger.error(f"Missing required environment variables: {', '.join(missing_vars)}")
-            logger.info("Available environment variables: " + ", ".join(os.environ.keys()))
-            # Fallback to SQLite if MySQL configuration is incomplete
-            logger.warning("Falling back to SQLite database due to missing MySQL configuration")
-            DATABASE_URL = "sqlite:///./fruits.db"
-            engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-        else:
-            MYSQL_USER = os.getenv("MYSQL_USER")
-            MYSQL_HOST = os.getenv("MYSQL_HOST")
-            MYSQL_DATABASE = os.getenv("MYSQL_DATABASE")
-            logger.info(f"Connecting to MySQL at {MYSQL_HOST}/{MYSQL_DATABASE} with user {MYSQL_USER}")
-            
-            try:
-                DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{os.getenv('MYSQL_PASSWORD')}@{MYSQL_HOST}/{MYSQL_DATABASE}?ssl_ca=None"
-                engine = create_engine(DATABASE_URL)
-                # Test the connection
-                with engine.connect() as conn:
-                    result = conn.execute("SELECT 1")
-                    logger.info("MySQL connection test successful")
-            except Exception as mysql_error:
-                logger.error(f"Failed to connect to MySQL: {str(mysql_error)}")
-                logger.warning("Falling back to SQLite database due to MySQL connection failure")
-                DATABASE_URL = "sqlite:///./fruits.db"
-                engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-
-    # Test the final database connection
-    with engine.connect() as conn:
-        logger.info("Successfully connected to database")
-except Exception as e:
-    logger.error(f"Critical database error: {str(e)}")
-    raise
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        pragmas.append(f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+        pragmas.append(f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}")
+    return pragmas
+
+def create_sqlite_engine(url: str, read_only: bool = False) -> Engine:
+    """
+    Engine for a file-backed SQLite database.
+
+    The write engine holds a single connection per process and starts every
+    transaction with BEGIN IMMEDIATE, so writers queue on the pool within a
+    worker and on busy_timeout across workers instead of failing with
+    "database is locked" when a deferred transaction tries to upgrade its
+    lock. The read engine pools SQLITE_READ_POOL_SIZE query-only connections.
+    """
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000},
+        poolclass=TimedQueuePool,
+        pool_size=settings.SQLITE_READ_POOL_SIZE if read_only else 1,
+        max_overflow=0,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(engine, "connect")
+    def configure(dbapi_connection, connection_record):
+        if not read_only:
+            # Let SQLAlchemy emit BEGIN itself, see the begin listener
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    if not read_only:
+        @event.listens_for(engine, "begin")
+        def begin_immediate(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+def create_db_engine(url: str, read_only: bool = False) -> Engine:
+    if is_sqlite_file(url):
+        logger.info(f"Using SQLite database ({'read' if read_only else 'write'} connections)")
+        return create_sqlite_engine(url, read_only)
+    if url.startswith("sqlite"):
+        logger.info("Using in-memory SQLite database")
+        return create_engine(url, connect_args={"check_same_thread": False})
+    options = pool_options()
+    logger.info(
+        f"Using MySQL at {settings.MYSQL_HOST}/{settings.MYSQL_DATABASE}, pool_size={options['pool_size']}, "
+        f"max_overflow={options['max_overflow']} for {settings.WEB_CONCURRENCY} workers"
+    )
+    return create_engine(url, **options)
+
+_engine: Optional[Engine] = None
+_read_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> Engine:
+    """
+    Return the application engine, creating it on first use.
+
+    Creating the engine does not connect; importing this module is free of
+    database I/O, so workers start quickly and a preloaded gunicorn master
+    holds no connections when it forks.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_db_engine(database_url())
+                instrument_engine(engine, "primary")
+                _engine = engine
+    return _engine
+
+def get_read_engine() -> Engine:
+    """
+    Return the engine for reads: a separate pool of read-only connections
+    for a SQLite file, the application engine otherwise.
+    """
+    global _read_engine
+    url = database_url()
+    if not is_sqlite_file(url):
+        return get_engine()
+    if _read_engine is None:
+        with _engine_lock:
+            if _read_engine is None:
+                engine = create_db_engine(url, read_only=True)
+                instrument_engine(engine, "read")
+                _read_engine = engine
+    return _read_engine
+
+def wait_for_database(engine: Engine, retries: int, backoff: float, max_backoff: float) -> None:
+    """
+    Open a test connection, retrying with exponential backoff.
+
+    Raises the last connection error once ``retries`` retries have failed.
+    """
+    for attempt in range(retries + 1):
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            logger.info("Successfully connected to database")
+            return
+        except OperationalError as e:
+            if attempt == retries:
+                logger.error(f"Could not connect to database after {attempt + 1} attempts: {e}")
+                raise
+            delay = min(max_backoff, backoff * 2 ** attempt)
+            logger.warning(f"Database connection failed (attempt {attempt + 1}), retrying in {delay:.1f}s: {e}")
+            time.sleep(delay)
+
+def init_engine() -> Engine:
+    """
+    Create the engine and wait until the database accepts connections.
+
+    Called from the application lifespan handler.
+    """
+    engine = get_engine()
+    wait_for_database(
+        engine, settings.DB_CONNECT_RETRIES, settings.DB_CONNECT_BACKOFF, settings.DB_CONNECT_BACKOFF_MAX
+    )
+    return engine
+
+def dispose_engine(close: bool = True) -> None:
+    """
+    Drop the pooled connections of the engine, if one was created.
+
+    In a forked worker pass ``close=False``: the inherited connections are
+    discarded without closing sockets the parent process still owns.
+    """
+    for engine in (_engine, _read_engine):
+        if engine is not None:
+            engine.dispose(close=close)
+
+class RoutingSession(Session):
+    """
+    Session sending writes to its bind and other reads to ``read_bind``.
+
+    Once a transaction has written, its reads stay on the bind as well so
+    they see the uncommitted rows.
+    """
+    def __init__(self, *args, read_bind: Optional[Engine] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_bind = read_bind
+        self.writing = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        bind = super().get_bind(mapper, clause=clause, **kw)
+        if self.read_bind is None or self.read_bind is bind:
+            return bind
+        # Textual SQL cannot be told apart from a write, only SELECT
+        # constructs are sent to the read engine
+        if self._flushing or (clause is not None and not clause.is_select):
+            self.writing = True
+        return bind if self.writing else self.read_bind
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _end_writing(session, transaction):
+    if transaction.parent is None:
+        session.writing = False
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
 Base = declarative_base()
 
 def get_db():
-    db = SessionLocal()
+    db = SessionLocal(bind=get_engine(), read_bind=get_read_engine())
     try:
         yield db
     finally:
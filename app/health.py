@@ -0,0 +1,116 @@
+"""
+Liveness and readiness probes.
+
+``/health/live`` only says the process is serving requests; a failing
+liveness probe should restart the instance. ``/health/ready`` checks the
+database through the read engine, so a write in progress does not hold it
+up, and answers 503 when it is unreachable or slower than the probe's
+latency budget; a failing readiness probe should take the instance out of
+the load balancer without restarting it.
+
+The database check runs at most once per ``HEALTH_CHECK_CACHE_SECONDS`` per
+worker, however many probes arrive, so probe storms do not reach MySQL.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from app.config import settings
+from app.database import get_read_engine
+
+router = APIRouter()
+
+
+def pool_status(pool) -> Optional[dict]:
+    """
+    Usage of a QueuePool; saturation is the share of all allowed connections
+    (pool plus overflow) that is checked out.
+    """
+    if not isinstance(pool, QueuePool):
+        return None
+    capacity = pool.size() + max(0, pool._max_overflow)
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "saturation": round(pool.checkedout() / capacity, 3) if pool._max_overflow >= 0 else None,
+    }
+
+
+def _ping(engine: Engine) -> None:
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+class ReadinessProbe:
+    """
+    Database check with a timeout, shared by concurrent probes and cached.
+    """
+    def __init__(self, timeout: float, cache_seconds: float):
+        self.timeout = timeout
+        self.cache_seconds = cache_seconds
+        self._result = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self._result is not None and time.monotonic() - self._checked_at < self.cache_seconds
+
+    async def check(self, engine: Engine) -> dict:
+        if self._fresh():
+            return self._result
+        async with self._lock:
+            # Another probe may have refreshed the result while we waited
+            if not self._fresh():
+                self._result = await self._run(engine)
+                self._checked_at = time.monotonic()
+            return self._result
+
+    async def _run(self, engine: Engine) -> dict:
+        database = {"backend": engine.dialect.name}
+        start = time.perf_counter()
+        try:
+            # A hung connect is abandoned after the timeout, the thread
+            # finishes in the background
+            await asyncio.wait_for(run_in_threadpool(_ping, engine), timeout=self.timeout)
+            database["status"] = "ok"
+        except asyncio.TimeoutError:
+            database["status"] = "timeout"
+            database["detail"] = f"No answer within {self.timeout}s"
+        except Exception as e:
+            database["status"] = "error"
+            database["detail"] = str(e)
+        database["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return {
+            "status": "ready" if database["status"] == "ok" else "unavailable",
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "database": database,
+            "pool": pool_status(engine.pool),
+        }
+
+    def reset(self) -> None:
+        self._result = None
+
+
+readiness_probe = ReadinessProbe(settings.HEALTH_CHECK_TIMEOUT, settings.HEALTH_CHECK_CACHE_SECONDS)
+
+
+@router.get("/health/live")
+async def liveness():
+    return JSONResponse({"status": "alive"}, headers={"Cache-Control": "no-store"})
+
+
+@router.get("/health/ready")
+async def readiness(engine: Engine = Depends(get_read_engine)):
+    result = await readiness_probe.check(engine)
+    return JSONResponse(
+        result,
+        status_code=200 if result["status"] == "ready" else 503,
+        headers={"Cache-Control": "no-store"},
+    )
@@ -0,0 +1,71 @@
+"""
+HTTP validators (ETag, Last-Modified) and conditional GET handling.
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional
+from fastapi import Request, Response
+from app.config import settings
+
+
+def make_etag(*parts) -> str:
+    """
+    Build a strong ETag from JSON serializable parts.
+    """
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Weak comparison of an If-None-Match header against an ETag (RFC 9110).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def http_date(value: Optional[str]) -> Optional[str]:
+    """
+    Format a naive UTC ISO timestamp as an HTTP date.
+    """
+    if not value:
+        return None
+    return format_datetime(datetime.fromisoformat(value).replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def validator_headers(etag: str, last_modified: Optional[str] = None, vary: Optional[str] = None) -> dict:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.HTTP_CACHE_MAX_AGE}, must-revalidate",
+    }
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    if vary:
+        headers["Vary"] = vary
+    return headers
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[str] = None,
+    vary: Optional[str] = None,
+) -> Optional[Response]:
+    """
+    Return a 304 response when the client's copy is current.
+
+    Otherwise the validators are added to ``response`` and None is returned,
+    so the caller goes on to build the full body.
+    """
+    headers = validator_headers(etag, last_modified, vary)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,82 @@
+"""
+Parsing and validation of bulk fruit uploads.
+
+Uploads are either a JSON array or newline delimited JSON (NDJSON). NDJSON
+bodies are parsed incrementally from the request stream, so memory use is
+bounded by the batch size rather than the upload size.
+"""
+import json
+from typing import AsyncIterator, Tuple, Union
+from fastapi import Request
+from pydantic import ValidationError
+from app.schemas import FruitBase
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Union[object, ValueError]]]:
+    """
+    Yield (index, document) for every non-empty line of an NDJSON stream.
+
+    Lines that are not valid JSON are yielded as the ValueError instead of
+    aborting the stream.
+    """
+    index = 0
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield index, _loads(line)
+                index += 1
+    if buffer.strip():
+        yield index, _loads(buffer)
+
+
+class InvalidUpload(ValueError):
+    pass
+
+
+async def iter_documents(request: Request) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Yield (index, document) pairs from a JSON array or NDJSON request body.
+
+    Raises InvalidUpload before yielding anything if a JSON array body cannot
+    be parsed.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_MEDIA_TYPES:
+        async for item in iter_ndjson(request.stream()):
+            yield item
+        return
+
+    try:
+        documents = json.loads(await request.body())
+    except ValueError as e:
+        raise InvalidUpload(f"Invalid JSON: {e}") from e
+    if not isinstance(documents, list):
+        raise InvalidUpload("Expected a JSON array of fruits")
+    for item in enumerate(documents):
+        yield item
+
+
+def _loads(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return ValueError(f"Invalid JSON: {e}")
+
+
+def validate_fruit(document) -> Tuple[dict, list]:
+    """
+    Validate one uploaded document against the FruitBase schema.
+
+    Returns (values, []) on success and (None, errors) otherwise.
+    """
+    if isinstance(document, ValueError):
+        return None, [str(document)]
+    try:
+        return FruitBase.model_validate(document).model_dump(), []
+    except ValidationError as e:
+        return None, e.errors(include_url=False, include_context=False)
@@ -0,0 +1,191 @@
+"""
+Logging setup and the access log.
+
+``configure_logging`` installs a ``QueueHandler`` on the root logger: the
+calling thread only puts the record on an in-memory queue and a
+``QueueListener`` thread formats it and writes it to stdout, so request
+handlers never wait on the pipe to gunicorn or the App Service log
+collector. With ``LOG_FORMAT=json`` every line is a JSON object carrying
+the request id of the request that logged it.
+
+``AccessLogMiddleware`` writes one ``app.access`` record per request with
+its route, status, duration and database time. Successful requests are
+sampled with ``ACCESS_LOG_SAMPLE_RATE``; errors and requests slower than
+``ACCESS_LOG_SLOW_MS`` are always logged.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from starlette.datastructures import Headers
+from app.config import settings
+from app.metrics import current_query_stats
+
+access_logger = logging.getLogger("app.access")
+
+# Set by AccessLogMiddleware for the duration of a request
+current_request_id: ContextVar[Optional[str]] = ContextVar("current_request_id", default=None)
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed in ``extra``
+_RECORD_ATTRIBUTES = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per record with the time, level, logger, message,
+    request id, ``extra`` fields and the formatted exception, if any.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    QueueHandler that resolves the message and traceback and attaches the
+    request id in the calling thread, where the request context lives.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if getattr(record, "request_id", None) is None:
+            record.request_id = current_request_id.get()
+        return record
+
+
+def _formatter() -> logging.Formatter:
+    return JSONFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+
+
+def _start_listener(handler: QueueHandler) -> None:
+    global _listener
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(_formatter())
+    _listener = QueueListener(handler.queue, output, respect_handler_level=False)
+    _listener.start()
+
+
+def _after_fork(handler: QueueHandler) -> None:
+    # Threads do not survive fork: a worker forked from a gunicorn master
+    # that preloaded the app needs its own queue and listener
+    handler.queue = queue.SimpleQueue()
+    _start_listener(handler)
+
+
+def stop_logging() -> None:
+    """
+    Write out the queued records and stop the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging() -> None:
+    """
+    Route all logging through the queue listener, at ``LOG_LEVEL``. Safe to
+    call more than once; only the first call installs the handlers.
+    """
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL.upper())
+    if any(isinstance(handler, ContextQueueHandler) for handler in root.handlers):
+        return
+
+    handler = ContextQueueHandler(queue.SimpleQueue())
+    root.addHandler(handler)
+    _start_listener(handler)
+    atexit.register(stop_logging)
+    os.register_at_fork(after_in_child=lambda: _after_fork(handler))
+
+
+def _sample_rate(status: int, elapsed: float) -> float:
+    if status >= 400 or elapsed * 1000 >= settings.ACCESS_LOG_SLOW_MS:
+        return 1.0
+    return settings.ACCESS_LOG_SAMPLE_RATE
+
+
+class AccessLogMiddleware:
+    """
+    ASGI middleware assigning each request an id and writing its access log.
+
+    The id is taken from an incoming ``X-Request-ID`` header or generated,
+    and returned in the response's ``X-Request-ID``. Must run inside
+    MetricsMiddleware, which collects the database time.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # A caller-supplied id is kept so a request can be traced across services
+        request_id = Headers(scope=scope).get("x-request-id", "")[:128] or uuid.uuid4().hex
+        token = current_request_id.set(request_id)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            sample_rate = _sample_rate(status, elapsed)
+            if settings.ACCESS_LOG and random.random() < sample_rate:
+                stats = current_query_stats.get()
+                client = scope.get("client")
+                access_logger.info(
+                    f'{scope["method"]} {scope["path"]} {status}',
+                    extra={
+                        "request_id": request_id,
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "route": stats.route if stats is not None else None,
+                        "status": status,
+                        "duration_ms": round(elapsed * 1000, 2),
+                        "db_ms": round(stats.duration * 1000, 2) if stats is not None else None,
+                        "db_queries": stats.statements if stats is not None else None,
+                        "client": client[0] if client else None,
+                        # Each logged success stands for 1 / sample_rate requests
+                        "sample_rate": sample_rate,
+                    },
+                )
+            current_request_id.reset(token)
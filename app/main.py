@@ -1,37 +1,86 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import dispose_engine, get_db, get_engine, init_engine
 from app.api.v1.routes import router as api_router
+from app.health import router as health_router
+from app.config import settings
+from app.admission import AdmissionMiddleware, admission_options
+from app.compression import CompressionMiddleware
+from app.log import AccessLogMiddleware, configure_logging
+from app.metrics import MetricsMiddleware, QueryBudgetExceeded, render_metrics
+from app.migrate import run_migrations_once
+from app.responses import FastJSONResponse
+from app.retention import prune_change_log
+from app.seed import seed_database_once
+from contextlib import asynccontextmanager
 import logging
-import sys
 import os
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    stream=sys.stdout
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connect (retrying while the database comes up), migrate the schema,
+    # then seed the sample catalogue once at startup instead of on every request
+    # and drop expired change log entries
+    if os.getenv("TESTING") != "true":
+        init_engine()
+        if settings.RUN_MIGRATIONS_ON_STARTUP:
+            run_migrations_once()
+        try:
+            seed_database_once()
+        except Exception as e:
+            logger.error(f"Error initializing data: {e}")
+        try:
+            with get_engine().begin() as connection:
+                prune_change_log(connection, settings.CHANGE_LOG_RETENTION_DAYS)
+        except Exception as e:
+            logger.error(f"Error pruning the change log: {e}")
+    yield
+    dispose_engine()
+
 app = FastAPI(
     title="Fruits API",
     description="A simple API for managing fruits",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+if settings.ADMISSION_CONTROL:
+    # Innermost, so rejections still carry CORS headers and are counted in
+    # the request metrics
+    app.add_middleware(AdmissionMiddleware, **admission_options())
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Request-ID"],
+)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
 )
+# Inside MetricsMiddleware, which collects the database time it logs
+app.add_middleware(AccessLogMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(QueryBudgetExceeded)
+async def query_budget_exceeded(request: Request, exc: QueryBudgetExceeded):
+    # Only raised with QUERY_BUDGET_STRICT, to make N+1 regressions fail tests
+    logger.error(str(exc))
+    return FastJSONResponse({"detail": str(exc)}, status_code=500)
 
 # Include the API router with prefix
 app.include_router(api_router, prefix="/api/v1")
+app.include_router(health_router)
 
 @app.get("/")
 async def root():
@@ -39,7 +88,13 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    # Kept for existing monitors, only checks the process like /health/live
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
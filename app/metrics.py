@@ -0,0 +1,297 @@
+"""
+Prometheus metrics exported on ``/metrics``.
+
+Under gunicorn every worker keeps its own values. When
+``PROMETHEUS_MULTIPROC_DIR`` is set (gunicorn.conf.py does this) the values
+are written to files in that directory and ``/metrics`` aggregates all
+workers, whichever worker answers the scrape.
+
+The same hooks count the SQL statements and database time of each request.
+They are exposed in a ``Server-Timing`` header, statements slower than
+``SLOW_QUERY_MS`` are logged, and routes can declare a statement budget with
+the ``query_budget`` dependency; with ``QUERY_BUDGET_STRICT`` (enabled in the
+tests) a request that goes over its budget fails.
+"""
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "fruits_db_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the database pool",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+DB_POOL_SIZE = Gauge(
+    "fruits_db_pool_size",
+    "Configured size of the database connection pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "fruits_db_pool_checked_out_connections",
+    "Database connections currently checked out of the pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    "fruits_db_pool_overflow_connections",
+    "Connections open beyond the pool size (negative while the pool is not full)",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+
+DB_STATEMENT_DURATION = Histogram(
+    "fruits_db_statement_duration_seconds",
+    "SQL statement execution time by operation",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+CACHE_REQUESTS = Counter(
+    "fruits_cache_requests_total",
+    "Response cache lookups by namespace and result (hit or miss)",
+    ["namespace", "result"],
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "fruits_http_request_duration_seconds",
+    "Request latency by route template, method and status, until the body is sent",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "fruits_http_requests_in_progress",
+    "Requests currently being handled",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+HTTP_REQUEST_SQL_STATEMENTS = Histogram(
+    "fruits_http_request_sql_statements",
+    "SQL statements executed per request by route template",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 4, 5, 10, 20, 50, 100),
+)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "fruits_admission_in_flight_requests",
+    "Requests admitted by admission control and still running, by route class",
+    ["route_class"],
+    multiprocess_mode="livesum",
+)
+
+ADMISSION_QUEUED = Gauge(
+    "fruits_admission_queued_requests",
+    "Requests waiting in the admission queue, by route class",
+    ["route_class"],
+    multiprocess_mode="livesum",
+)
+
+ADMISSION_QUEUE_WAIT = Histogram(
+    "fruits_admission_queue_wait_seconds",
+    "Time queued requests waited for admission, by route class",
+    ["route_class"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+ADMISSION_REJECTED = Counter(
+    "fruits_admission_rejected_requests_total",
+    "Requests shed by route class and reason (queue_full, queue_timeout or rate_limited)",
+    ["route_class", "reason"],
+)
+
+SQL_OPERATIONS = ("select", "insert", "update", "delete")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class QueryStats:
+    """
+    SQL statements executed on behalf of the current request, and the number
+    of statements its route allows (None for no budget).
+    """
+    __slots__ = ("statements", "duration", "budget", "scope")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.statements = 0
+        self.duration = 0.0
+        self.budget = None
+        self.scope = scope
+
+    @property
+    def route(self) -> str:
+        # The router stores the matched route in the scope
+        route = self.scope.get("route") if self.scope is not None else None
+        return getattr(route, "path", "unmatched")
+
+
+# Set by MetricsMiddleware; the context is copied into the threadpool, so
+# handlers running there update the same object
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def _operation(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ""
+    return keyword if keyword in SQL_OPERATIONS else "other"
+
+
+def set_query_budget(limit: Optional[int]) -> None:
+    """
+    Set the statement budget of the current request, None to lift it.
+    """
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.budget = limit
+
+
+def query_budget(limit: int) -> Callable[[], None]:
+    """
+    Route dependency declaring how many SQL statements a request may run,
+    e.g. ``dependencies=[Depends(query_budget(2))]``.
+    """
+    def declare_budget():
+        set_query_budget(limit)
+    return declare_budget
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("fruits_statement_start", []).append(time.perf_counter())
+    stats = current_query_stats.get()
+    if stats is None:
+        return
+    stats.statements += 1
+    if settings.QUERY_BUDGET_STRICT and stats.budget is not None and stats.statements > stats.budget:
+        # Raised before the statement runs; handle_error drops its start time
+        raise QueryBudgetExceeded(
+            f"{stats.route} exceeded its query budget of {stats.budget} statements: {statement}"
+        )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["fruits_statement_start"].pop()
+    DB_STATEMENT_DURATION.labels(operation=_operation(statement)).observe(elapsed)
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.duration += elapsed
+    if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        route = stats.route if stats is not None else None
+        message = f"Slow query ({elapsed * 1000:.1f}ms) on {route}: {statement}"
+        if settings.SLOW_QUERY_LOG_PARAMETERS:
+            message += f" {parameters!r}"
+        logger.warning(message)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not run for failed statements
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("fruits_statement_start"):
+        conn.info["fruits_statement_start"].pop()
+
+
+def _update_pool_gauges(pool, name: str, returning: bool = False):
+    checked_out, overflow = pool.checkedout(), pool.overflow()
+    if returning:
+        # The checkin event fires before the connection is back in the pool;
+        # it is closed instead when the pool is already full
+        checked_out -= 1
+        if pool.checkedin() >= pool.size():
+            overflow -= 1
+    DB_POOL_CHECKED_OUT.labels(pool=name).set(checked_out)
+    DB_POOL_OVERFLOW.labels(pool=name).set(overflow)
+
+
+def instrument_engine(engine, name: str = "primary") -> None:
+    """
+    Record statement timings and pool usage of ``engine``; the pool gauges
+    are labelled with ``name``.
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        DB_POOL_SIZE.labels(pool=name).set(pool.size())
+        event.listen(pool, "checkout", lambda *args: _update_pool_gauges(pool, name))
+        event.listen(pool, "checkin", lambda *args: _update_pool_gauges(pool, name, returning=True))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, in-flight requests and SQL statements
+    per request.
+
+    Requests are labelled with the route template (``/api/v1/fruits/{fruit_id}``)
+    rather than the raw path, so the number of series stays bounded.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        stats = QueryStats(scope)
+        token = current_query_stats.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.SERVER_TIMING:
+                    # Statements of a streamed body that run after this point are not included
+                    timing = (
+                        f'db;dur={stats.duration * 1000:.1f};desc="{stats.statements} queries", '
+                        f"app;dur={(time.perf_counter() - start) * 1000:.1f}"
+                    )
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"server-timing", timing.encode("latin-1")),
+                        (b"timing-allow-origin", b"*"),
+                    ]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method=method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress.dec()
+            current_query_stats.reset(token)
+            route = stats.route
+            HTTP_REQUEST_DURATION.labels(method=method, route=route, status=str(status)).observe(elapsed)
+            HTTP_REQUEST_SQL_STATEMENTS.labels(method=method, route=route).observe(stats.statements)
+
+
+def render_metrics():
+    """
+    Return the exposition body and content type for ``/metrics``.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
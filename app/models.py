@@ -1,29 +1,31 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, BigInteger, Integer, String, Float, Double, DateTime, ForeignKey, DDL, Index, event, func
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
+from typing import List
 
 class Fruit(Base):
     __tablename__ = "fruits"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(50), index=True)
-    color = Column(String(50))
+    color = Column(String(50), index=True)
     taste = Column(String(50))
-    origin_country = Column(String(100))
-    price_per_kg = Column(Float)
+    origin_country = Column(String(100), index=True)
+    price_per_kg = Column(Float, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
-    nutritional_info = relationship("NutritionalInfo", back_populates="fruit", uselist=False)
+    nutritional_info = relationship("NutritionalInfo", back_populates="fruit", uselist=False, cascade="all, delete-orphan")
     suppliers = relationship("Supplier", secondary="fruit_suppliers", back_populates="fruits")
 
 class NutritionalInfo(Base):
     __tablename__ = "nutritional_info"
 
     id = Column(Integer, primary_key=True, index=True)
-    fruit_id = Column(Integer, ForeignKey("fruits.id"))
-    calories = Column(Integer)
+    # One-to-one with Fruit
+    fruit_id = Column(Integer, ForeignKey("fruits.id"), unique=True, index=True)
+    calories = Column(Integer, index=True)
     carbohydrates = Column(Float)
     protein = Column(Float)
     fat = Column(Float)
@@ -47,4 +49,81 @@ class FruitSupplier(Base):
     __tablename__ = "fruit_suppliers"
 
     fruit_id = Column(Integer, ForeignKey("fruits.id"), primary_key=True)
-    supplier_id = Column(Integer, ForeignKey("suppliers.id"), primary_key=True) 
\ No newline at end of file
+    # The primary key is led by fruit_id, supplier-side lookups need their own index
+    supplier_id = Column(Integer, ForeignKey("suppliers.id"), primary_key=True, index=True)
+
+class CatalogueAggregate(Base):
+    __tablename__ = "catalogue_aggregates"
+
+    # Row count and value sum of one statistics bucket, e.g. the prices of
+    # the fruits from one country. Maintained by app.aggregates
+    dimension = Column(String(50), primary_key=True)
+    bucket = Column(String(100), primary_key=True)
+    items = Column(Integer, nullable=False, default=0)
+    value_count = Column(Integer, nullable=False, default=0)
+    value_sum = Column(Double, nullable=False, default=0)
+
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+
+    # One row per write to the catalogue, recorded by the CHANGE_LOG_SOURCES
+    # triggers. The id is the token of /api/v1/changes; SQLite only
+    # autoincrements an INTEGER primary key
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    operation = Column(String(10), nullable=False)
+    changed_at = Column(DateTime, nullable=False, server_default=func.now())
+
+# Full-text name search, see app.search. MySQL gets a FULLTEXT index; SQLite an
+# external-content FTS5 table over fruits.name that triggers keep in sync.
+Index("ix_fruits_name_fulltext", Fruit.name, mysql_prefix="FULLTEXT").ddl_if(dialect="mysql")
+
+FRUITS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE fruits_fts USING fts5(name, content='fruits', content_rowid='id')",
+    "CREATE TRIGGER fruits_fts_ai AFTER INSERT ON fruits BEGIN "
+    "INSERT INTO fruits_fts(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER fruits_fts_ad AFTER DELETE ON fruits BEGIN "
+    "INSERT INTO fruits_fts(fruits_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER fruits_fts_au AFTER UPDATE OF name ON fruits BEGIN "
+    "INSERT INTO fruits_fts(fruits_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+    "INSERT INTO fruits_fts(rowid, name) VALUES (new.id, new.name); END",
+]
+
+for statement in FRUITS_FTS_DDL:
+    event.listen(Fruit.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Fruit.__table__, "before_drop", DDL("DROP TABLE IF EXISTS fruits_fts").execute_if(dialect="sqlite"))
+
+# Tables whose writes are recorded in change_log: (table, entity, id column).
+# A fruit's supplier links are part of the fruit, so link changes are logged
+# as an upsert of the fruit
+CHANGE_LOG_SOURCES = [
+    ("fruits", "fruit", "id"),
+    ("suppliers", "supplier", "id"),
+    ("nutritional_info", "nutritional_info", "id"),
+    ("fruit_suppliers", "fruit", "fruit_id"),
+]
+
+
+def change_log_triggers(dialect: str, table: str) -> List[str]:
+    entity, column = next((entity, column) for name, entity, column in CHANGE_LOG_SOURCES if name == table)
+    statements = []
+    for event_name, row, operation in (("INSERT", "new", "upsert"), ("UPDATE", "new", "upsert"), ("DELETE", "old", "delete")):
+        if table == "fruit_suppliers":
+            operation = "upsert"
+        insert = (
+            f"INSERT INTO change_log (entity, entity_id, operation) "
+            f"VALUES ('{entity}', {row}.{column}, '{operation}')"
+        )
+        trigger = f"{table}_changes_{event_name[0].lower()}"
+        if dialect == "mysql":
+            statements.append(f"CREATE TRIGGER {trigger} AFTER {event_name} ON {table} FOR EACH ROW {insert}")
+        else:
+            statements.append(f"CREATE TRIGGER {trigger} AFTER {event_name} ON {table} BEGIN {insert}; END")
+    return statements
+
+
+for table, _, _ in CHANGE_LOG_SOURCES:
+    for dialect in ("sqlite", "mysql"):
+        for statement in change_log_triggers(dialect, table):
+            event.listen(Base.metadata.tables[table], "after_create", DDL(statement).execute_if(dialect=dialect))
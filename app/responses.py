@@ -0,0 +1,32 @@
+"""
+JSON encoding for API responses.
+
+Uses orjson when it is installed and the standard library otherwise; both
+produce compact UTF-8 JSON.
+"""
+import json
+from typing import Any
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with ``dumps``.
+
+    Handlers that return it directly with content already in its final
+    JSON shape also skip FastAPI's response_model validation and
+    ``jsonable_encoder`` pass.
+    """
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
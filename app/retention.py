@@ -0,0 +1,52 @@
+"""
+Retention of the ``change_log`` table behind ``/api/v1/changes``.
+
+Entries older than ``CHANGE_LOG_RETENTION_DAYS`` are deleted when the app
+starts and by ``python -m app.retention``, which can run on a schedule. A
+client whose token points into the deleted part of the log gets 410 from
+the feed and has to reload ``/get_all_data``.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.engine import Connection
+from app.models import ChangeLog
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeTokenExpired(Exception):
+    """
+    The log cannot continue from a change token: the entries after it were
+    pruned, or the token is newer than the log.
+    """
+
+
+def prune_change_log(connection: Connection, retention_days: int, now: Optional[datetime] = None) -> int:
+    """
+    Delete change log entries older than ``retention_days`` days, none for
+    0. Returns the number of entries deleted.
+    """
+    if retention_days <= 0:
+        return 0
+    latest = connection.execute(select(func.max(ChangeLog.id))).scalar()
+    if latest is None:
+        return 0
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    # The latest entry is always kept: SQLite, and MySQL before 8.0 after a
+    # restart, hand out max(id) + 1 as the next id, so an empty log would
+    # reuse tokens clients already hold
+    result = connection.execute(
+        delete(ChangeLog).where(ChangeLog.id < latest, ChangeLog.changed_at < cutoff)
+    )
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    from app.config import settings
+    from app.database import get_engine
+    from app.log import configure_logging
+    configure_logging()
+    with get_engine().begin() as connection:
+        logger.info(f"Pruned {prune_change_log(connection, settings.CHANGE_LOG_RETENTION_DAYS)} change log entries")
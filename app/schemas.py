@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
@@ -34,7 +34,8 @@ class FruitBase(BaseModel):
     color: str
     taste: str
     origin_country: str
-    price_per_kg: float
+    # inf and NaN would be stored and break the aggregates and JSON output
+    price_per_kg: float = Field(ge=0, allow_inf_nan=False)
 
 class Fruit(FruitBase):
     id: int
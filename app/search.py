@@ -0,0 +1,42 @@
+"""
+Fruit name search backed by the database's full-text index.
+
+SQLite uses the ``fruits_fts`` FTS5 table, kept in sync with ``fruits`` by
+triggers (see app.models). MySQL uses the FULLTEXT index on ``fruits.name``
+in boolean mode; InnoDB ignores words shorter than ``innodb_ft_min_token_size``
+(3 by default). Other databases fall back to a prefix LIKE on the name index.
+
+Every word of the search text must match, and the last characters of each
+word may be missing, so ``gre app`` finds "Green Apple".
+"""
+import re
+from typing import List
+from sqlalchemy import false, literal_column, select, table, column
+from app.models import Fruit
+
+SEARCH_TABLE = "fruits_fts"
+
+fruits_fts = table(SEARCH_TABLE, column("rowid"))
+
+
+def search_terms(text: str) -> List[str]:
+    # Keep word characters only, so user input never reaches the query syntax
+    return re.findall(r"\w+", text.lower())
+
+
+def name_search_condition(dialect_name: str, text: str):
+    """
+    WHERE clause matching fruits whose name contains every word of ``text``.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return false()
+    if dialect_name == "sqlite":
+        query = " ".join(f'"{term}"*' for term in terms)
+        return Fruit.id.in_(
+            select(fruits_fts.c.rowid).where(literal_column(SEARCH_TABLE).op("MATCH")(query))
+        )
+    if dialect_name == "mysql":
+        # Rendered as MATCH (name) AGAINST (... IN BOOLEAN MODE)
+        return Fruit.name.match(" ".join(f"+{term}*" for term in terms))
+    return Fruit.name.ilike(f"{' '.join(terms)}%")
@@ -0,0 +1,170 @@
+"""
+One-time seeding of the sample catalogue.
+
+Runs from the application lifespan hook and can be invoked manually with
+``python -m app.seed``. Seeding is serialized across worker processes with a
+file lock and is a no-op once the database holds any fruit.
+"""
+import fcntl
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from app.aggregates import record_inserted
+from app.database import SessionLocal, get_engine
+from app.models import Fruit, NutritionalInfo, Supplier, FruitSupplier
+
+logger = logging.getLogger(__name__)
+
+SEED_LOCK_FILE = os.getenv("SEED_LOCK_FILE", os.path.join(tempfile.gettempdir(), "fruits-api-seed.lock"))
+
+SUPPLIERS = [
+    {
+        "name": "Fresh Farms",
+        "country": "USA",
+        "contact_email": "contact@freshfarms.com",
+        "rating": 4.5
+    },
+    {
+        "name": "Global Fruits Co",
+        "country": "Spain",
+        "contact_email": "info@globalfruits.com",
+        "rating": 4.8
+    },
+    {
+        "name": "Tropical Exports",
+        "country": "Ecuador",
+        "contact_email": "sales@tropicalexports.com",
+        "rating": 4.2
+    }
+]
+
+FRUITS = [
+    {
+        "fruit": {
+            "name": "Apple",
+            "color": "Red",
+            "taste": "Sweet",
+            "origin_country": "USA",
+            "price_per_kg": 2.99
+        },
+        "nutrition": {
+            "calories": 52,
+            "carbohydrates": 14,
+            "protein": 0.3,
+            "fat": 0.2,
+            "fiber": 2.4,
+            "vitamins": "A, C"
+        }
+    },
+    {
+        "fruit": {
+            "name": "Banana",
+            "color": "Yellow",
+            "taste": "Sweet",
+            "origin_country": "Ecuador",
+            "price_per_kg": 1.99
+        },
+        "nutrition": {
+            "calories": 89,
+            "carbohydrates": 23,
+            "protein": 1.1,
+            "fat": 0.3,
+            "fiber": 2.6,
+            "vitamins": "B6, C"
+        }
+    },
+    {
+        "fruit": {
+            "name": "Orange",
+            "color": "Orange",
+            "taste": "Sweet-Citrus",
+            "origin_country": "Spain",
+            "price_per_kg": 3.49
+        },
+        "nutrition": {
+            "calories": 47,
+            "carbohydrates": 12,
+            "protein": 0.9,
+            "fat": 0.1,
+            "fiber": 2.4,
+            "vitamins": "C"
+        }
+    }
+]
+
+
+@contextmanager
+def seed_lock(path: str = SEED_LOCK_FILE):
+    """
+    Hold an exclusive lock so only one process migrates or seeds at a time.
+    """
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def seed_database(db: Session) -> bool:
+    """
+    Insert the sample catalogue unless the database already has fruits.
+
+    Every table is populated with a single multi-row INSERT inside one
+    transaction. Returns True when data was inserted.
+    """
+    if db.execute(select(Fruit.id).limit(1)).first() is not None:
+        return False
+
+    try:
+        db.execute(insert(Supplier), SUPPLIERS)
+        db.execute(insert(Fruit), [data["fruit"] for data in FRUITS])
+        record_inserted(db.connection(), Supplier, SUPPLIERS)
+        record_inserted(db.connection(), Fruit, [data["fruit"] for data in FRUITS])
+        record_inserted(db.connection(), NutritionalInfo, [data["nutrition"] for data in FRUITS])
+
+        # Read back the generated keys; works without RETURNING on MySQL
+        supplier_ids = dict(db.execute(select(Supplier.country, Supplier.id)).all())
+        fruit_ids = dict(db.execute(select(Fruit.name, Fruit.id)).all())
+
+        db.execute(insert(NutritionalInfo), [
+            {"fruit_id": fruit_ids[data["fruit"]["name"]], **data["nutrition"]}
+            for data in FRUITS
+        ])
+        # Link suppliers from the same country
+        db.execute(insert(FruitSupplier), [
+            {
+                "fruit_id": fruit_ids[data["fruit"]["name"]],
+                "supplier_id": supplier_ids[data["fruit"]["origin_country"]]
+            }
+            for data in FRUITS
+            if data["fruit"]["origin_country"] in supplier_ids
+        ])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    logger.info("Database initialized with complete data!")
+    return True
+
+
+def seed_database_once() -> bool:
+    """
+    Seed using a fresh session while holding the cross-process seed lock.
+    """
+    with seed_lock():
+        db = SessionLocal(bind=get_engine())
+        try:
+            return seed_database(db)
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    from app.log import configure_logging
+    configure_logging()
+    if not seed_database_once():
+        logger.info("Database already contains data, nothing to seed")
@@ -0,0 +1,6 @@
+"""
+Benchmarks for the Fruits API.
+
+Each module is runnable with ``python -m benchmarks.<name>`` and prints its
+results as JSON.
+"""
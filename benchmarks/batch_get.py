@@ -0,0 +1,68 @@
+"""
+Time to resolve a basket of fruit IDs: one GET per ID against one batchGet.
+
+Both paths start from an empty response cache. The per-ID loop returns the
+basic fruit, so batchGet is measured with ``fields=name,color`` as well as
+with suppliers and nutrition included.
+
+    python -m benchmarks.batch_get --ids 200 --repeat 20
+"""
+import argparse
+import random
+import time
+from fastapi.testclient import TestClient
+from benchmarks.common import create_benchmark_engine, report, seed_catalogue, use_engine
+from app.cache import response_cache
+from app.main import app
+
+
+def bench(func, repeat: int) -> dict:
+    elapsed = []
+    for _ in range(repeat):
+        response_cache.clear()
+        start = time.perf_counter()
+        func()
+        elapsed.append(time.perf_counter() - start)
+    return {"ms_per_basket": round(sum(elapsed) / repeat * 1000, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--ids", type=int, default=200, help="fruit IDs per basket")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--fruits", type=int, default=10000)
+    parser.add_argument("--suppliers", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = create_benchmark_engine()
+    seed_catalogue(engine, args.fruits, args.suppliers, seed=args.seed)
+    use_engine(app, engine)
+    # A few IDs that do not exist, as in a basket with removed products
+    ids = random.Random(args.seed).sample(range(1, args.fruits + 10), args.ids)
+
+    with TestClient(app) as client:
+        def per_id():
+            for fruit_id in ids:
+                client.get(f"/api/v1/fruits/{fruit_id}")
+
+        def batch(fields=None):
+            params = {"fields": fields} if fields else None
+            client.post("/api/v1/fruits:batchGet", params=params, json={"ids": ids}).raise_for_status()
+
+        loop = bench(per_id, args.repeat)
+        basic = bench(lambda: batch("name,color"), args.repeat)
+        full = bench(batch, args.repeat)
+
+    report({
+        "per_id_get": loop,
+        "batch_get_basic": basic,
+        "batch_get_with_relations": full,
+        "speedup_basic": round(loop["ms_per_basket"] / basic["ms_per_basket"], 1),
+        "speedup_with_relations": round(loop["ms_per_basket"] / full["ms_per_basket"], 1),
+        "config": vars(args),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Rows per second for the single-row and bulk fruit ingestion paths.
+
+    python -m benchmarks.bulk_insert --rows 5000 --batch-size 1000
+"""
+import argparse
+import json
+import time
+from fastapi.testclient import TestClient
+from benchmarks.common import create_benchmark_engine, report, use_engine
+from app.main import app
+
+
+def _rows(count, prefix):
+    return [
+        {
+            "name": f"{prefix} {i}",
+            "color": "Red",
+            "taste": "Sweet",
+            "origin_country": "Spain",
+            "price_per_kg": 1.5,
+        }
+        for i in range(count)
+    ]
+
+
+def _rate(rows, elapsed):
+    return {"rows": rows, "seconds": round(elapsed, 3), "rows_per_sec": round(rows / elapsed, 1)}
+
+
+def bench_single(client, rows):
+    start = time.perf_counter()
+    for row in rows:
+        client.post("/api/v1/fruits", json={"fruit": row["name"], "color": row["color"]}).raise_for_status()
+    return _rate(len(rows), time.perf_counter() - start)
+
+
+def bench_bulk_json(client, rows, batch_size):
+    start = time.perf_counter()
+    response = client.post(f"/api/v1/fruits/bulk?batch_size={batch_size}", json=rows)
+    response.raise_for_status()
+    assert response.json()["inserted"] == len(rows)
+    return _rate(len(rows), time.perf_counter() - start)
+
+
+def bench_bulk_ndjson(client, rows, batch_size):
+    def body():
+        for row in rows:
+            yield (json.dumps(row) + "\n").encode()
+
+    start = time.perf_counter()
+    response = client.post(
+        f"/api/v1/fruits/bulk?batch_size={batch_size}",
+        content=body(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    response.raise_for_status()
+    assert response.json()["inserted"] == len(rows)
+    return _rate(len(rows), time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--single-rows", type=int, default=1000, help="rows for the slower single-row path")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    use_engine(app, create_benchmark_engine())
+    with TestClient(app) as client:
+        single = bench_single(client, _rows(args.single_rows, "single"))
+        bulk_json = bench_bulk_json(client, _rows(args.rows, "json"), args.batch_size)
+        bulk_ndjson = bench_bulk_ndjson(client, _rows(args.rows, "ndjson"), args.batch_size)
+
+    report({
+        "single_row": single,
+        "bulk_json": bulk_json,
+        "bulk_ndjson": bulk_ndjson,
+        "speedup_json": round(bulk_json["rows_per_sec"] / single["rows_per_sec"], 1),
+        "speedup_ndjson": round(bulk_ndjson["rows_per_sec"] / single["rows_per_sec"], 1),
+        "config": vars(args),
+    })
+
+
+if __name__ == "__main__":
+    main()
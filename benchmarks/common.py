@@ -0,0 +1,126 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+import json
+import os
+import random
+import tempfile
+from typing import Dict, List
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+os.environ.setdefault("TESTING", "true")
+# Access log lines would be interleaved with the report on stdout; set
+# ACCESS_LOG=true to include the cost of writing them
+os.environ.setdefault("ACCESS_LOG", "false")
+
+from app.database import Base, get_db
+from app.models import Fruit, NutritionalInfo, Supplier, FruitSupplier
+
+COLORS = ["Red", "Yellow", "Green", "Orange", "Purple"]
+COUNTRIES = ["USA", "Spain", "Ecuador", "Brazil", "India", "Italy"]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """
+    Summarize latencies given in seconds as milliseconds.
+    """
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0) * 1000, 2),
+    }
+
+
+def create_benchmark_engine(path: str = None, pool_size: int = 5):
+    """
+    Create a file backed SQLite database with the application schema.
+    """
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="fruits-bench-"), "bench.db")
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        pool_size=pool_size,
+        max_overflow=0,
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def seed_catalogue(engine, fruits: int = 1000, suppliers: int = 50, suppliers_per_fruit: int = 2, seed: int = 42):
+    """
+    Fill the database with a synthetic catalogue.
+    """
+    rng = random.Random(seed)
+    with engine.begin() as conn:
+        conn.execute(insert(Supplier), [
+            {
+                "name": f"Supplier {i}",
+                "country": rng.choice(COUNTRIES),
+                "contact_email": f"supplier{i}@example.com",
+                "rating": round(rng.uniform(1, 5), 1),
+            }
+            for i in range(1, suppliers + 1)
+        ])
+        conn.execute(insert(Fruit), [
+            {
+                "name": f"Fruit {i}",
+                "color": rng.choice(COLORS),
+                "taste": rng.choice(["Sweet", "Sour", "Bitter"]),
+                "origin_country": rng.choice(COUNTRIES),
+                "price_per_kg": round(rng.uniform(0.5, 10), 2),
+            }
+            for i in range(1, fruits + 1)
+        ])
+        conn.execute(insert(NutritionalInfo), [
+            {
+                "fruit_id": i,
+                "calories": rng.randint(20, 150),
+                "carbohydrates": round(rng.uniform(5, 30), 1),
+                "protein": round(rng.uniform(0, 2), 1),
+                "fat": round(rng.uniform(0, 1), 1),
+                "fiber": round(rng.uniform(0, 5), 1),
+                "vitamins": "C",
+            }
+            for i in range(1, fruits + 1)
+        ])
+        links = {
+            (i, rng.randint(1, suppliers))
+            for i in range(1, fruits + 1)
+            for _ in range(suppliers_per_fruit)
+        }
+        conn.execute(insert(FruitSupplier), [
+            {"fruit_id": fruit_id, "supplier_id": supplier_id} for fruit_id, supplier_id in sorted(links)
+        ])
+
+
+def use_engine(app, engine):
+    """
+    Point the application's get_db dependency at the benchmark engine.
+    """
+    SessionBench = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = SessionBench()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return SessionBench
+
+
+def report(results: dict):
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,76 @@
+"""
+Latency of fast point reads while slow catalogue dumps are in flight.
+
+Every statement touching the supplier link table is delayed to simulate a
+slow MySQL query. Fast ``/fruits/{id}`` requests are issued concurrently with
+slow ``/get_all_data`` requests against the app in-process; if handlers block
+the event loop, the fast requests queue behind the slow ones.
+
+    python -m benchmarks.concurrency --slow 10 --fast 200 --delay 0.2 --concurrency 16
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from sqlalchemy import event
+from benchmarks.common import create_benchmark_engine, report, seed_catalogue, summarize, use_engine
+from app.main import app
+
+
+async def _timed_get(client, url, latencies, limiter):
+    async with limiter:
+        start = time.perf_counter()
+        response = await client.get(url)
+        latencies.append(time.perf_counter() - start)
+    response.raise_for_status()
+
+
+async def run(slow: int, fast: int, fruits: int, concurrency: int):
+    slow_latencies, fast_latencies = [], []
+    limiter = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Interleave slow requests evenly among the fast ones
+        every = max(1, fast // max(1, slow))
+        tasks = []
+        for i in range(fast):
+            if i % every == 0 and len(tasks) - i < slow:
+                tasks.append(_timed_get(client, "/api/v1/get_all_data", slow_latencies, limiter))
+            tasks.append(_timed_get(client, f"/api/v1/fruits/{i % fruits + 1}", fast_latencies, limiter))
+        start = time.perf_counter()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    return {
+        "wall_time_s": round(elapsed, 3),
+        "fast": summarize(fast_latencies),
+        "slow": summarize(slow_latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--slow", type=int, default=10, help="concurrent slow requests")
+    parser.add_argument("--fast", type=int, default=200, help="concurrent fast requests")
+    parser.add_argument("--delay", type=float, default=0.2, help="simulated slow query time in seconds")
+    parser.add_argument("--fruits", type=int, default=200, help="fruits in the synthetic catalogue")
+    parser.add_argument("--concurrency", type=int, default=16, help="maximum requests in flight")
+    args = parser.parse_args()
+
+    # Enough connections for every in-flight request, so pool waits do not
+    # distort the measurement
+    engine = create_benchmark_engine(pool_size=args.concurrency)
+    seed_catalogue(engine, fruits=args.fruits)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def slow_query(conn, cursor, statement, parameters, context, executemany):
+        if "fruit_suppliers" in statement:
+            time.sleep(args.delay)
+
+    use_engine(app, engine)
+    results = asyncio.run(run(args.slow, args.fast, args.fruits, args.concurrency))
+    results["config"] = vars(args)
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Replay a traffic mix against the API and report throughput and latency.
+
+The catalogue is seeded into a fresh SQLite file, then the requests are
+sent either to the app in-process or to a real server started for the run
+(uvicorn, or gunicorn with the repository's gunicorn.conf.py). Traffic is
+generated from ``--mix`` with a fixed seed, or replayed from a JSONL file of
+recorded requests (``{"method": "GET", "path": "/api/v1/fruits", "json": null}``
+per line, optionally with a ``name`` used to group the results);
+``--save-traffic`` writes the generated requests in that format so the same
+traffic can be replayed against another version.
+
+    python -m benchmarks.loadtest --server inprocess --requests 2000
+    python -m benchmarks.loadtest --server gunicorn --workers 4 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+import httpx
+from benchmarks.common import COLORS, create_benchmark_engine, report, seed_catalogue, summarize
+
+DEFAULT_MIX = "fruits=40,fruit=40,create=10,get_all_data=10"
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight)
+    unknown = set(weights) - {"fruits", "fruit", "create", "get_all_data"}
+    if unknown:
+        raise ValueError(f"Unknown endpoints in mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+def build_traffic(mix: Dict[str, float], count: int, fruits: int, seed: int = 42) -> List[dict]:
+    """
+    Generate ``count`` requests with endpoint frequencies following ``mix``.
+    """
+    rng = random.Random(seed)
+    names, weights = zip(*mix.items())
+    traffic = []
+    for i, name in enumerate(rng.choices(names, weights, k=count)):
+        if name == "fruits":
+            request = {"method": "GET", "path": "/api/v1/fruits?limit=100"}
+        elif name == "fruit":
+            request = {"method": "GET", "path": f"/api/v1/fruits/{rng.randint(1, fruits)}"}
+        elif name == "create":
+            request = {
+                "method": "POST",
+                "path": "/api/v1/fruits",
+                "json": {"fruit": f"Load {i}", "color": rng.choice(COLORS)},
+            }
+        else:
+            request = {"method": "GET", "path": "/api/v1/get_all_data"}
+        traffic.append({"name": name, **request})
+    return traffic
+
+
+def load_traffic(path: str) -> List[dict]:
+    with open(path) as f:
+        traffic = [json.loads(line) for line in f if line.strip()]
+    for request in traffic:
+        request.setdefault("name", f"{request['method']} {request['path'].split('?')[0]}")
+    return traffic
+
+
+async def replay(client: httpx.AsyncClient, traffic: List[dict], concurrency: int) -> dict:
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    limiter = asyncio.Semaphore(concurrency)
+
+    async def send(request):
+        async with limiter:
+            start = time.perf_counter()
+            try:
+                response = await client.request(request["method"], request["path"], json=request.get("json"))
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies[request["name"]].append(time.perf_counter() - start)
+            if failed:
+                errors[request["name"]] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(request) for request in traffic))
+    elapsed = time.perf_counter() - start
+
+    endpoints = {
+        name: {**summarize(values), "errors": errors[name], "rps": round(len(values) / elapsed, 1)}
+        for name, values in sorted(latencies.items())
+    }
+    return {
+        "total": {
+            **summarize([value for values in latencies.values() for value in values]),
+            "errors": sum(errors.values()),
+            "rps": round(len(traffic) / elapsed, 1),
+            "wall_time_s": round(elapsed, 3),
+        },
+        "endpoints": endpoints,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind: str, db_path: str, workers: int, workdir: str):
+    """
+    Start uvicorn or gunicorn on a free port and wait until it is ready.
+    """
+    port = _free_port()
+    env = {
+        **os.environ,
+        "TESTING": "false",
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        # The schema comes from create_all, there is no migration history
+        "RUN_MIGRATIONS_ON_STARTUP": "false",
+        "SEED_LOCK_FILE": os.path.join(workdir, "seed.lock"),
+        "PROMETHEUS_MULTIPROC_DIR": os.path.join(workdir, "metrics"),
+        "WEB_CONCURRENCY": str(workers),
+        "GUNICORN_CHDIR": REPO_ROOT,
+    }
+    if kind == "uvicorn":
+        command = [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--port", str(port), "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+        ]
+    else:
+        # Command line options override gunicorn.conf.py, which is still loaded
+        command = [
+            sys.executable, "-m", "gunicorn", "app.main:app", "--bind", f"127.0.0.1:{port}", "--workers", str(workers),
+            "--access-logfile", "/dev/null", "--log-level", "warning",
+        ]
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{kind} exited with status {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health/live", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{kind} did not become ready within 60s")
+
+
+async def run(args, traffic: List[dict], engine, db_path: str, workdir: str) -> dict:
+    if args.server == "inprocess":
+        from benchmarks.common import use_engine
+        from app.main import app
+        use_engine(app, engine)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            await replay(client, traffic[:args.warmup], args.concurrency)
+            return await replay(client, traffic[args.warmup:], args.concurrency)
+
+    # Every worker process opens its own connections to the SQLite file
+    engine.dispose()
+    process, base_url = start_server(args.server, db_path, args.workers, workdir)
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            await replay(client, traffic[:args.warmup], args.concurrency)
+            return await replay(client, traffic[args.warmup:], args.concurrency)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--server", choices=["inprocess", "uvicorn", "gunicorn"], default="inprocess")
+    parser.add_argument("--workers", type=int, default=2, help="server worker processes")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100, help="requests sent before measuring")
+    parser.add_argument("--concurrency", type=int, default=16, help="maximum requests in flight")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint weights, e.g. fruits=40,fruit=40")
+    parser.add_argument("--traffic", help="replay recorded requests from this JSONL file")
+    parser.add_argument("--save-traffic", help="write the generated requests to this JSONL file")
+    parser.add_argument("--fruits", type=int, default=1000)
+    parser.add_argument("--suppliers", type=int, default=50)
+    parser.add_argument("--suppliers-per-fruit", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.traffic:
+        traffic = load_traffic(args.traffic)
+    else:
+        traffic = build_traffic(parse_mix(args.mix), args.warmup + args.requests, args.fruits, args.seed)
+    if args.save_traffic:
+        with open(args.save_traffic, "w") as f:
+            f.writelines(json.dumps(request) + "\n" for request in traffic)
+
+    workdir = tempfile.mkdtemp(prefix="fruits-bench-")
+    db_path = os.path.join(workdir, "loadtest.db")
+    os.makedirs(os.path.join(workdir, "metrics"))
+    engine = create_benchmark_engine(db_path, pool_size=args.concurrency)
+    seed_catalogue(engine, args.fruits, args.suppliers, args.suppliers_per_fruit, args.seed)
+
+    results = asyncio.run(run(args, traffic, engine, db_path, workdir))
+    results["config"] = vars(args)
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Response serialization throughput for large listings.
+
+Compares, for the same 10k-row payloads, the default FastAPI path (dicts
+validated against ``response_model`` or walked by ``jsonable_encoder``,
+then encoded with the stdlib json module) with returning a
+``FastJSONResponse`` directly. No database is involved.
+
+    python -m benchmarks.serialization --rows 10000 --repeat 20
+"""
+import argparse
+import time
+from typing import List
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from benchmarks.common import COLORS, COUNTRIES, report
+from app.api.v1.routes import FruitListItem
+from app.responses import FastJSONResponse
+
+
+def basic_rows(count: int) -> List[dict]:
+    return [{"id": i, "fruit": f"Fruit {i}", "color": COLORS[i % len(COLORS)]} for i in range(1, count + 1)]
+
+
+def detail_payload(count: int) -> dict:
+    fruits = [
+        {
+            "id": i,
+            "name": f"Fruit {i}",
+            "color": COLORS[i % len(COLORS)],
+            "taste": "Sweet",
+            "origin_country": COUNTRIES[i % len(COUNTRIES)],
+            "price_per_kg": 1.5 + i % 7,
+            "suppliers": [
+                {
+                    "id": i % 50 + 1,
+                    "name": f"Supplier {i % 50 + 1}",
+                    "contact_email": "supplier@example.com",
+                    "country": "Spain",
+                    "rating": 4.5,
+                }
+            ],
+            "nutritional_info": {
+                "id": i, "calories": 50, "carbohydrates": 12.0, "protein": 0.5,
+                "fat": 0.2, "fiber": 2.4, "vitamins": "C",
+            },
+        }
+        for i in range(1, count + 1)
+    ]
+    return {"fruits": fruits, "total_fruits": count, "total_suppliers": 50, "total_nutritional_records": count}
+
+
+def build_app(rows: List[dict], payload: dict) -> FastAPI:
+    app = FastAPI(default_response_class=JSONResponse)
+
+    @app.get("/default/fruits", response_model=List[FruitListItem], response_model_exclude_unset=True)
+    def default_fruits():
+        return rows
+
+    @app.get("/fast/fruits", response_model=List[FruitListItem], response_model_exclude_unset=True)
+    def fast_fruits():
+        return FastJSONResponse(rows)
+
+    @app.get("/default/get_all_data")
+    def default_all_data():
+        return payload
+
+    @app.get("/fast/get_all_data")
+    def fast_all_data():
+        return FastJSONResponse(payload)
+
+    return app
+
+
+def bench(client, url: str, rows: int, repeat: int) -> dict:
+    body = client.get(url).content
+    start = time.perf_counter()
+    for _ in range(repeat):
+        client.get(url).raise_for_status()
+    elapsed = time.perf_counter() - start
+    return {
+        "ms_per_response": round(elapsed / repeat * 1000, 2),
+        "rows_per_sec": round(rows * repeat / elapsed),
+        "bytes": len(body),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    client = TestClient(build_app(basic_rows(args.rows), detail_payload(args.rows)))
+    results = {}
+    for endpoint in ("fruits", "get_all_data"):
+        default = bench(client, f"/default/{endpoint}", args.rows, args.repeat)
+        fast = bench(client, f"/fast/{endpoint}", args.rows, args.repeat)
+        results[endpoint] = {
+            "default": default,
+            "fast": fast,
+            "speedup": round(default["ms_per_response"] / fast["ms_per_response"], 1),
+        }
+    results["config"] = vars(args)
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Import-to-ready time of the application in a fresh interpreter.
+
+Each run starts a new Python process that imports ``app.main``, runs the
+lifespan startup (engine initialization, migrations and seeding) and answers
+a first ``/health`` request. The first run starts from an empty SQLite
+database, later runs reuse it, like a worker restart.
+
+    python -m benchmarks.startup --runs 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.common import report, summarize
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    started = time.perf_counter()
+    client.get("/health").raise_for_status()
+    ready = time.perf_counter()
+print(json.dumps({"import": imported - start, "lifespan": started - imported, "ready": ready - start}))
+"""
+
+
+def run_once(env: dict) -> dict:
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["process"] = time.perf_counter() - start
+    return timings
+
+
+def _summaries(runs):
+    return {phase: summarize([run[phase] for run in runs]) for phase in ("import", "lifespan", "ready", "process")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fruits-bench-")
+    env = {
+        **os.environ,
+        "TESTING": "false",
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+        "SEED_LOCK_FILE": os.path.join(workdir, "seed.lock"),
+    }
+    runs = [run_once(env) for _ in range(args.runs)]
+
+    report({
+        "empty_database": _summaries(runs[:1]),
+        "existing_database": _summaries(runs[1:]),
+        "config": vars(args),
+    })
+
+
+if __name__ == "__main__":
+    main()
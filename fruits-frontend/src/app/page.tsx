@@ -7,6 +7,7 @@ import {
   DataGrid, 
   GridColDef, 
   GridActionsCellItem,
+  GridFilterModel,
   GridRenderCellParams,
   GridToolbar
 } from '@mui/x-data-grid';
@@ -36,6 +37,7 @@ interface ExtendedFruit {
   status: string;
   created_at: string;
   nutritional_info: {
+    id: number;
     calories: number;
     carbohydrates: number;
     protein: number;
@@ -57,8 +59,48 @@ interface AllData {
   total_fruits: number;
   total_suppliers: number;
   total_nutritional_records: number;
+  change_token: number;
 }
 
+interface Change {
+  entity: 'fruit' | 'supplier' | 'nutritional_info';
+  id: number;
+  operation: 'upsert' | 'delete';
+  data?: any;
+}
+
+// Apply /changes entries to a loaded /get_all_data snapshot
+const applyChanges = (data: AllData, changes: Change[]): AllData => {
+  const fruits = new Map(data.fruits.map((fruit) => [fruit.id, fruit]));
+  for (const change of changes) {
+    if (change.entity === 'fruit') {
+      if (change.operation === 'delete') {
+        fruits.delete(change.id);
+      } else {
+        fruits.set(change.id, { ...fruits.get(change.id), ...change.data });
+      }
+    } else if (change.entity === 'supplier') {
+      fruits.forEach((fruit, id) => {
+        if (!fruit.suppliers.some((supplier) => supplier.id === change.id)) {
+          return;
+        }
+        const suppliers = change.operation === 'delete'
+          ? fruit.suppliers.filter((supplier) => supplier.id !== change.id)
+          : fruit.suppliers.map((supplier) => (supplier.id === change.id ? change.data : supplier));
+        fruits.set(id, { ...fruit, suppliers });
+      });
+    } else if (change.operation === 'upsert') {
+      // Nutrition is only deleted along with its fruit, which has its own tombstone
+      const fruit = fruits.get(change.data.fruit_id);
+      if (fruit) {
+        fruits.set(fruit.id, { ...fruit, nutritional_info: change.data });
+      }
+    }
+  }
+  const synced = Array.from(fruits.values()).sort((a, b) => a.id - b.id);
+  return { ...data, fruits: synced, total_fruits: synced.length };
+};
+
 // Create a dark theme
 const darkTheme = createTheme({
   palette: {
@@ -75,15 +117,18 @@ const darkTheme = createTheme({
 
 export default function Home() {
   const [basicFruits, setBasicFruits] = useState<BasicFruit[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [filters, setFilters] = useState<Record<string, string>>({});
   const [allData, setAllData] = useState<AllData | null>(null);
   const [loading, setLoading] = useState(false);
   const [activeTab, setActiveTab] = useState<'list' | 'extended'>('list');
 
   const API_BASE_URL = 'https://fruits-api-app.azurewebsites.net/api/v1';
+  const PAGE_SIZE = 100;
 
   useEffect(() => {
     fetchBasicFruits();
-  }, []);
+  }, [filters]);
 
   useEffect(() => {
     if (activeTab === 'extended') {
@@ -91,11 +136,40 @@ export default function Home() {
     }
   }, [activeTab]);
 
-  const fetchBasicFruits = async () => {
+  // Column filters the API can apply, so they also reach fruits that are not
+  // loaded yet. The grid still filters the loaded rows itself, which keeps the
+  // quick filter on every column and the operators the API has no parameter for
+  const handleFilterModelChange = (model: GridFilterModel) => {
+    const params: Record<string, string> = {};
+    for (const item of model.items) {
+      const value = typeof item.value === 'string' ? item.value.trim() : '';
+      if (!value) {
+        continue;
+      }
+      // q matches word prefixes, so it finds every name starting with the value
+      if (item.field === 'fruit' && (item.operator === 'startsWith' || item.operator === 'equals')) {
+        params.q = value;
+      } else if (item.field === 'color' && item.operator === 'equals') {
+        params.color = value;
+      }
+    }
+    if (JSON.stringify(params) !== JSON.stringify(filters)) {
+      setFilters(params);
+    }
+  };
+
+  const fetchBasicFruits = async (after: string | null = null) => {
     try {
       setLoading(true);
-      const response = await axios.get(`${API_BASE_URL}/fruits`);
-      setBasicFruits(response.data);
+      const response = await axios.get(`${API_BASE_URL}/fruits`, {
+        params: {
+          limit: PAGE_SIZE,
+          ...(after ? { after } : {}),
+          ...filters,
+        },
+      });
+      setBasicFruits((previous) => (after ? [...previous, ...response.data] : response.data));
+      setNextCursor(response.headers['x-next-cursor'] ?? null);
       toast.success('Fruits loaded successfully');
     } catch (error) {
       toast.error('Failed to load fruits');
@@ -105,9 +179,35 @@ export default function Home() {
     }
   };
 
+  // Fetch only what changed since the loaded snapshot
+  const syncAllData = async (data: AllData) => {
+    const changes: Change[] = [];
+    let since = data.change_token;
+    let hasMore = true;
+    while (hasMore) {
+      const response = await axios.get(`${API_BASE_URL}/changes`, { params: { since } });
+      changes.push(...response.data.changes);
+      since = response.data.next_since;
+      hasMore = response.data.has_more;
+    }
+    setAllData({ ...applyChanges(data, changes), change_token: since });
+    toast.success(changes.length ? `${changes.length} changes synced` : 'Data is up to date');
+  };
+
   const fetchAllData = async () => {
     try {
       setLoading(true);
+      if (allData) {
+        try {
+          await syncAllData(allData);
+          return;
+        } catch (error) {
+          // 410: the change log no longer reaches back to our token, reload everything
+          if (!axios.isAxiosError(error) || error.response?.status !== 410) {
+            throw error;
+          }
+        }
+      }
       const response = await axios.get(`${API_BASE_URL}/get_all_data`);
       console.log('Fetched data:', response.data);
       if (!response.data || !response.data.fruits || !Array.isArray(response.data.fruits)) {
@@ -150,6 +250,11 @@ export default function Home() {
         </div>
       ),
     },
+    {
+      field: 'color',
+      headerName: 'Color',
+      width: 140,
+    },
     {
       field: 'actions',
       headerName: '',
@@ -202,10 +307,22 @@ export default function Home() {
   const renderBasicFruits = () => (
     <div className="animate-fadeIn">
       <div className="flex justify-between items-center mb-6">
-        <h2 className="text-2xl font-bold text-white">Fruits ({basicFruits.length} total)</h2>
+        <h2 className="text-2xl font-bold text-white">
+          Fruits ({basicFruits.length} {nextCursor ? 'loaded' : 'total'})
+        </h2>
         <div className="flex gap-2">
+          {nextCursor && (
+            <button
+              onClick={() => fetchBasicFruits(nextCursor)}
+              disabled={loading}
+              className="inline-flex items-center px-4 py-2 rounded-lg text-sm font-medium transition-colors
+                bg-white/10 text-white hover:bg-white/20 disabled:opacity-50"
+            >
+              Load more
+            </button>
+          )}
           <button
-            onClick={fetchBasicFruits}
+            onClick={() => fetchBasicFruits()}
             disabled={loading}
             className="inline-flex items-center px-4 py-2 rounded-lg text-sm font-medium transition-colors
               bg-blue-500 text-white hover:bg-blue-600 disabled:opacity-50"
@@ -222,6 +339,7 @@ export default function Home() {
             columns={columns}
             loading={loading}
             disableRowSelectionOnClick
+            onFilterModelChange={handleFilterModelChange}
             slots={{ toolbar: GridToolbar }}
             slotProps={{
               toolbar: {
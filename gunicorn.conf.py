@@ -1,13 +1,49 @@
 import multiprocessing
+import os
+import shutil
+import tempfile
+
+# Workers write their metrics to files in this directory so /metrics can
+# aggregate all of them. It must exist before the app is imported and is
+# emptied on every start so values of dead workers from a previous run are
+# not reported
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "fruits-api-metrics")
+)
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
 
 # Gunicorn config variables
 bind = "0.0.0.0:8000"
-workers = multiprocessing.cpu_count() * 2 + 1
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
 worker_class = "uvicorn.workers.UvicornWorker"
 timeout = 600
-chdir = "/home/site/wwwroot"
+chdir = os.getenv("GUNICORN_CHDIR", "/home/site/wwwroot")
 wsgi_app = "app.main:app"
-accesslog = "-"
+# The app writes its own JSON access log through a non-blocking queue (see
+# app.log); gunicorn's would be a second, synchronous write per request
+accesslog = None
 errorlog = "-"
 loglevel = "info"
-capture_output = True 
\ No newline at end of file
+capture_output = False
+# Import the app once in the master and fork it into the workers. The
+# database engine is created lazily, so the master opens no connections
+preload_app = os.getenv("GUNICORN_PRELOAD_APP", "true").lower() == "true"
+
+def on_starting(server):
+    # Let workers size their connection pools for the final worker count,
+    # including a --workers override on the command line
+    os.environ["WEB_CONCURRENCY"] = str(server.cfg.workers)
+
+def post_fork(server, worker):
+    # With preload_app the settings were read in the master, before a
+    # --workers override was known; also never reuse the parent's connections
+    from app.config import settings
+    from app.database import dispose_engine
+    settings.WEB_CONCURRENCY = server.cfg.workers
+    dispose_engine(close=False)
+
+def child_exit(server, worker):
+    # Drop the live gauges of the worker that exited
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,59 @@
+"""
+Alembic environment.
+
+Migrations run against the application's engine unless a connection is
+passed in through ``config.attributes["connection"]`` (used by
+app.migrate and the tests).
+"""
+from logging.config import fileConfig
+from alembic import context
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+from app.database import Base
+import app.models  # noqa: F401  registers the tables on Base.metadata
+from app.migrate import include_object
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    from app.database import database_url
+    context.configure(
+        url=database_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is None:
+        from app.database import get_engine
+        with get_engine().connect() as connection:
+            _run(connection)
+    else:
+        _run(connection)
+
+
+def _run(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=True,
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,81 @@
+"""Initial schema
+
+The tables as they were created by ``Base.metadata.create_all`` before
+migrations were introduced. Existing databases are stamped at this revision
+by app.migrate instead of running it.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "fruits",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=50), nullable=True),
+        sa.Column("color", sa.String(length=50), nullable=True),
+        sa.Column("taste", sa.String(length=50), nullable=True),
+        sa.Column("origin_country", sa.String(length=100), nullable=True),
+        sa.Column("price_per_kg", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_fruits_id", "fruits", ["id"])
+    op.create_index("ix_fruits_name", "fruits", ["name"])
+
+    op.create_table(
+        "suppliers",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=True),
+        sa.Column("country", sa.String(length=100), nullable=True),
+        sa.Column("contact_email", sa.String(length=100), nullable=True),
+        sa.Column("rating", sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_suppliers_id", "suppliers", ["id"])
+
+    op.create_table(
+        "nutritional_info",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("fruit_id", sa.Integer(), nullable=True),
+        sa.Column("calories", sa.Integer(), nullable=True),
+        sa.Column("carbohydrates", sa.Float(), nullable=True),
+        sa.Column("protein", sa.Float(), nullable=True),
+        sa.Column("fat", sa.Float(), nullable=True),
+        sa.Column("fiber", sa.Float(), nullable=True),
+        sa.Column("vitamins", sa.String(length=200), nullable=True),
+        sa.ForeignKeyConstraint(["fruit_id"], ["fruits.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_nutritional_info_id", "nutritional_info", ["id"])
+
+    op.create_table(
+        "fruit_suppliers",
+        sa.Column("fruit_id", sa.Integer(), nullable=False),
+        sa.Column("supplier_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["fruit_id"], ["fruits.id"]),
+        sa.ForeignKeyConstraint(["supplier_id"], ["suppliers.id"]),
+        sa.PrimaryKeyConstraint("fruit_id", "supplier_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("fruit_suppliers")
+    op.drop_index("ix_nutritional_info_id", table_name="nutritional_info")
+    op.drop_table("nutritional_info")
+    op.drop_index("ix_suppliers_id", table_name="suppliers")
+    op.drop_table("suppliers")
+    op.drop_index("ix_fruits_name", table_name="fruits")
+    op.drop_index("ix_fruits_id", table_name="fruits")
+    op.drop_table("fruits")
@@ -0,0 +1,33 @@
+"""Secondary indexes and one-to-one nutrition constraint
+
+Adds indexes for supplier-side joins on fruit_suppliers, nutrition lookups
+by fruit and filtering fruits by color and origin country. The nutrition
+index is unique to enforce the one-to-one Fruit.nutritional_info
+relationship; duplicate nutrition rows for a fruit must be removed before
+upgrading.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_nutritional_info_fruit_id", "nutritional_info", ["fruit_id"], unique=True)
+    op.create_index("ix_fruit_suppliers_supplier_id", "fruit_suppliers", ["supplier_id"])
+    op.create_index("ix_fruits_color", "fruits", ["color"])
+    op.create_index("ix_fruits_origin_country", "fruits", ["origin_country"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_fruits_origin_country", table_name="fruits")
+    op.drop_index("ix_fruits_color", table_name="fruits")
+    op.drop_index("ix_fruit_suppliers_supplier_id", table_name="fruit_suppliers")
+    op.drop_index("ix_nutritional_info_fruit_id", table_name="nutritional_info")
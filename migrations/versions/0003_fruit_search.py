@@ -0,0 +1,55 @@
+"""Fruit filtering, sorting and name search
+
+Indexes price_per_kg for range filters and sorting, and nutritional calories
+for calorie range filters. Name search gets a FULLTEXT index on MySQL and an
+FTS5 table kept in sync by triggers on SQLite, filled from existing rows.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+FRUITS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE fruits_fts USING fts5(name, content='fruits', content_rowid='id')",
+    "CREATE TRIGGER fruits_fts_ai AFTER INSERT ON fruits BEGIN "
+    "INSERT INTO fruits_fts(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER fruits_fts_ad AFTER DELETE ON fruits BEGIN "
+    "INSERT INTO fruits_fts(fruits_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER fruits_fts_au AFTER UPDATE OF name ON fruits BEGIN "
+    "INSERT INTO fruits_fts(fruits_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+    "INSERT INTO fruits_fts(rowid, name) VALUES (new.id, new.name); END",
+    "INSERT INTO fruits_fts(fruits_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    op.create_index("ix_fruits_price_per_kg", "fruits", ["price_per_kg"])
+    op.create_index("ix_nutritional_info_calories", "nutritional_info", ["calories"])
+
+    dialect = op.get_bind().dialect.name
+    if dialect == "mysql":
+        op.create_index("ix_fruits_name_fulltext", "fruits", ["name"], mysql_prefix="FULLTEXT")
+    elif dialect == "sqlite":
+        for statement in FRUITS_FTS_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "mysql":
+        op.drop_index("ix_fruits_name_fulltext", table_name="fruits")
+    elif dialect == "sqlite":
+        # Dropping the table also drops the triggers writing to it
+        for trigger in ("fruits_fts_ai", "fruits_fts_ad", "fruits_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS fruits_fts")
+
+    op.drop_index("ix_nutritional_info_calories", table_name="nutritional_info")
+    op.drop_index("ix_fruits_price_per_kg", table_name="fruits")
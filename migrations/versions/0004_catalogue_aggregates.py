@@ -0,0 +1,70 @@
+"""Catalogue aggregates summary table
+
+Adds catalogue_aggregates, the per-bucket counts and sums behind
+/api/v1/stats (see app.aggregates), and fills it from the existing rows.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+import math
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+NUTRIENTS = ("calories", "carbohydrates", "protein", "fat", "fiber")
+
+
+def _fill(table) -> None:
+    bind = op.get_bind()
+    totals = {}
+
+    def add(dimension, bucket, items, value_count, value_sum):
+        entry = totals.setdefault((dimension, bucket), [0, 0, 0.0])
+        entry[0] += items
+        entry[1] += value_count
+        entry[2] += value_sum or 0
+
+    for dimension, column in (("price_by_country", "origin_country"), ("price_by_color", "color")):
+        for bucket, *values in bind.execute(sa.text(
+            f"SELECT {column}, COUNT(*), COUNT(price_per_kg), SUM(price_per_kg) FROM fruits GROUP BY {column}"
+        )):
+            add(dimension, bucket or "", *values)
+    for rating, *values in bind.execute(sa.text(
+        "SELECT rating, COUNT(*), COUNT(rating), SUM(rating) FROM suppliers GROUP BY rating"
+    )):
+        add("supplier_rating", "" if rating is None else str(math.floor(rating * 2) / 2), *values)
+    for name in NUTRIENTS:
+        items, *values = bind.execute(sa.text(
+            f"SELECT COUNT(*), COUNT({name}), SUM({name}) FROM nutritional_info"
+        )).one()
+        if items:
+            add("nutrition", name, items, *values)
+
+    if totals:
+        op.bulk_insert(table, [
+            {"dimension": dimension, "bucket": bucket, "items": items, "value_count": count, "value_sum": total}
+            for (dimension, bucket), (items, count, total) in totals.items()
+        ])
+
+
+def upgrade() -> None:
+    table = op.create_table(
+        "catalogue_aggregates",
+        sa.Column("dimension", sa.String(length=50), nullable=False),
+        sa.Column("bucket", sa.String(length=100), nullable=False),
+        sa.Column("items", sa.Integer(), nullable=False),
+        sa.Column("value_count", sa.Integer(), nullable=False),
+        sa.Column("value_sum", sa.Double(), nullable=False),
+        sa.PrimaryKeyConstraint("dimension", "bucket"),
+    )
+    _fill(table)
+
+
+def downgrade() -> None:
+    op.drop_table("catalogue_aggregates")
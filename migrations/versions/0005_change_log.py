@@ -0,0 +1,73 @@
+"""Change log for delta sync
+
+Adds change_log, the feed behind /api/v1/changes, with triggers recording
+every insert, update and delete on fruits, suppliers, nutritional_info and
+fruit_suppliers. Existing rows are logged as upserts so a client syncing
+from token 0 receives the whole catalogue. Indexes fruits.updated_at.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# (table, entity, id column); supplier link changes are upserts of the fruit
+CHANGE_LOG_SOURCES = [
+    ("fruits", "fruit", "id"),
+    ("suppliers", "supplier", "id"),
+    ("nutritional_info", "nutritional_info", "id"),
+    ("fruit_suppliers", "fruit", "fruit_id"),
+]
+
+EVENTS = (("INSERT", "new", "upsert"), ("UPDATE", "new", "upsert"), ("DELETE", "old", "delete"))
+
+
+def _triggers(dialect: str):
+    for table, entity, column in CHANGE_LOG_SOURCES:
+        for event_name, row, operation in EVENTS:
+            if table == "fruit_suppliers":
+                operation = "upsert"
+            insert = (
+                f"INSERT INTO change_log (entity, entity_id, operation) "
+                f"VALUES ('{entity}', {row}.{column}, '{operation}')"
+            )
+            trigger = f"{table}_changes_{event_name[0].lower()}"
+            if dialect == "mysql":
+                yield trigger, f"CREATE TRIGGER {trigger} AFTER {event_name} ON {table} FOR EACH ROW {insert}"
+            else:
+                yield trigger, f"CREATE TRIGGER {trigger} AFTER {event_name} ON {table} BEGIN {insert}; END"
+
+
+def upgrade() -> None:
+    op.create_table(
+        "change_log",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), nullable=False),
+        sa.Column("entity", sa.String(length=20), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("operation", sa.String(length=10), nullable=False),
+        sa.Column("changed_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_fruits_updated_at", "fruits", ["updated_at"])
+
+    for table, entity in (("fruits", "fruit"), ("suppliers", "supplier"), ("nutritional_info", "nutritional_info")):
+        op.execute(
+            f"INSERT INTO change_log (entity, entity_id, operation) "
+            f"SELECT '{entity}', id, 'upsert' FROM {table} ORDER BY id"
+        )
+    for _, statement in _triggers(op.get_bind().dialect.name):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    for trigger, _ in _triggers(op.get_bind().dialect.name):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.drop_index("ix_fruits_updated_at", table_name="fruits")
+    op.drop_table("change_log")
@@ -6,16 +6,21 @@ from sqlalchemy.orm import sessionmaker
 
 # Set testing environment variable before importing any app modules
 os.environ["TESTING"] = "true"
+# Fail requests that run more SQL statements than their route's budget
+os.environ["QUERY_BUDGET_STRICT"] = "true"
 
 # Import app modules after setting environment variable
 from app.main import app
 from app.database import Base, get_db
+from app.cache import response_cache
+from app.metrics import instrument_engine
 from app.models import Fruit, NutritionalInfo, Supplier
 
 # Create test database engine
 TEST_DATABASE_URL = "sqlite:///:memory:"
 test_engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+instrument_engine(test_engine)
 
 @pytest.fixture(scope="session")
 def engine():
@@ -28,6 +33,12 @@ def create_tables(engine):
     yield
     Base.metadata.drop_all(bind=engine)
 
+@pytest.fixture(scope="function", autouse=True)
+def clear_response_cache():
+    """Start every test with an empty response cache"""
+    response_cache.clear()
+    yield
+
 @pytest.fixture
 def db_session(create_tables):
     """Provide a clean database session for each test"""
@@ -54,4 +65,40 @@ def client(db_session):
     app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as test_client:
         yield test_client
-    app.dependency_overrides.clear() 
\ No newline at end of file
+    app.dependency_overrides.clear() 
+# The sample catalogue: name, color, taste, origin_country, price_per_kg, calories
+CATALOGUE = [
+    ("Green Apple", "green", "sour", "Spain", 2.5, 52),
+    ("Apple", "red", "sweet", "USA", 2.5, 52),
+    ("Pineapple", "yellow", "sweet", "Costa Rica", 4.0, 50),
+    ("Banana", "yellow", "sweet", "Ecuador", 1.2, 89),
+    ("Durian", "green", "savory", "Thailand", None, 147),
+]
+
+@pytest.fixture
+def catalogue(db_session):
+    """Factory adding the sample catalogue, or count fruits named fruit-0..., and returning the "Farm" supplier"""
+    # Fruits from Spain and Ecuador are supplied by "Farm" and suppliers - 1 more
+    def add(count=None, suppliers=1):
+        farms = [
+            Supplier(name="Farm" if i == 0 else f"Farm {i + 1}", country="Spain",
+                     contact_email="farm@example.com", rating=4.0)
+            for i in range(suppliers)
+        ]
+        rows = CATALOGUE if count is None else [(f"fruit-{i}", "red", "sweet", "Spain", 1.5, 50) for i in range(count)]
+        for name, color, taste, country, price, calories in rows:
+            fruit = Fruit(name=name, color=color, taste=taste, origin_country=country, price_per_kg=price)
+            fruit.nutritional_info = NutritionalInfo(calories=calories)
+            if country in ("Spain", "Ecuador"):
+                fruit.suppliers.extend(farms)
+            db_session.add(fruit)
+        db_session.commit()
+        return farms[0]
+    return add
+
+@pytest.fixture
+def bulk_row():
+    """Build a valid POST /fruits/bulk row, with fields replaced by ``overrides``"""
+    def build(name, **overrides):
+        return {"name": name, "color": "red", "taste": "sweet", "origin_country": "USA", "price_per_kg": 1.0, **overrides}
+    return build
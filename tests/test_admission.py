@@ -0,0 +1,140 @@
+import asyncio
+import httpx
+from fastapi import FastAPI
+from app.admission import AdmissionGate, AdmissionMiddleware, TokenBucket, client_address, route_class
+from app.metrics import ADMISSION_REJECTED
+
+def _blocking_app(release: asyncio.Event, **options):
+    inner = FastAPI()
+
+    @inner.get("/api/v1/fruits")
+    async def fruits():
+        await release.wait()
+        return {"ok": True}
+
+    @inner.get("/api/v1/get_all_data")
+    async def all_data():
+        return {"ok": True}
+
+    @inner.get("/health/live")
+    async def live():
+        return {"status": "alive"}
+
+    options.setdefault("limits", {"light": (1, 1), "heavy": (1, 1)})
+    return AdmissionMiddleware(inner, **options)
+
+def _client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+def _rejected(route, reason):
+    return ADMISSION_REJECTED.labels(route_class=route, reason=reason)._value.get()
+
+def test_route_class():
+    assert route_class("/api/v1/get_all_data") == "heavy"
+    assert route_class("/api/v1/fruits:batchGet") == "heavy"
+    assert route_class("/api/v1/fruits/3") == "light"
+    assert route_class("/health/ready") is None
+    assert route_class("/metrics") is None
+
+def test_saturated_class_is_shed_with_retry_after():
+    async def scenario():
+        release = asyncio.Event()
+        app = _blocking_app(release, queue_timeout=5, retry_after=3)
+        async with _client(app) as client:
+            running = asyncio.create_task(client.get("/api/v1/fruits"))
+            await asyncio.sleep(0.05)
+            queued = asyncio.create_task(client.get("/api/v1/fruits"))
+            await asyncio.sleep(0.05)
+
+            # The queue holds one request, the next is turned away at once
+            shed = await client.get("/api/v1/fruits")
+            assert shed.status_code == 503
+            assert shed.headers["retry-after"] == "3"
+            # Other route classes and health checks are not affected
+            assert (await client.get("/api/v1/get_all_data")).status_code == 200
+            assert (await client.get("/health/live")).status_code == 200
+
+            release.set()
+            assert (await running).status_code == 200
+            assert (await queued).status_code == 200
+            assert app.gates["light"].in_flight == 0
+
+    before = _rejected("light", "queue_full")
+    asyncio.run(scenario())
+    assert _rejected("light", "queue_full") == before + 1
+
+def test_queued_request_times_out():
+    async def scenario():
+        release = asyncio.Event()
+        app = _blocking_app(release, queue_timeout=0.05)
+        async with _client(app) as client:
+            running = asyncio.create_task(client.get("/api/v1/fruits"))
+            await asyncio.sleep(0.05)
+            assert (await client.get("/api/v1/fruits")).status_code == 503
+            release.set()
+            assert (await running).status_code == 200
+            assert app.gates["light"].queued == 0
+
+    before = _rejected("light", "queue_timeout")
+    asyncio.run(scenario())
+    assert _rejected("light", "queue_timeout") == before + 1
+
+def test_gate_hands_slots_over_in_order():
+    async def scenario():
+        gate = AdmissionGate(limit=1, queue_size=2)
+        assert await gate.acquire(1) is None
+        order = []
+
+        async def wait(name):
+            assert await gate.acquire(1) is None
+            order.append(name)
+
+        waiters = [asyncio.create_task(wait("first")), asyncio.create_task(wait("second"))]
+        await asyncio.sleep(0)
+        assert gate.queued == 2
+        gate.release()
+        await asyncio.sleep(0)
+        gate.release()
+        await asyncio.gather(*waiters)
+        gate.release()
+        assert order == ["first", "second"]
+        assert gate.in_flight == 0
+
+    asyncio.run(scenario())
+
+def test_token_bucket():
+    now = [0.0]
+    buckets = TokenBucket(rate=2, burst=2, max_keys=2, clock=lambda: now[0])
+    assert buckets.take("a") == 0
+    assert buckets.take("a") == 0
+    assert buckets.take("a") == 0.5
+    assert buckets.take("b") == 0
+    now[0] = 0.5
+    assert buckets.take("a") == 0
+
+    # "a" is the least recently seen key and is dropped for "c"
+    buckets.take("b")
+    buckets.take("c")
+    assert buckets.take("a") == 0
+
+def test_rate_limit_per_client():
+    async def scenario():
+        app = _blocking_app(asyncio.Event(), rate_limit=1, rate_limit_burst=2, trusted_proxies=1)
+        async with _client(app) as client:
+            def get(address):
+                return client.get("/api/v1/get_all_data", headers={"X-Forwarded-For": f"10.0.0.9, {address}"})
+
+            assert [(await get("10.0.0.1")).status_code for _ in range(3)] == [200, 200, 429]
+            limited = await get("10.0.0.1")
+            assert limited.status_code == 429
+            assert limited.headers["retry-after"] == "1"
+            assert (await get("10.0.0.2")).status_code == 200
+
+    asyncio.run(scenario())
+
+def test_client_address():
+    scope = {"client": ("127.0.0.1", 5000), "headers": [(b"x-forwarded-for", b"1.1.1.1, 2.2.2.2")]}
+    assert client_address(scope) == "127.0.0.1"
+    assert client_address(scope, trusted_proxies=1) == "2.2.2.2"
+    assert client_address(scope, trusted_proxies=5) == "1.1.1.1"
+    assert client_address({"client": None, "headers": []}, trusted_proxies=1) == "unknown"
@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import create_engine, insert, update
+from app.aggregates import compute_aggregates, rebuild_aggregates, stored_aggregates
+from app.migrate import run_migrations
+from app.models import CatalogueAggregate, Fruit, NutritionalInfo, Supplier
+from app.seed import seed_database
+
+def _assert_consistent(connection):
+    stored = stored_aggregates(connection)
+    computed = {key: values for key, values in compute_aggregates(connection).items() if values[0]}
+    assert stored.keys() == computed.keys()
+    for key, values in computed.items():
+        assert stored[key] == pytest.approx(values), key
+
+def test_incremental_aggregates_match_full_recompute(client, db_session, bulk_row):
+    seed_database(db_session)
+
+    farm = Supplier(name="Farm", country="Spain", contact_email="farm@example.com", rating=3.7)
+    for i, price in enumerate([1.25, None, 4.0]):
+        fruit = Fruit(name=f"fruit-{i}", color="green", origin_country=None if i else "Spain", price_per_kg=price)
+        fruit.nutritional_info = NutritionalInfo(calories=40 + i, carbohydrates=10.5, fiber=None)
+        fruit.suppliers.append(farm)
+        db_session.add(fruit)
+    db_session.commit()
+    _assert_consistent(db_session.connection())
+
+    assert client.post("/api/v1/fruits", json={"fruit": "kiwi", "color": "brown"}).status_code == 200
+    rows = [bulk_row("plum"), bulk_row("fig", price_per_kg="cheap"), bulk_row("lime", color="green")]
+    assert client.post("/api/v1/fruits/bulk", json=rows).json()["inserted"] == 2
+    _assert_consistent(db_session.connection())
+
+    # Attributes changed on expired objects, the old values are not loaded
+    apple = db_session.query(Fruit).filter(Fruit.name == "Apple").one()
+    db_session.commit()
+    apple.price_per_kg = 5.5
+    apple.origin_country = "Italy"
+    apple.nutritional_info.calories = 60
+    farm.rating = 4.9
+    db_session.commit()
+    _assert_consistent(db_session.connection())
+
+    db_session.delete(db_session.query(Fruit).filter(Fruit.name == "fruit-0").one())
+    db_session.delete(db_session.query(NutritionalInfo).filter(NutritionalInfo.calories == 41).one())
+    db_session.delete(farm)
+    db_session.commit()
+    _assert_consistent(db_session.connection())
+
+def test_aggregates_without_upsert_support(db_session, engine, monkeypatch):
+    # Dialects other than SQLite and MySQL update or insert each bucket
+    monkeypatch.setattr(engine.dialect, "name", "other")
+    seed_database(db_session)
+    _assert_consistent(db_session.connection())
+
+    apple = db_session.query(Fruit).filter(Fruit.name == "Apple").one()
+    apple.price_per_kg = 5.5
+    apple.origin_country = "Atlantis"
+    db_session.add(Fruit(name="kiwi", color="brown", origin_country="Atlantis", price_per_kg=2.0))
+    db_session.commit()
+    _assert_consistent(db_session.connection())
+
+def test_rebuild_aggregates(db_session):
+    seed_database(db_session)
+    connection = db_session.connection()
+    connection.execute(update(CatalogueAggregate).values(items=0, value_sum=0))
+    assert stored_aggregates(connection) == {}
+
+    assert rebuild_aggregates(connection) == len(compute_aggregates(connection))
+    _assert_consistent(connection)
+
+def test_migration_fills_aggregates(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'aggregates.db'}")
+    run_migrations(engine, "0003")
+    with engine.begin() as conn:
+        conn.execute(insert(Fruit), [{"name": "apple", "color": "red", "price_per_kg": 2.0}, {"name": "pear", "color": None, "price_per_kg": None}])
+        conn.execute(insert(Supplier), [{"name": "Farm", "rating": 4.2}])
+        conn.execute(insert(NutritionalInfo), [{"fruit_id": 1, "calories": 52}])
+    run_migrations(engine)
+    with engine.connect() as conn:
+        _assert_consistent(conn)
+        assert stored_aggregates(conn)[("supplier_rating", "4.0")] == [1, 1, pytest.approx(4.2)]
+    engine.dispose()
+
+def test_stats_endpoint(client, db_session):
+    seed_database(db_session)
+    data = client.get("/api/v1/stats").json()
+
+    usa = next(row for row in data["price_by_origin_country"] if row["origin_country"] == "USA")
+    assert usa == {"origin_country": "USA", "fruits": 1, "avg_price_per_kg": 2.99}
+    assert {row["color"] for row in data["price_by_color"]} == {"Red", "Yellow", "Orange"}
+    assert data["supplier_ratings"] == {
+        "suppliers": 3,
+        "avg_rating": 4.5,
+        "distribution": [{"rating": 4.0, "suppliers": 1}, {"rating": 4.5, "suppliers": 2}],
+    }
+    assert data["nutrition"]["records"] == 3
+    assert data["nutrition"]["totals"]["calories"] == 52 + 89 + 47
+    assert data["nutrition"]["averages"]["calories"] == pytest.approx(62.6667)
@@ -1,11 +1,17 @@
+import base64
+import json
 import os
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
 from app.main import app
 from app.database import Base, get_db
+from app.cache import response_cache
+from app.config import settings
+from app.crud import insert_fruit_batch, iter_fruits_with_relations
 from app.models import Fruit, NutritionalInfo, Supplier
+from app import responses
 
 # Set testing environment variable
 os.environ["TESTING"] = "true"
@@ -161,4 +167,534 @@ def test_create_fruit(client):
     data = response.json()
     assert data["fruit"] == "apple"
     assert data["color"] == "red"
-    assert "id" in data 
\ No newline at end of file
+    assert "id" in data 
+
+def _add_fruits_with_relations(db_session, count, start=0):
+    supplier = Supplier(name=f"Supplier {start}", country="USA", contact_email="s@example.com", rating=4.0)
+    db_session.add(supplier)
+    for i in range(start, start + count):
+        fruit = Fruit(name=f"fruit-{i}", color="red", taste="sweet", origin_country="USA", price_per_kg=1.5)
+        fruit.nutritional_info = NutritionalInfo(
+            calories=50, carbohydrates=10, protein=0.5, fat=0.1, fiber=2, vitamins="C"
+        )
+        fruit.suppliers.append(supplier)
+        db_session.add(fruit)
+    db_session.commit()
+
+def _count_statements(engine, func):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return result, statements
+
+def test_get_all_data_query_count_is_constant(client, db_session, engine):
+    _add_fruits_with_relations(db_session, 1)
+    response, small = _count_statements(engine, lambda: client.get("/api/v1/get_all_data"))
+    assert response.json()["total_fruits"] == 1
+
+    # Rows are written behind the API's back, so drop the cached response
+    _add_fruits_with_relations(db_session, 50, start=1)
+    response_cache.invalidate("fruits")
+    response, large = _count_statements(engine, lambda: client.get("/api/v1/get_all_data"))
+    data = response.json()
+    assert data["total_fruits"] == 51
+    assert data["total_suppliers"] == 2
+    assert data["total_nutritional_records"] == 51
+    assert all(len(f["suppliers"]) == 1 for f in data["fruits"])
+
+    # Catalogue version for the ETag, change token, fruits with nutrition,
+    # suppliers, counts
+    assert len(small) == len(large) == 5
+
+def test_get_fruits_keyset_pagination(client, db_session):
+    db_session.add_all([Fruit(name=f"fruit-{i}", color="red") for i in range(5)])
+    db_session.commit()
+
+    response = client.get("/api/v1/fruits", params={"limit": 2})
+    assert response.status_code == 200
+    first_page = response.json()
+    assert [f["fruit"] for f in first_page] == ["fruit-0", "fruit-1"]
+    cursor = response.headers["X-Next-Cursor"]
+
+    seen = list(first_page)
+    while cursor:
+        response = client.get("/api/v1/fruits", params={"limit": 2, "after": cursor})
+        assert response.status_code == 200
+        seen.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+
+    assert [f["fruit"] for f in seen] == [f"fruit-{i}" for i in range(5)]
+
+def test_get_fruits_invalid_cursor(client):
+    response = client.get("/api/v1/fruits", params={"after": "not-a-cursor"})
+    assert response.status_code == 400
+
+def _raw_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+def test_get_fruits_rejects_tampered_cursor_id(client):
+    for last_id in (True, -1, 2 ** 63, "1", None):
+        response = client.get("/api/v1/fruits", params={"after": _raw_cursor({"id": last_id})})
+        assert response.status_code == 400, last_id
+
+def test_tampered_sort_cursor_is_rejected(client, catalogue):
+    catalogue()
+    for value in ({"a": 1}, [1, 2], True, 3.5):
+        after = _raw_cursor({"id": 1, "sort": "name", "value": value})
+        assert client.get("/api/v1/fruits", params={"sort": "name", "after": after}).status_code == 400, value
+        response = client.get("/api/v1/get_all_data", params={"sort": "name", "after": after})
+        assert response.status_code == 400
+        assert "SELECT" not in response.text
+    after = _raw_cursor({"id": 1, "sort": "price_per_kg", "value": "cheap"})
+    assert client.get("/api/v1/fruits", params={"sort": "price_per_kg", "after": after}).status_code == 400
+
+    # Genuine values of the column type, whole prices included, still work
+    after = _raw_cursor({"id": 1, "sort": "price_per_kg", "value": 2})
+    names = _names(client.get("/api/v1/fruits", params={"sort": "price_per_kg", "after": after}))
+    assert names[:3] == ["Green Apple", "Apple", "Pineapple"]
+
+def test_get_fruits_field_projection(client, db_session, engine):
+    db_session.add(Fruit(name="apple", color="red", taste="sweet"))
+    db_session.commit()
+
+    response, statements = _count_statements(
+        engine, lambda: client.get("/api/v1/fruits", params={"fields": "fruit"})
+    )
+    assert response.status_code == 200
+    assert list(response.json()[0].keys()) == ["id", "fruit"]
+    assert "color" not in statements[0]
+
+    response = client.get("/api/v1/fruits", params={"fields": "price"})
+    assert response.status_code == 400
+
+def test_get_all_data_pagination_and_projection(client, db_session):
+    _add_fruits_with_relations(db_session, 3)
+
+    response = client.get("/api/v1/get_all_data", params={"limit": 2, "fields": "name,suppliers"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_fruits"] == 3
+    assert len(data["fruits"]) == 2
+    assert set(data["fruits"][0].keys()) == {"id", "name", "suppliers"}
+    assert data["next_cursor"] == response.headers["X-Next-Cursor"]
+
+    response = client.get("/api/v1/get_all_data", params={"limit": 2, "after": data["next_cursor"]})
+    data = response.json()
+    assert [f["name"] for f in data["fruits"]] == ["fruit-2"]
+    assert data["fruits"][0]["nutritional_info"]["calories"] == 50
+    assert data["next_cursor"] is None
+
+def _names(response):
+    assert response.status_code == 200
+    return [f["fruit"] for f in response.json()]
+
+def test_get_fruits_filters(client, catalogue):
+    farm = catalogue()
+
+    def names(**params):
+        return _names(client.get("/api/v1/fruits", params=params))
+
+    assert names(color="yellow") == ["Pineapple", "Banana"]
+    assert names(color="yellow", origin_country="Ecuador") == ["Banana"]
+    assert names(taste="sour") == ["Green Apple"]
+    assert names(min_price=2, max_price=3) == ["Green Apple", "Apple"]
+    assert names(supplier_id=farm.id) == ["Green Apple", "Banana"]
+    assert names(min_calories=60) == ["Banana", "Durian"]
+    assert names(min_calories=51, max_calories=60) == ["Green Apple", "Apple"]
+    assert names(color="purple") == []
+    assert client.get("/api/v1/fruits", params={"min_price": -1}).status_code == 422
+
+def test_filters_reject_ids_beyond_64_bits(client):
+    for path in ("/api/v1/fruits", "/api/v1/get_all_data"):
+        for param in ("supplier_id", "min_calories", "max_calories"):
+            response = client.get(path, params={param: 2 ** 70})
+            assert response.status_code == 422
+            assert "SQLite" not in response.text
+        assert client.get(path, params={"supplier_id": 0}).status_code == 422
+
+def test_get_all_data_error_detail_is_generic(client, monkeypatch):
+    def fail(db):
+        raise RuntimeError("Python int too large to convert to SQLite INTEGER")
+
+    monkeypatch.setattr("app.api.v1.routes.get_catalogue_counts", fail)
+    response = client.get("/api/v1/get_all_data")
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Failed to load all data"}
+
+def test_get_fruits_name_search(client, db_session, catalogue):
+    catalogue()
+
+    def search(q):
+        return _names(client.get("/api/v1/fruits", params={"q": q}))
+
+    # Words match by prefix, every word must match
+    assert search("app") == ["Green Apple", "Apple"]
+    assert search("GRE app") == ["Green Apple"]
+    assert search("pine") == ["Pineapple"]
+    assert search("?!") == []
+
+    # The search index follows renames
+    apple = db_session.query(Fruit).filter(Fruit.name == "Apple").one()
+    apple.name = "Red Delicious"
+    db_session.commit()
+    response_cache.invalidate("fruits")
+    assert search("app") == ["Green Apple"]
+    assert search("delic") == ["Red Delicious"]
+
+@pytest.mark.parametrize("sort", ["price_per_kg", "-price_per_kg", "name", "-color", "-id"])
+def test_get_fruits_sorted_pagination(client, sort, catalogue):
+    catalogue()
+    everything = _names(client.get("/api/v1/fruits", params={"sort": sort}))
+
+    seen = []
+    params = {"limit": 2, "sort": sort}
+    while True:
+        response = client.get("/api/v1/fruits", params=params)
+        seen.extend(_names(response))
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["after"] = response.headers["X-Next-Cursor"]
+
+    assert seen == everything
+    assert len(seen) == 5
+
+def test_get_fruits_sort_order(client, catalogue):
+    catalogue()
+
+    # Ties are broken by id, fruits without a price come first
+    assert _names(client.get("/api/v1/fruits", params={"sort": "price_per_kg"})) == [
+        "Durian", "Banana", "Green Apple", "Apple", "Pineapple"
+    ]
+    assert _names(client.get("/api/v1/fruits", params={"sort": "-price_per_kg"})) == [
+        "Pineapple", "Apple", "Green Apple", "Banana", "Durian"
+    ]
+    assert client.get("/api/v1/fruits", params={"sort": "taste"}).status_code == 400
+
+    # A cursor only continues the order it was issued for
+    response = client.get("/api/v1/fruits", params={"sort": "name", "limit": 2})
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get("/api/v1/fruits", params={"sort": "-name", "limit": 2, "after": cursor})
+    assert response.status_code == 400
+
+def test_get_all_data_filters_and_sort(client, catalogue):
+    catalogue()
+    params = {"color": "green", "sort": "-name", "fields": "name"}
+
+    data = client.get("/api/v1/get_all_data", params=params).json()
+    assert [f["name"] for f in data["fruits"]] == ["Green Apple", "Durian"]
+    assert data["total_fruits"] == 5
+
+    response = client.get("/api/v1/get_all_data", params={**params, "stream": "true"})
+    assert [json.loads(line)["name"] for line in response.text.splitlines()] == ["Green Apple", "Durian"]
+
+def test_get_all_data_normalized_shape(client, db_session):
+    shared = Supplier(name="Shared", country="Spain", contact_email="s@example.com", rating=4.5)
+    for i in range(3):
+        fruit = Fruit(name=f"fruit-{i}", color="red", price_per_kg=1.5)
+        fruit.nutritional_info = NutritionalInfo(calories=50 + i)
+        fruit.suppliers.append(shared)
+        db_session.add(fruit)
+    db_session.commit()
+
+    nested = client.get("/api/v1/get_all_data").json()
+    data = client.get("/api/v1/get_all_data", params={"shape": "normalized"}).json()
+    assert data["total_fruits"] == 3
+    assert list(data["suppliers"]) == [str(shared.id)]
+    assert data["suppliers"][str(shared.id)] == nested["fruits"][0]["suppliers"][0]
+    for fruit, original in zip(data["fruits"], nested["fruits"]):
+        assert fruit["supplier_ids"] == [shared.id]
+        assert data["nutritional_info"][str(fruit["nutritional_info_id"])] == original["nutritional_info"]
+        assert "suppliers" not in fruit
+
+    data = client.get("/api/v1/get_all_data", params={"shape": "normalized", "fields": "name"}).json()
+    assert set(data) >= {"fruits", "next_cursor"} and "suppliers" not in data
+    assert set(data["fruits"][0]) == {"id", "name"}
+    assert client.get("/api/v1/get_all_data", params={"shape": "flat"}).status_code == 422
+
+def test_get_all_data_conditional_get(client, db_session):
+    _add_fruits_with_relations(db_session, 2)
+
+    response = client.get("/api/v1/get_all_data")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert response.headers["Last-Modified"].endswith("GMT")
+    assert "must-revalidate" in response.headers["Cache-Control"]
+
+    response = client.get("/api/v1/get_all_data", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    # A different query is a different representation
+    response = client.get("/api/v1/get_all_data?limit=1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+    client.post("/api/v1/fruits", json={"fruit": "kiwi", "color": "green"})
+    response = client.get("/api/v1/get_all_data", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+def test_supplier_rename_changes_etag(client, db_session):
+    _add_fruits_with_relations(db_session, 2)
+    etag = client.get("/api/v1/get_all_data").headers["ETag"]
+
+    # Renaming a supplier leaves the fruit rows alone
+    db_session.query(Supplier).one().name = "Renamed"
+    db_session.commit()
+    response_cache.clear()
+    response = client.get("/api/v1/get_all_data", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["fruits"][0]["suppliers"][0]["name"] == "Renamed"
+
+def test_get_all_data_formats_have_own_etags(client, db_session):
+    _add_fruits_with_relations(db_session, 2)
+    ndjson = {"Accept": "application/x-ndjson"}
+    json_response = client.get("/api/v1/get_all_data")
+    stream_response = client.get("/api/v1/get_all_data", headers=ndjson)
+    assert json_response.headers["ETag"] != stream_response.headers["ETag"]
+    assert "Accept" in json_response.headers["Vary"]
+    assert "Accept" in stream_response.headers["Vary"]
+
+    # An ETag only validates the format it was sent with
+    response = client.get("/api/v1/get_all_data", headers={**ndjson, "If-None-Match": json_response.headers["ETag"]})
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 2
+    response = client.get("/api/v1/get_all_data", headers={"If-None-Match": stream_response.headers["ETag"]})
+    assert response.status_code == 200
+    assert len(response.json()["fruits"]) == 2
+    response = client.get("/api/v1/get_all_data", headers={**ndjson, "If-None-Match": stream_response.headers["ETag"]})
+    assert response.status_code == 304
+    assert "Accept" in response.headers["Vary"]
+
+def test_conditional_get_skips_full_query(client, db_session, engine):
+    _add_fruits_with_relations(db_session, 2)
+    etag = client.get("/api/v1/get_all_data").headers["ETag"]
+
+    # Even with the cached body gone only the version query runs
+    response_cache.clear()
+    response, statements = _count_statements(
+        engine, lambda: client.get("/api/v1/get_all_data", headers={"If-None-Match": etag})
+    )
+    assert response.status_code == 304
+    assert len(statements) == 1
+
+def test_get_fruit_conditional_get(client, db_session):
+    fruit = Fruit(name="apple", color="red")
+    db_session.add(fruit)
+    db_session.commit()
+
+    response = client.get(f"/api/v1/fruits/{fruit.id}")
+    etag = response.headers["ETag"]
+    response = client.get(f"/api/v1/fruits/{fruit.id}", headers={"If-None-Match": f'W/{etag}, "other"'})
+    assert response.status_code == 304
+
+    response = client.get("/api/v1/fruits", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["fruit"] == "apple"
+
+def test_bulk_create_fruits_json_array(client, db_session, bulk_row):
+    rows = [bulk_row("apple"), bulk_row("pear", price_per_kg="cheap"), bulk_row("plum")]
+    response = client.post("/api/v1/fruits/bulk", json=rows)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["inserted"] == 2
+    assert data["failed"] == 1
+    assert data["errors"][0]["index"] == 1
+    assert data["errors"][0]["detail"][0]["loc"] == ["price_per_kg"]
+    assert [f["fruit"] for f in client.get("/api/v1/fruits").json()] == ["apple", "plum"]
+
+def test_bulk_create_rejects_non_finite_and_negative_prices(client, bulk_row):
+    rows = [json.dumps(bulk_row("apple"))]
+    rows += [json.dumps(bulk_row(name)).replace("1.0", price) for name, price in (("pear", "1e400"), ("plum", "-1"))]
+    response = client.post("/api/v1/fruits/bulk", content="[" + ",".join(rows) + "]")
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["inserted"], data["failed"]) == (1, 2)
+    assert [(error["index"], error["detail"][0]["loc"]) for error in data["errors"]] == [
+        (1, ["price_per_kg"]), (2, ["price_per_kg"])
+    ]
+    assert [f["fruit"] for f in client.get("/api/v1/fruits").json()] == ["apple"]
+
+def test_bulk_create_fruits_ndjson_batches(client, engine, bulk_row):
+    lines = [json.dumps(bulk_row(f"fruit-{i}")) for i in range(5)]
+    lines.insert(2, "{not json")
+    body = "\n".join(lines) + "\n\n"
+
+    response, statements = _count_statements(engine, lambda: client.post(
+        "/api/v1/fruits/bulk?batch_size=2",
+        content=body.encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    ))
+    assert response.status_code == 200
+    data = response.json()
+    assert data["inserted"] == 5
+    assert [e["index"] for e in data["errors"]] == [2]
+    assert len([s for s in statements if s.startswith("INSERT INTO fruits")]) == 3
+    assert len(client.get("/api/v1/fruits").json()) == 5
+
+def test_bulk_create_fruits_rejects_non_array(client):
+    response = client.post("/api/v1/fruits/bulk", json={"name": "apple"})
+    assert response.status_code == 400
+
+def test_insert_fruit_batch_isolates_failing_rows(engine):
+    # A plain session: the batch rollback must not undo the fixture's transaction
+    with Session(bind=engine) as session:
+        session.add(Fruit(id=7, name="existing"))
+        session.commit()
+
+        errors = insert_fruit_batch(session, [
+            (0, {"name": "apple"}),
+            (1, {"id": 7, "name": "duplicate"}),
+            (2, {"name": "plum"}),
+        ])
+        assert [e["index"] for e in errors] == [1]
+        assert sorted(f.name for f in session.query(Fruit)) == ["apple", "existing", "plum"]
+
+def test_get_all_data_stream(client, db_session):
+    _add_fruits_with_relations(db_session, 3)
+
+    response = client.get("/api/v1/get_all_data", params={"stream": "true", "fields": "name,suppliers"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["X-Total-Fruits"] == "3"
+    fruits = [json.loads(line) for line in response.text.splitlines()]
+    assert [f["name"] for f in fruits] == ["fruit-0", "fruit-1", "fruit-2"]
+    assert set(fruits[0].keys()) == {"id", "name", "suppliers"}
+
+    response = client.get("/api/v1/get_all_data", headers={"Accept": "application/x-ndjson"})
+    fruits = [json.loads(line) for line in response.text.splitlines()]
+    assert len(fruits) == 3
+    assert fruits[0]["nutritional_info"]["calories"] == 50
+
+def test_iter_fruits_with_relations_keeps_session_small(db_session):
+    _add_fruits_with_relations(db_session, 35)
+    db_session.expunge_all()
+
+    names = []
+    largest_identity_map = 0
+    for fruits in iter_fruits_with_relations(db_session, chunk_size=10):
+        assert len(fruits) <= 10
+        names.extend(f.name for f in fruits)
+        assert all(len(f.suppliers) == 1 for f in fruits)
+        largest_identity_map = max(largest_identity_map, len(db_session.identity_map))
+
+    assert len(names) == 35
+    # One chunk of fruits and nutrition records plus the shared supplier
+    assert largest_identity_map <= 21
+
+def test_json_encoding_matches_stdlib_fallback(client, db_session, monkeypatch):
+    db_session.add(Fruit(name="Açaí", color="purple", price_per_kg=12.5))
+    db_session.commit()
+    response = client.get("/api/v1/fruits")
+    assert response.json() == [{"id": 1, "fruit": "Açaí", "color": "purple"}]
+
+    content = {"fruits": [{"id": 1, "name": "Açaí", "price_per_kg": 12.5, "nutritional_info": None}]}
+    encoded = responses.dumps(content)
+    monkeypatch.setattr(responses, "orjson", None)
+    assert responses.dumps(content) == encoded
+
+def test_get_fruit_complete(client, engine, catalogue):
+    farm = catalogue()
+    response, statements = _count_statements(engine, lambda: client.get("/api/v1/fruits/1/complete"))
+    assert response.status_code == 200
+    data = response.json()
+    assert data["name"] == "Green Apple"
+    assert data["nutritional_info"]["calories"] == 52
+    assert data["nutritional_info"]["fruit_id"] == 1
+    assert [s["id"] for s in data["suppliers"]] == [farm.id]
+    assert data["created_at"] and data["updated_at"]
+    # The fruit joined with its nutrition, then the batched supplier query
+    assert len(statements) == 2
+
+def test_get_fruit_complete_not_found(client, db_session):
+    db_session.add(Fruit(name="Plain", color="white"))
+    db_session.commit()
+    assert client.get("/api/v1/fruits/2/complete").json()["detail"] == "Fruit not found"
+    assert client.get("/api/v1/fruits/1/complete").json()["detail"] == "Nutritional info not found"
+
+def test_list_suppliers_pagination(client, db_session):
+    db_session.add_all([
+        Supplier(name=f"Supplier {i}", country="Spain", contact_email="s@example.com", rating=4.0)
+        for i in range(3)
+    ])
+    db_session.commit()
+
+    response = client.get("/api/v1/suppliers", params={"limit": 2})
+    assert [s["name"] for s in response.json()] == ["Supplier 0", "Supplier 1"]
+    response = client.get("/api/v1/suppliers", params={"limit": 2, "after": response.headers["X-Next-Cursor"]})
+    assert [s["name"] for s in response.json()] == ["Supplier 2"]
+    assert "X-Next-Cursor" not in response.headers
+
+def test_get_supplier(client, catalogue):
+    farm = catalogue()
+    response = client.get(f"/api/v1/suppliers/{farm.id}")
+    assert response.json() == {
+        "id": farm.id, "name": "Farm", "contact_email": "farm@example.com", "country": "Spain", "rating": 4.0
+    }
+    assert client.get("/api/v1/suppliers/99").status_code == 404
+    assert client.get("/api/v1/suppliers/99/fruits").status_code == 404
+
+def test_path_ids_beyond_64_bits_are_rejected(client):
+    for path in ("/fruits/{}", "/fruits/{}/complete", "/suppliers/{}", "/suppliers/{}/fruits"):
+        assert client.get("/api/v1" + path.format(2 ** 70)).status_code == 422
+        assert client.get("/api/v1" + path.format(0)).status_code == 422
+
+def test_get_supplier_fruits(client, db_session, engine, catalogue):
+    farm = catalogue()
+    other = Supplier(name="Other", country="USA", contact_email="other@example.com", rating=3.0)
+    db_session.add(other)
+    db_session.commit()
+
+    url, other_url = f"/api/v1/suppliers/{farm.id}/fruits", f"/api/v1/suppliers/{other.id}/fruits"
+    # Start from an empty identity map so the supplier lookup is a query
+    db_session.expunge_all()
+    response, statements = _count_statements(engine, lambda: client.get(url, params={"limit": 1}))
+    assert [f["name"] for f in response.json()] == ["Green Apple"]
+    assert response.json()[0]["suppliers"][0]["name"] == "Farm"
+    # Supplier lookup, fruits with nutrition, batched suppliers
+    assert len(statements) == 3
+
+    response = client.get(url, params={"limit": 1, "after": response.headers["X-Next-Cursor"]})
+    assert [f["name"] for f in response.json()] == ["Banana"]
+    response = client.get(url, params={"sort": "-name", "fields": "name", "color": "yellow"})
+    assert response.json() == [{"id": 4, "name": "Banana"}]
+    assert client.get(other_url).json() == []
+
+def test_batch_get_fruits(client, engine, catalogue):
+    catalogue()
+    response, statements = _count_statements(
+        engine, lambda: client.post("/api/v1/fruits:batchGet", json={"ids": [4, 99, 1, 4, 2]})
+    )
+    data = response.json()
+    assert [f["name"] for f in data["fruits"]] == ["Banana", "Green Apple", "Apple"]
+    assert data["fruits"][0]["nutritional_info"]["calories"] == 89
+    assert [s["name"] for s in data["fruits"][0]["suppliers"]] == ["Farm"]
+    assert data["missing"] == [99]
+    # Fruits with nutrition, then their suppliers
+    assert len(statements) == 2
+
+def test_batch_get_fruits_chunks_ids(client, engine, monkeypatch, catalogue):
+    catalogue()
+    monkeypatch.setattr(settings, "BATCH_GET_CHUNK_SIZE", 2)
+    response, statements = _count_statements(engine, lambda: client.post(
+        "/api/v1/fruits:batchGet", params={"fields": "name"}, json={"ids": [5, 4, 3, 2, 1]}
+    ))
+    assert response.json() == {
+        "fruits": [
+            {"id": 5, "name": "Durian"}, {"id": 4, "name": "Banana"}, {"id": 3, "name": "Pineapple"},
+            {"id": 2, "name": "Apple"}, {"id": 1, "name": "Green Apple"},
+        ],
+        "missing": [],
+    }
+    assert len(statements) == 3
+    assert client.post("/api/v1/fruits:batchGet", json={"ids": []}).status_code == 422
+    for ids in ([2 ** 70], [1, 2 ** 63], [0]):
+        assert client.post("/api/v1/fruits:batchGet", json={"ids": ids}).status_code == 422
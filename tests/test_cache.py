@@ -0,0 +1,120 @@
+import fnmatch
+import time
+import pytest
+from sqlalchemy import event
+from app.cache import CacheBackend, MemoryCache, RedisCache, ResponseCache
+from app.metrics import CACHE_REQUESTS
+from app.models import Fruit
+
+class FakeRedis:
+    """In-memory stand-in for the redis-py client"""
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        self.ttls[key] = ex
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+        return int(self.data[key])
+
+    def scan_iter(self, match="*"):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, match)]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+def _cache_count(namespace, result):
+    return CACHE_REQUESTS.labels(namespace=namespace, result=result)._value.get()
+
+def test_cache_backend_is_abstract():
+    class Incomplete(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        CacheBackend()
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_memory_cache_ttl_expiry():
+    cache = MemoryCache()
+    cache.set("key", "value", ttl=0.05)
+    assert cache.get("key") == "value"
+    time.sleep(0.06)
+    assert cache.get("key") is None
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.get("a")
+    cache.set("c", 3, ttl=60)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+def test_redis_cache_with_fake_client():
+    client = FakeRedis()
+    client.set("other-app:key", "keep")
+    cache = RedisCache(client=client)
+    cache.set("key", {"id": 1}, ttl=30)
+    assert cache.get("key") == {"id": 1}
+    assert client.ttls["fruits-api:key"] == 30
+    assert cache.incr("counter") == 1
+    assert cache.get_counter("counter") == 1
+
+    cache.clear()
+    assert cache.get("key") is None
+    assert client.get("other-app:key") == b"keep"
+
+def test_response_cache_hits_misses_and_invalidation():
+    for backend in (MemoryCache(), RedisCache(client=FakeRedis())):
+        cache = ResponseCache(backend, ttl=60)
+        calls = []
+
+        def build():
+            calls.append(1)
+            return {"calls": len(calls)}
+
+        hits, misses = _cache_count("test", "hit"), _cache_count("test", "miss")
+        assert cache.get_or_set("test", "key", build) == {"calls": 1}
+        assert cache.get_or_set("test", "key", build) == {"calls": 1}
+        cache.invalidate("test")
+        assert cache.get_or_set("test", "key", build) == {"calls": 2}
+        assert _cache_count("test", "hit") == hits + 1
+        assert _cache_count("test", "miss") == misses + 2
+
+def test_cached_listing_does_not_touch_database(client, db_session, engine):
+    db_session.add(Fruit(name="apple", color="red"))
+    db_session.commit()
+    assert len(client.get("/api/v1/fruits").json()) == 1
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert len(client.get("/api/v1/fruits").json()) == 1
+        assert client.get("/api/v1/get_all_data").status_code == 200
+        assert client.get("/api/v1/get_all_data").status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    # Only the first get_all_data call reaches the database
+    assert len(statements) == 4
+
+def test_create_fruit_invalidates_cached_listing(client):
+    assert client.get("/api/v1/fruits").json() == []
+    client.post("/api/v1/fruits", json={"fruit": "apple", "color": "red"})
+    assert [f["fruit"] for f in client.get("/api/v1/fruits").json()] == ["apple"]
+
+def test_not_found_is_not_cached(client, db_session):
+    assert client.get("/api/v1/fruits/1").status_code == 404
+    db_session.add(Fruit(id=1, name="apple", color="red"))
+    db_session.commit()
+    assert client.get("/api/v1/fruits/1").status_code == 200
@@ -0,0 +1,152 @@
+from datetime import datetime
+from sqlalchemy import create_engine, func, insert, select, text, update
+from app.migrate import run_migrations
+from app.models import ChangeLog, Fruit, NutritionalInfo, Supplier
+from app.retention import prune_change_log
+
+def _changes(client, since, **params):
+    response = client.get("/api/v1/changes", params={"since": since, **params})
+    assert response.status_code == 200
+    return response.json()
+
+def _keys(feed):
+    return [(change["entity"], change["id"], change["operation"]) for change in feed["changes"]]
+
+def test_changes_from_start_return_current_rows(client, catalogue):
+    farm = catalogue()
+    feed = _changes(client, 0)
+
+    assert feed["has_more"] is False
+    assert sorted(_keys(feed)) == sorted(
+        [("fruit", i, "upsert") for i in range(1, 6)]
+        + [("nutritional_info", i, "upsert") for i in range(1, 6)]
+        + [("supplier", farm.id, "upsert")]
+    )
+    apple = next(change["data"] for change in feed["changes"] if change["entity"] == "fruit" and change["id"] == 1)
+    assert apple["name"] == "Green Apple"
+    assert [supplier["name"] for supplier in apple["suppliers"]] == ["Farm"]
+    assert apple["nutritional_info"]["calories"] == 52
+    assert apple["updated_at"]
+    nutrition = next(change["data"] for change in feed["changes"] if change["entity"] == "nutritional_info")
+    assert nutrition["fruit_id"] == nutrition["id"]
+
+    # Nothing changed since the returned token
+    assert _changes(client, feed["next_since"]) == {"changes": [], "next_since": feed["next_since"], "has_more": False}
+
+def test_changes_since_token(client, db_session, catalogue):
+    farm = catalogue()
+    token = _changes(client, 0)["next_since"]
+
+    pineapple = db_session.get(Fruit, 3)
+    pineapple.suppliers.append(farm)
+    banana = db_session.get(Fruit, 4)
+    banana.price_per_kg = 3.0
+    banana.nutritional_info.calories = 90
+    db_session.commit()
+
+    feed = _changes(client, token)
+    assert sorted(_keys(feed)) == [("fruit", 3, "upsert"), ("fruit", 4, "upsert"), ("nutritional_info", 4, "upsert")]
+    data = {(change["entity"], change["id"]): change["data"] for change in feed["changes"]}
+    assert data[("fruit", 4)]["price_per_kg"] == 3.0
+    assert [supplier["id"] for supplier in data[("fruit", 3)]["suppliers"]] == [farm.id]
+    assert data[("nutritional_info", 4)]["calories"] == 90
+
+def test_deleted_fruit_is_a_tombstone(client, db_session, engine, catalogue):
+    catalogue()
+    token = _changes(client, 0)["next_since"]
+    db_session.expunge_all()
+
+    assert client.delete("/api/v1/fruits/1").status_code == 204
+    assert client.delete("/api/v1/fruits/1").status_code == 404
+    assert client.delete(f"/api/v1/fruits/{2 ** 70}").status_code == 422
+    assert client.get("/api/v1/fruits/1").status_code == 404
+
+    feed = _changes(client, token)
+    assert sorted(_keys(feed)) == [("fruit", 1, "delete"), ("nutritional_info", 1, "delete")]
+    assert all("data" not in change for change in feed["changes"])
+    assert db_session.scalar(select(NutritionalInfo).where(NutritionalInfo.fruit_id == 1)) is None
+
+def test_changes_are_paginated(client, catalogue):
+    catalogue()
+    full = _keys(_changes(client, 0))
+
+    seen, since, pages = [], 0, 0
+    while True:
+        feed = _changes(client, since, limit=2)
+        seen += _keys(feed)
+        since = feed["next_since"]
+        pages += 1
+        if not feed["has_more"]:
+            break
+    # Rows logged again on a later page are sent again
+    assert sorted(set(seen)) == sorted(full)
+    assert pages > 1
+    assert client.get("/api/v1/changes", params={"since": -1}).status_code == 422
+
+def test_get_all_data_change_token(client, db_session, catalogue):
+    catalogue()
+    data = client.get("/api/v1/get_all_data").json()
+    assert data["change_token"] == db_session.scalar(select(ChangeLog.id).order_by(ChangeLog.id.desc()).limit(1))
+
+    created = client.post("/api/v1/fruits", json={"fruit": "Lime", "color": "green"}).json()
+    assert _keys(_changes(client, data["change_token"])) == [("fruit", created["id"], "upsert")]
+
+def test_migration_logs_existing_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'changes.db'}")
+    run_migrations(engine, "0004")
+    with engine.begin() as conn:
+        conn.execute(insert(Fruit), [{"name": "apple", "color": "red"}, {"name": "pear", "color": "green"}])
+        conn.execute(insert(Supplier), [{"name": "Farm"}])
+        conn.execute(insert(NutritionalInfo), [{"fruit_id": 1, "calories": 52}])
+    run_migrations(engine)
+    with engine.begin() as conn:
+        logged = conn.execute(select(ChangeLog.entity, ChangeLog.entity_id).order_by(ChangeLog.id)).all()
+        assert sorted(logged) == [("fruit", 1), ("fruit", 2), ("nutritional_info", 1), ("supplier", 1)]
+
+        # The triggers record writes from here on
+        conn.execute(text("DELETE FROM fruits WHERE id = 2"))
+        last = conn.execute(select(ChangeLog).order_by(ChangeLog.id.desc()).limit(1)).one()
+        assert (last.entity, last.entity_id, last.operation) == ("fruit", 2, "delete")
+    engine.dispose()
+
+def test_changes_reject_out_of_range_token(client):
+    assert client.get("/api/v1/changes", params={"since": 2 ** 63}).status_code == 422
+    assert client.get("/api/v1/changes", params={"since": 2 ** 63 - 1}).status_code == 410
+
+def test_token_newer_than_log_must_reload(client, catalogue):
+    response = client.get("/api/v1/changes", params={"since": 999999})
+    assert response.status_code == 410
+    assert "/get_all_data" in response.json()["detail"]
+
+    catalogue()
+    latest = _changes(client, 0)["next_since"]
+    assert client.get("/api/v1/changes", params={"since": latest + 1}).status_code == 410
+    assert _changes(client, latest)["changes"] == []
+
+def test_pruned_change_log(client, db_session, engine, catalogue):
+    catalogue()
+    old = _changes(client, 0)["next_since"]
+    assert old > 1
+    db_session.add(Fruit(name="Lime", color="green"))
+    db_session.commit()
+    token = _changes(client, old)["next_since"]
+    with engine.begin() as conn:
+        conn.execute(update(ChangeLog).where(ChangeLog.id <= old).values(changed_at=datetime(2020, 1, 1)))
+        assert prune_change_log(conn, 30) == old
+        assert prune_change_log(conn, 0) == 0
+
+    # Tokens before the pruned entries must reload, later ones carry on
+    response = client.get("/api/v1/changes", params={"since": 0})
+    assert response.status_code == 410
+    assert "/get_all_data" in response.json()["detail"]
+    assert _keys(_changes(client, old)) == [("fruit", 6, "upsert")]
+    assert _changes(client, token)["changes"] == []
+
+def test_prune_keeps_latest_entry(engine, catalogue):
+    catalogue()
+    with engine.begin() as conn:
+        latest = conn.execute(select(func.max(ChangeLog.id))).scalar_one()
+        conn.execute(update(ChangeLog).values(changed_at=datetime(2020, 1, 1)))
+        prune_change_log(conn, 30)
+        # The next entry must not reuse a token already handed out
+        assert conn.execute(select(ChangeLog.id)).scalars().all() == [latest]
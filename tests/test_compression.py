@@ -0,0 +1,53 @@
+import json
+import pytest
+from app.compression import negotiate_encoding
+
+def test_negotiate_encoding():
+    available = ("br", "gzip")
+    assert negotiate_encoding("gzip, deflate, br", available) == "br"
+    assert negotiate_encoding("gzip;q=1.0, br;q=0.5", available) == "gzip"
+    assert negotiate_encoding("br;q=0, gzip", available) == "gzip"
+    assert negotiate_encoding("*", ("gzip",)) == "gzip"
+    assert negotiate_encoding("identity", available) is None
+    assert negotiate_encoding(None, available) is None
+
+def test_large_response_is_gzipped(client, catalogue):
+    catalogue(count=200, suppliers=3)
+    response = client.get("/api/v1/get_all_data", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.num_bytes_downloaded < len(response.content) / 5
+    assert len(response.json()["fruits"]) == 200
+
+    # The compressed representation gets a weak ETag that still revalidates
+    etag = response.headers["etag"]
+    assert etag.startswith("W/")
+    response = client.get("/api/v1/get_all_data", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 304
+
+def test_brotli_is_preferred(client, catalogue):
+    pytest.importorskip("brotli")
+    catalogue(count=200, suppliers=3)
+    response = client.get("/api/v1/get_all_data", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.json()["total_fruits"] == 200
+
+def test_small_and_identity_responses_are_not_compressed(client, catalogue):
+    catalogue(count=1)
+    response = client.get("/api/v1/fruits", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+    catalogue(count=200, suppliers=3)
+    response = client.get("/api/v1/get_all_data", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+
+def test_stream_is_compressed_per_chunk(client, catalogue):
+    catalogue(count=200, suppliers=3)
+    response = client.get(
+        "/api/v1/get_all_data", params={"stream": "true"}, headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [fruit["name"] for fruit in lines] == [f"fruit-{i}" for i in range(200)]
@@ -0,0 +1,206 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine, func, select, table, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app import database
+from app.config import settings
+from app.database import (
+    RoutingSession, TimedQueuePool, create_db_engine, database_url, per_worker_pool_limits, pool_options,
+    wait_for_database
+)
+from app.metrics import DB_POOL_CHECKOUT_WAIT
+
+def _checkout_count():
+    for metric in DB_POOL_CHECKOUT_WAIT.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_count"):
+                return sample.value
+
+def test_per_worker_pool_limits_stay_within_budget():
+    for budget, workers in [(100, 33), (150, 9), (10, 4), (3, 17)]:
+        pool_size, max_overflow = per_worker_pool_limits(budget, workers)
+        assert pool_size >= 1
+        assert max_overflow >= 0
+        if budget >= workers:
+            assert (pool_size + max_overflow) * workers <= budget
+
+    assert per_worker_pool_limits(90, 3) == (20, 10)
+
+def test_pool_options_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, "DB_CONNECTION_BUDGET", 60)
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 4)
+    monkeypatch.setattr(settings, "DB_POOL_RECYCLE", 600)
+    options = pool_options()
+    assert (options["pool_size"], options["max_overflow"]) == (10, 5)
+    assert options["pool_recycle"] == 600
+    assert options["pool_pre_ping"] is True
+    assert options["poolclass"] is TimedQueuePool
+
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 2)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 0)
+    options = pool_options()
+    assert (options["pool_size"], options["max_overflow"]) == (2, 0)
+
+def test_pool_checkout_wait_is_recorded(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool, pool_size=1)
+    before = _checkout_count()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert _checkout_count() == before + 1
+    engine.dispose()
+
+def test_metrics_endpoint(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "fruits_db_pool_checkout_wait_seconds_bucket" in response.text
+
+def test_import_does_not_touch_the_database():
+    # An unreachable MySQL configuration must not fail or slow down imports
+    env = {**os.environ, "DATABASE_URL": "mysql", "MYSQL_HOST": "127.0.0.1:1", "TESTING": "false"}
+    script = "import app.main, app.database as d; print(d._engine is None)"
+    result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "True"
+
+def test_database_url_requires_mysql_settings(monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_URL", "mysql")
+    for name in ("MYSQL_USER", "MYSQL_PASSWORD", "MYSQL_HOST", "MYSQL_DATABASE"):
+        monkeypatch.setattr(settings, name, None)
+    with pytest.raises(RuntimeError, match="MYSQL_HOST"):
+        database_url()
+
+    monkeypatch.setattr(settings, "MYSQL_USER", "fruits")
+    monkeypatch.setattr(settings, "MYSQL_PASSWORD", "secret")
+    monkeypatch.setattr(settings, "MYSQL_HOST", "db")
+    monkeypatch.setattr(settings, "MYSQL_DATABASE", "catalogue")
+    assert database_url().startswith("mysql+pymysql://fruits:secret@db/catalogue")
+
+class FlakyEngine:
+    def __init__(self, failures):
+        self.failures = failures
+        self.attempts = 0
+        self.engine = create_engine("sqlite://")
+
+    def connect(self):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+        return self.engine.connect()
+
+def test_wait_for_database_retries_with_backoff(monkeypatch):
+    delays = []
+    monkeypatch.setattr(database.time, "sleep", delays.append)
+
+    engine = FlakyEngine(failures=3)
+    wait_for_database(engine, retries=5, backoff=0.5, max_backoff=1.5)
+    assert engine.attempts == 4
+    assert delays == [0.5, 1.0, 1.5]
+
+    delays.clear()
+    with pytest.raises(OperationalError):
+        wait_for_database(FlakyEngine(failures=10), retries=2, backoff=0.5, max_backoff=10)
+    assert delays == [0.5, 1.0]
+
+@pytest.fixture
+def sqlite_engines(tmp_path):
+    url = f"sqlite:///{tmp_path / 'fruits.db'}"
+    writer = create_db_engine(url)
+    reader = create_db_engine(url, read_only=True)
+    with writer.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+    yield writer, reader
+    writer.dispose()
+    reader.dispose()
+
+def _count_items(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM items")).scalar()
+
+def test_sqlite_pragmas(sqlite_engines):
+    writer, reader = sqlite_engines
+    with writer.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == settings.SQLITE_BUSY_TIMEOUT_MS
+        assert conn.exec_driver_sql("PRAGMA cache_size").scalar() == -settings.SQLITE_CACHE_SIZE_KB
+        # NORMAL
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+    with reader.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA query_only").scalar() == 1
+        with pytest.raises(OperationalError, match="readonly"):
+            conn.execute(text("INSERT INTO items (name) VALUES ('pear')"))
+    assert writer.pool.size() == 1
+    assert reader.pool.size() == settings.SQLITE_READ_POOL_SIZE
+
+def test_reads_are_not_blocked_by_a_write_in_progress(sqlite_engines):
+    writer, reader = sqlite_engines
+    with writer.begin() as conn:
+        conn.execute(text("INSERT INTO items (name) VALUES ('apple')"))
+        start = time.perf_counter()
+        assert _count_items(reader) == 0
+        assert time.perf_counter() - start < 0.5
+    assert _count_items(reader) == 1
+
+def test_concurrent_writers_and_readers(tmp_path, sqlite_engines):
+    # A second write engine stands in for another worker process
+    writers = [sqlite_engines[0], create_db_engine(f"sqlite:///{tmp_path / 'fruits.db'}")]
+    reader = sqlite_engines[1]
+    errors = []
+    reads_during_writes = []
+    writing = threading.Event()
+
+    def write(engine, worker):
+        try:
+            for batch in range(20):
+                with engine.begin() as conn:
+                    writing.set()
+                    for i in range(50):
+                        conn.execute(text("INSERT INTO items (name) VALUES (:name)"), {"name": f"{worker}-{batch}-{i}"})
+                    time.sleep(0.005)
+        except Exception as e:
+            errors.append(e)
+
+    def read():
+        writing.wait()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                reads_during_writes.append(_count_items(reader))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(engine, n)) for n, engine in enumerate(writers)]
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    for thread in threads + readers:
+        thread.start()
+    for thread in threads + readers:
+        thread.join()
+    writers[1].dispose()
+
+    assert errors == []
+    assert _count_items(reader) == 2000
+    # Readers kept going while the writers were busy and saw committed batches only
+    assert len(reads_during_writes) > 10
+    assert all(count % 50 == 0 for count in reads_during_writes)
+
+def test_routing_session(sqlite_engines):
+    writer, reader = sqlite_engines
+    select_items = select(func.count()).select_from(table("items"))
+    insert_item = text("INSERT INTO items (name) VALUES ('apple')")
+    session = RoutingSession(bind=writer, read_bind=reader)
+    assert session.get_bind(clause=select_items) is reader
+
+    session.execute(insert_item)
+    # Reads in a transaction that wrote see its uncommitted rows
+    assert session.get_bind(clause=select_items) is writer
+    assert session.execute(select_items).scalar() == 1
+    session.commit()
+    assert session.get_bind(clause=select_items) is reader
+    assert session.execute(select_items).scalar() == 1
+    session.close()
+
+    assert Session(bind=writer).get_bind(clause=select_items) is writer
+
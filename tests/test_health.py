@@ -0,0 +1,60 @@
+import time
+import pytest
+from sqlalchemy import create_engine, event
+from app.database import get_read_engine
+from app.health import pool_status, readiness_probe
+from app.main import app
+
+@pytest.fixture(autouse=True)
+def reset_readiness_probe():
+    readiness_probe.reset()
+    yield
+    readiness_probe.reset()
+
+def test_liveness(client):
+    response = client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive"}
+
+def test_readiness_reports_backend(client, engine):
+    app.dependency_overrides[get_read_engine] = lambda: engine
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert data["database"]["backend"] == "sqlite"
+    assert data["database"]["status"] == "ok"
+
+def test_readiness_result_is_cached(client, engine, tmp_path):
+    app.dependency_overrides[get_read_engine] = lambda: engine
+    assert client.get("/health/ready").status_code == 200
+
+    broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'db.sqlite'}")
+    app.dependency_overrides[get_read_engine] = lambda: broken
+    assert client.get("/health/ready").status_code == 200
+
+    readiness_probe.reset()
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["database"]["status"] == "error"
+
+def test_readiness_enforces_latency_budget(client, tmp_path, monkeypatch):
+    slow = create_engine(f"sqlite:///{tmp_path / 'slow.db'}")
+    event.listen(slow, "before_cursor_execute", lambda *args: time.sleep(1))
+    app.dependency_overrides[get_read_engine] = lambda: slow
+    monkeypatch.setattr(readiness_probe, "timeout", 0.1)
+
+    start = time.perf_counter()
+    response = client.get("/health/ready")
+    assert time.perf_counter() - start < 0.8
+    assert response.status_code == 503
+    assert response.json()["database"]["status"] == "timeout"
+
+def test_pool_status(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=2, max_overflow=2)
+    with engine.connect():
+        status = pool_status(engine.pool)
+    assert status["size"] == 2
+    assert status["checked_out"] == 1
+    assert status["saturation"] == 0.25
+    assert pool_status(create_engine("sqlite://").pool) is None
@@ -0,0 +1,67 @@
+import json
+import logging
+import queue
+from app.config import settings
+from app.log import ContextQueueHandler, JSONFormatter, configure_logging, current_request_id
+from app.models import Fruit
+
+def _access_records(caplog):
+    return [record for record in caplog.records if record.name == "app.access"]
+
+def test_queued_records_are_formatted_as_json():
+    records = queue.SimpleQueue()
+    handler = ContextQueueHandler(records)
+    logger = logging.getLogger("tests.log")
+    logger.addHandler(handler)
+    token = current_request_id.set("abc123")
+    try:
+        logger.warning("Loaded %d fruits", 3, extra={"route": "/api/v1/fruits"})
+        try:
+            raise ValueError("broken")
+        except ValueError:
+            logger.exception("Failed")
+    finally:
+        current_request_id.reset(token)
+        logger.removeHandler(handler)
+
+    formatter = JSONFormatter()
+    entry = json.loads(formatter.format(records.get_nowait()))
+    assert entry["level"] == "WARNING"
+    assert entry["logger"] == "tests.log"
+    assert entry["message"] == "Loaded 3 fruits"
+    assert entry["request_id"] == "abc123"
+    assert entry["route"] == "/api/v1/fruits"
+    entry = json.loads(formatter.format(records.get_nowait()))
+    assert "ValueError: broken" in entry["exception"]
+
+def test_configure_logging_installs_one_queue_handler():
+    configure_logging()
+    configure_logging()
+    handlers = [handler for handler in logging.getLogger().handlers if isinstance(handler, ContextQueueHandler)]
+    assert len(handlers) == 1
+
+def test_access_log(client, db_session, caplog):
+    db_session.add(Fruit(name="Apple", color="red"))
+    db_session.commit()
+    with caplog.at_level(logging.INFO, logger="app.access"):
+        response = client.get("/api/v1/fruits/1", headers={"X-Request-ID": "req-1"})
+        generated = client.get("/api/v1/fruits/2")
+
+    assert response.headers["x-request-id"] == "req-1"
+    assert len(generated.headers["x-request-id"]) == 32
+    first, second = _access_records(caplog)
+    assert first.request_id == "req-1"
+    assert first.route == "/api/v1/fruits/{fruit_id}"
+    assert (first.method, first.path, first.status) == ("GET", "/api/v1/fruits/1", 200)
+    assert first.db_queries == 1
+    assert first.duration_ms >= first.db_ms >= 0
+    assert second.status == 404
+
+def test_access_log_sampling(client, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "ACCESS_LOG_SAMPLE_RATE", 0.0)
+    with caplog.at_level(logging.INFO, logger="app.access"):
+        client.get("/api/v1/fruits")
+        client.get("/api/v1/fruits/42")
+    # Successes are sampled away, errors are always logged
+    records = _access_records(caplog)
+    assert [(record.status, record.sample_rate) for record in records] == [(404, 1.0)]
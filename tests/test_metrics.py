@@ -0,0 +1,114 @@
+import logging
+import os
+import re
+import subprocess
+import sys
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from app.api.v1 import routes
+from app.config import settings
+from app.metrics import instrument_engine
+from app.models import Fruit, Supplier
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+def test_request_metrics_use_route_templates(client, db_session, engine):
+    instrument_engine(engine)
+    fruit = Fruit(name="apple", color="red")
+    db_session.add(fruit)
+    db_session.commit()
+
+    route = {"method": "GET", "route": "/api/v1/fruits/{fruit_id}"}
+    ok_before = _sample("fruits_http_request_duration_seconds_count", status="200", **route)
+    missing_before = _sample("fruits_http_request_duration_seconds_count", status="404", **route)
+    statements_before = _sample("fruits_http_request_sql_statements_sum", **route)
+
+    assert client.get(f"/api/v1/fruits/{fruit.id}").status_code == 200
+    assert client.get("/api/v1/fruits/999999").status_code == 404
+
+    assert _sample("fruits_http_request_duration_seconds_count", status="200", **route) == ok_before + 1
+    assert _sample("fruits_http_request_duration_seconds_count", status="404", **route) == missing_before + 1
+    assert _sample("fruits_http_request_sql_statements_sum", **route) >= statements_before + 2
+    assert _sample("fruits_http_requests_in_progress", method="GET") == 0
+
+def test_statement_durations_by_operation(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'statements.db'}")
+    instrument_engine(engine)
+    before = _sample("fruits_db_statement_duration_seconds_count", operation="select")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+    assert _sample("fruits_db_statement_duration_seconds_count", operation="select") == before + 2
+    engine.dispose()
+
+def test_pool_gauges(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=1, max_overflow=2)
+    instrument_engine(engine)
+    assert _sample("fruits_db_pool_size", pool="primary") == 1
+    with engine.connect():
+        assert _sample("fruits_db_pool_checked_out_connections", pool="primary") == 1
+        with engine.connect():
+            assert _sample("fruits_db_pool_checked_out_connections", pool="primary") == 2
+            assert _sample("fruits_db_pool_overflow_connections", pool="primary") == 1
+        assert _sample("fruits_db_pool_overflow_connections", pool="primary") == 1
+    assert _sample("fruits_db_pool_checked_out_connections", pool="primary") == 0
+    assert _sample("fruits_db_pool_overflow_connections", pool="primary") == 0
+    engine.dispose()
+
+def test_metrics_aggregate_across_processes(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    observe = (
+        "from app.metrics import HTTP_REQUEST_DURATION; "
+        "HTTP_REQUEST_DURATION.labels(method='GET', route='/worker', status='200').observe(0.1)"
+    )
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", observe], env=env, check=True, timeout=60)
+
+    scrape = "from app.metrics import render_metrics; print(render_metrics()[0].decode())"
+    output = subprocess.run(
+        [sys.executable, "-c", scrape], env=env, check=True, capture_output=True, text=True, timeout=60
+    ).stdout
+    assert 'fruits_http_request_duration_seconds_count{method="GET",route="/worker",status="200"} 2.0' in output
+
+def test_server_timing_header(client, db_session):
+    db_session.add(Fruit(name="apple", color="red"))
+    db_session.commit()
+    response = client.get("/api/v1/fruits")
+    assert re.fullmatch(r'db;dur=[\d.]+;desc="2 queries", app;dur=[\d.]+', response.headers["Server-Timing"])
+    assert response.headers["Timing-Allow-Origin"] == "*"
+
+def test_query_budget_catches_lazy_loads(client, db_session, monkeypatch):
+    supplier = Supplier(name="Farm", country="Spain", contact_email="farm@example.com", rating=4.0)
+    for i in range(3):
+        fruit = Fruit(name=f"fruit-{i}", color="red")
+        fruit.suppliers.append(supplier)
+        db_session.add(fruit)
+    db_session.commit()
+    db_session.expunge_all()
+    assert client.get("/api/v1/get_all_data").status_code == 200
+
+    # Drop the batched supplier load, every fruit now lazy-loads its suppliers
+    load_options = routes._detail_load_options
+    monkeypatch.setattr(
+        routes, "_detail_load_options", lambda requested: {**load_options(requested), "suppliers": False}
+    )
+    response = client.get("/api/v1/get_all_data", params={"fields": "name,suppliers"})
+    assert response.status_code == 500
+    assert "exceeded its query budget of 5 statements" in response.json()["detail"]
+
+def test_slow_queries_are_logged(client, db_session, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="app.metrics"):
+        client.get("/api/v1/fruits/42")
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("on /api/v1/fruits/{fruit_id}: SELECT" in message for message in messages)
+    # Bound parameters can hold user data and are left out by default
+    assert not any("(42," in message for message in messages)
+
+    caplog.clear()
+    monkeypatch.setattr(settings, "SLOW_QUERY_LOG_PARAMETERS", True)
+    with caplog.at_level(logging.WARNING, logger="app.metrics"):
+        client.get("/api/v1/fruits/42")
+    assert any("(42," in record.getMessage() for record in caplog.records)
+
@@ -0,0 +1,33 @@
+from app.models import Fruit, NutritionalInfo, Supplier, FruitSupplier
+from app.seed import FRUITS, SUPPLIERS, seed_database, seed_lock
+
+def test_seed_database_inserts_catalogue(db_session):
+    assert seed_database(db_session) is True
+
+    assert db_session.query(Fruit).count() == len(FRUITS)
+    assert db_session.query(Supplier).count() == len(SUPPLIERS)
+    assert db_session.query(NutritionalInfo).count() == len(FRUITS)
+    assert db_session.query(FruitSupplier).count() == len(FRUITS)
+
+    banana = db_session.query(Fruit).filter(Fruit.name == "Banana").one()
+    assert banana.nutritional_info.calories == 89
+    assert [s.name for s in banana.suppliers] == ["Tropical Exports"]
+
+def test_seed_database_is_idempotent(db_session):
+    assert seed_database(db_session) is True
+    assert seed_database(db_session) is False
+    assert db_session.query(Fruit).count() == len(FRUITS)
+
+def test_seed_database_skips_existing_data(db_session):
+    db_session.add(Fruit(name="apple", color="red"))
+    db_session.commit()
+
+    assert seed_database(db_session) is False
+    assert db_session.query(Supplier).count() == 0
+
+def test_seed_lock_can_be_reacquired(tmp_path):
+    lock_file = tmp_path / "seed.lock"
+    with seed_lock(str(lock_file)):
+        pass
+    with seed_lock(str(lock_file)):
+        assert lock_file.exists()